@@ -341,6 +341,7 @@ CREATE TABLE lecturas (
 );
 
 CREATE INDEX idx_lecturas_ventana_id ON lecturas(ventana_id);
+CREATE INDEX idx_lecturas_created_at_id ON lecturas(created_at, id);
 
 CREATE TRIGGER trg_lecturas_update_timestamp
 BEFORE UPDATE ON lecturas
@@ -375,6 +376,7 @@ CREATE TABLE analisis (
 
 CREATE INDEX idx_analisis_ventana_id ON analisis(ventana_id);
 CREATE INDEX idx_analisis_probabilidad_modelo ON analisis(probabilidad_modelo);
+CREATE INDEX idx_analisis_created_at_id ON analisis(created_at, id);
 
 CREATE TRIGGER trg_analisis_update_timestamp
 BEFORE UPDATE ON analisis
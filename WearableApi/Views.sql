@@ -3,6 +3,8 @@
 -- ==========================================================
 -- Streamlined views for consumer-specific dashboards
 -- Designed to be exposed via Django REST API GET requests
+-- Run after `manage.py migrate`: the habit tracking, daily summary and
+-- weekly comparison views read the daily rollup tables (api/models/rollup.py)
 
 -- ==========================================================
 -- 1. SMOKING/HABIT TRACKING SUMMARY
@@ -10,16 +12,17 @@
 -- Tracks total cigarettes/habits smoked over time
 DROP VIEW IF EXISTS vw_habit_tracking CASCADE;
 CREATE OR REPLACE VIEW vw_habit_tracking AS
+-- Served from the resumenes_habito_diarios rollup (one row per consumer,
+-- habit and day, kept current by api/signals.py), not from formularios
 SELECT 
-    f.consumidor_id,
-    COALESCE(f.habito->>'nombre', 'Sin hábito') AS habito_nombre,
-    DATE(f.fecha_envio) AS fecha,
-    COUNT(f.id) AS total_cigarrillos,
-    COUNT(f.id) FILTER (WHERE DATE(f.fecha_envio) = CURRENT_DATE) AS cigarrillos_hoy,
-    COUNT(f.id) FILTER (WHERE DATE(f.fecha_envio) >= CURRENT_DATE - INTERVAL '7 days') AS cigarrillos_semana,
-    COUNT(f.id) FILTER (WHERE DATE(f.fecha_envio) >= CURRENT_DATE - INTERVAL '30 days') AS cigarrillos_mes
-FROM formularios f
-GROUP BY f.consumidor_id, f.habito->>'nombre', DATE(f.fecha_envio)
+    h.consumidor_id,
+    h.habito_nombre,
+    h.fecha,
+    h.cigarrillos AS total_cigarrillos,
+    CASE WHEN h.fecha = CURRENT_DATE THEN h.cigarrillos ELSE 0 END AS cigarrillos_hoy,
+    CASE WHEN h.fecha >= CURRENT_DATE - INTERVAL '7 days' THEN h.cigarrillos ELSE 0 END AS cigarrillos_semana,
+    CASE WHEN h.fecha >= CURRENT_DATE - INTERVAL '30 days' THEN h.cigarrillos ELSE 0 END AS cigarrillos_mes
+FROM resumenes_habito_diarios h
 ORDER BY fecha DESC;
 
 COMMENT ON VIEW vw_habit_tracking IS 'Daily cigarette/habit tracking with totals for timeline charts';
@@ -244,67 +247,30 @@ COMMENT ON VIEW vw_desires_stats IS 'Aggregated desire statistics by type with r
 -- Complete daily summary for main dashboard
 DROP VIEW IF EXISTS vw_daily_summary CASCADE;
 CREATE OR REPLACE VIEW vw_daily_summary AS
+-- Served from the resumenes_diarios rollup (one row per consumer and day,
+-- kept current by api/signals.py), so each consumer costs O(days)
 SELECT 
     c.id AS consumidor_id,
     CURRENT_DATE AS fecha,
-    -- Cigarettes/habits today
-    (SELECT COUNT(*) 
-     FROM formularios f 
-     WHERE f.consumidor_id = c.id 
-       AND DATE(f.fecha_envio) = CURRENT_DATE
-    ) AS cigarrillos_hoy,
-    -- Cigarettes this week
-    (SELECT COUNT(*) 
-     FROM formularios f 
-     WHERE f.consumidor_id = c.id 
-       AND DATE(f.fecha_envio) >= CURRENT_DATE - INTERVAL '7 days'
-    ) AS cigarrillos_semana,
-    -- Cigarettes this month
-    (SELECT COUNT(*) 
-     FROM formularios f 
-     WHERE f.consumidor_id = c.id 
-       AND DATE(f.fecha_envio) >= CURRENT_DATE - INTERVAL '30 days'
-    ) AS cigarrillos_mes,
+    -- Cigarettes/habits today, this week, this month
+    COALESCE(SUM(r.cigarrillos) FILTER (WHERE r.fecha = CURRENT_DATE), 0) AS cigarrillos_hoy,
+    COALESCE(SUM(r.cigarrillos) FILTER (WHERE r.fecha >= CURRENT_DATE - INTERVAL '7 days'), 0) AS cigarrillos_semana,
+    COALESCE(SUM(r.cigarrillos) FILTER (WHERE r.fecha >= CURRENT_DATE - INTERVAL '30 days'), 0) AS cigarrillos_mes,
     -- HR average today
-    (SELECT ROUND(AVG(v.hr_mean)::NUMERIC, 2)
-     FROM ventanas v
-     WHERE v.consumidor_id = c.id
-       AND DATE(v.window_start) = CURRENT_DATE
-    ) AS hr_promedio_hoy,
-    -- Desires today
-    (SELECT COUNT(*)
-     FROM deseos d
-     WHERE d.consumidor_id = c.id
-       AND DATE(d.created_at) = CURRENT_DATE
-    ) AS deseos_hoy,
-    -- Resolved desires today
-    (SELECT COUNT(*)
-     FROM deseos d
-     WHERE d.consumidor_id = c.id
-       AND DATE(d.updated_at) = CURRENT_DATE
-       AND d.resolved = TRUE
-    ) AS deseos_resueltos_hoy,
-    -- Active desires (unresolved)
-    (SELECT COUNT(*)
-     FROM deseos d
-     WHERE d.consumidor_id = c.id
-       AND d.resolved = FALSE
-    ) AS deseos_activos,
-    -- Predictions today
-    (SELECT COUNT(*)
-     FROM analisis a
-     JOIN ventanas v ON a.ventana_id = v.id
-     WHERE v.consumidor_id = c.id
-       AND DATE(v.window_start) = CURRENT_DATE
-    ) AS predicciones_hoy,
-    -- Total correct predictions (urge detected)
-    (SELECT COUNT(*)
-     FROM analisis a
-     JOIN ventanas v ON a.ventana_id = v.id
-     WHERE v.consumidor_id = c.id
-       AND a.urge_label = 1
-    ) AS total_predicciones_correctas
-FROM consumidores c;
+    ROUND((
+        SUM(r.hr_sum) FILTER (WHERE r.fecha = CURRENT_DATE) /
+        NULLIF(SUM(r.hr_count) FILTER (WHERE r.fecha = CURRENT_DATE), 0)
+    )::NUMERIC, 2) AS hr_promedio_hoy,
+    -- Desires created today, resolved today (by updated_at), still active
+    COALESCE(SUM(r.deseos) FILTER (WHERE r.fecha = CURRENT_DATE), 0) AS deseos_hoy,
+    COALESCE(SUM(r.deseos_resueltos) FILTER (WHERE r.fecha = CURRENT_DATE), 0) AS deseos_resueltos_hoy,
+    COALESCE(SUM(r.deseos_activos), 0) AS deseos_activos,
+    -- Predictions today, total correct predictions (urge detected)
+    COALESCE(SUM(r.predicciones) FILTER (WHERE r.fecha = CURRENT_DATE), 0) AS predicciones_hoy,
+    COALESCE(SUM(r.predicciones_urge), 0) AS total_predicciones_correctas
+FROM consumidores c
+LEFT JOIN resumenes_diarios r ON r.consumidor_id = c.id
+GROUP BY c.id;
 
 COMMENT ON VIEW vw_daily_summary IS 'Daily summary with all key metrics for main dashboard KPI cards';
 
@@ -315,52 +281,43 @@ COMMENT ON VIEW vw_daily_summary IS 'Daily summary with all key metrics for main
 -- Compare current week vs previous week
 DROP VIEW IF EXISTS vw_weekly_comparison CASCADE;
 CREATE OR REPLACE VIEW vw_weekly_comparison AS
+-- Served from the resumenes_diarios rollup
 SELECT 
-    c.id AS consumidor_id,
-    -- Current week (last 7 days)
-    (SELECT COUNT(*) 
-     FROM formularios f 
-     WHERE f.consumidor_id = c.id 
-       AND f.fecha_envio >= CURRENT_DATE - INTERVAL '7 days'
-    ) AS cigarrillos_semana_actual,
-    -- Previous week (8-14 days ago)
-    (SELECT COUNT(*) 
-     FROM formularios f 
-     WHERE f.consumidor_id = c.id 
-       AND f.fecha_envio >= CURRENT_DATE - INTERVAL '14 days'
-       AND f.fecha_envio < CURRENT_DATE - INTERVAL '7 days'
-    ) AS cigarrillos_semana_anterior,
+    semanas.consumidor_id,
+    semanas.cigarrillos_semana_actual,
+    semanas.cigarrillos_semana_anterior,
     -- Calculate percentage change
     CASE 
-        WHEN (SELECT COUNT(*) 
-              FROM formularios f 
-              WHERE f.consumidor_id = c.id 
-                AND f.fecha_envio >= CURRENT_DATE - INTERVAL '14 days'
-                AND f.fecha_envio < CURRENT_DATE - INTERVAL '7 days') > 0
+        WHEN semanas.cigarrillos_semana_anterior > 0
         THEN ROUND(
-            ((
-                (SELECT COUNT(*) FROM formularios f WHERE f.consumidor_id = c.id AND f.fecha_envio >= CURRENT_DATE - INTERVAL '7 days')::NUMERIC -
-                (SELECT COUNT(*) FROM formularios f WHERE f.consumidor_id = c.id AND f.fecha_envio >= CURRENT_DATE - INTERVAL '14 days' AND f.fecha_envio < CURRENT_DATE - INTERVAL '7 days')::NUMERIC
-            ) / 
-            NULLIF((SELECT COUNT(*) FROM formularios f WHERE f.consumidor_id = c.id AND f.fecha_envio >= CURRENT_DATE - INTERVAL '14 days' AND f.fecha_envio < CURRENT_DATE - INTERVAL '7 days')::NUMERIC, 0)
-            ) * 100,
+            ((semanas.cigarrillos_semana_actual - semanas.cigarrillos_semana_anterior)::NUMERIC /
+             semanas.cigarrillos_semana_anterior::NUMERIC) * 100,
             2
         )
         ELSE NULL
     END AS porcentaje_cambio,
-    -- Desires comparison
-    (SELECT COUNT(*) 
-     FROM deseos d 
-     WHERE d.consumidor_id = c.id 
-       AND d.created_at >= CURRENT_DATE - INTERVAL '7 days'
-    ) AS deseos_semana_actual,
-    (SELECT COUNT(*) 
-     FROM deseos d 
-     WHERE d.consumidor_id = c.id 
-       AND d.created_at >= CURRENT_DATE - INTERVAL '14 days'
-       AND d.created_at < CURRENT_DATE - INTERVAL '7 days'
-    ) AS deseos_semana_anterior
-FROM consumidores c;
+    semanas.deseos_semana_actual,
+    semanas.deseos_semana_anterior
+FROM (
+    SELECT 
+        c.id AS consumidor_id,
+        -- Current week (last 7 days)
+        COALESCE(SUM(r.cigarrillos) FILTER (WHERE r.fecha >= CURRENT_DATE - INTERVAL '7 days'), 0) AS cigarrillos_semana_actual,
+        -- Previous week (8-14 days ago)
+        COALESCE(SUM(r.cigarrillos) FILTER (
+            WHERE r.fecha >= CURRENT_DATE - INTERVAL '14 days'
+              AND r.fecha < CURRENT_DATE - INTERVAL '7 days'
+        ), 0) AS cigarrillos_semana_anterior,
+        -- Desires comparison
+        COALESCE(SUM(r.deseos) FILTER (WHERE r.fecha >= CURRENT_DATE - INTERVAL '7 days'), 0) AS deseos_semana_actual,
+        COALESCE(SUM(r.deseos) FILTER (
+            WHERE r.fecha >= CURRENT_DATE - INTERVAL '14 days'
+              AND r.fecha < CURRENT_DATE - INTERVAL '7 days'
+        ), 0) AS deseos_semana_anterior
+    FROM consumidores c
+    LEFT JOIN resumenes_diarios r ON r.consumidor_id = c.id
+    GROUP BY c.id
+) AS semanas;
 
 COMMENT ON VIEW vw_weekly_comparison IS 'Week-over-week comparison for progress tracking';
 
@@ -389,4 +346,74 @@ ON ventanas(consumidor_id, window_start DESC);
 
 CREATE INDEX IF NOT EXISTS idx_deseos_unresolved 
 ON deseos(consumidor_id, resolved) 
-WHERE resolved = FALSE;
\ No newline at end of file
+WHERE resolved = FALSE;
+
+-- ==========================================================
+-- MATERIALIZED VARIANTS
+-- ==========================================================
+-- Snapshots of the aggregate views above, served by the API when
+-- ?source=materialized (or DASHBOARD_MATERIALIZED_VIEWS) is used and
+-- refreshed CONCURRENTLY by the refresh_materialized_views Celery task.
+-- The unique index on each one is what allows REFRESH ... CONCURRENTLY,
+-- so readers are never blocked during a refresh. Timeline/tracking
+-- views stay live only. Run this section after the views: the
+-- DROP VIEW ... CASCADE statements above also drop these.
+
+DROP MATERIALIZED VIEW IF EXISTS mv_habit_tracking;
+CREATE MATERIALIZED VIEW mv_habit_tracking AS
+SELECT * FROM vw_habit_tracking;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_habit_tracking_key
+ON mv_habit_tracking(consumidor_id, habito_nombre, fecha);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_habit_stats;
+CREATE MATERIALIZED VIEW mv_habit_stats AS
+SELECT * FROM vw_habit_stats;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_habit_stats_key
+ON mv_habit_stats(consumidor_id, habito_nombre);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_heart_rate_stats;
+CREATE MATERIALIZED VIEW mv_heart_rate_stats AS
+SELECT * FROM vw_heart_rate_stats;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_heart_rate_stats_key
+ON mv_heart_rate_stats(consumidor_id);
+
+-- json has no equality operator, which REFRESH ... CONCURRENTLY needs
+-- to diff rows, so the window details are stored as jsonb
+DROP MATERIALIZED VIEW IF EXISTS mv_heart_rate_today;
+CREATE MATERIALIZED VIEW mv_heart_rate_today AS
+SELECT 
+    consumidor_id,
+    fecha,
+    total_ventanas,
+    ventanas_con_datos,
+    promedio_dia,
+    minimo_dia,
+    maximo_dia,
+    ventanas::JSONB AS ventanas
+FROM vw_heart_rate_today;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_heart_rate_today_key
+ON mv_heart_rate_today(consumidor_id);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_prediction_summary;
+CREATE MATERIALIZED VIEW mv_prediction_summary AS
+SELECT * FROM vw_prediction_summary;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_prediction_summary_key
+ON mv_prediction_summary(consumidor_id);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_desires_stats;
+CREATE MATERIALIZED VIEW mv_desires_stats AS
+SELECT * FROM vw_desires_stats;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_desires_stats_key
+ON mv_desires_stats(consumidor_id, deseo_tipo);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_daily_summary;
+CREATE MATERIALIZED VIEW mv_daily_summary AS
+SELECT * FROM vw_daily_summary;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_daily_summary_key
+ON mv_daily_summary(consumidor_id);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_weekly_comparison;
+CREATE MATERIALIZED VIEW mv_weekly_comparison AS
+SELECT * FROM vw_weekly_comparison;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_weekly_comparison_key
+ON mv_weekly_comparison(consumidor_id);
@@ -4,6 +4,8 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_shutting_down
+from django.conf import settings
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WearableApi.settings')
 app = Celery('WearableApi')
@@ -30,6 +32,21 @@ app.conf.beat_schedule = {
         }
     },
     
+    # Correct per-ventana lectura counters against the real row count
+    'reconcile-lectura-counters': {
+        'task': 'api.tasks.reconcile_lectura_counters',
+        'schedule': crontab(minute=15),  # Hourly
+    },
+    
+    # Refresh the mv_* dashboard views whose interval has passed
+    'refresh-materialized-views': {
+        'task': 'api.tasks.refresh_materialized_views',
+        'schedule': 60.0,  # Every minute, intervals are per view
+        'options': {
+            'expires': 55.0,
+        }
+    },
+    
     # Optional: Daily cleanup of old ventanas without data
     'cleanup-empty-ventanas': {
         'task': 'api.tasks.cleanup_empty_ventanas',
@@ -37,17 +54,26 @@ app.conf.beat_schedule = {
     },
 }
 
+@app.on_after_finalize.connect
+def schedule_lectura_buffer_flush(sender, **kwargs):
+    """
+    Persist readings queued by the Redis write-behind buffer every
+    LECTURA_BUFFER_FLUSH_INTERVAL seconds. Added once the app is finalized
+    because this module is imported while Django settings are still loading.
+    """
+    interval = settings.LECTURA_BUFFER_FLUSH_INTERVAL
+    sender.add_periodic_task(
+        interval,
+        sender.signature('api.tasks.flush_lectura_buffer'),
+        name='flush-lectura-buffer',
+        expires=interval
+    )
+
 app.conf.timezone = 'America/Tijuana'  # Match your settings.py timezone
 
 # Task result expiration
 app.conf.result_expires = 3600  # Results expire after 1 hour
 
-# Task time limit
-app.conf.task_time_limit = 300  # 5 minutes max per task
-
-# Task soft time limit (sends warning)
-app.conf.task_soft_time_limit = 240  # 4 minutes warning
-
 # Enable task events for monitoring
 app.conf.worker_send_task_events = True
 app.conf.task_send_sent_event = True
@@ -56,6 +82,14 @@ app.conf.task_send_sent_event = True
 app.conf.worker_prefetch_multiplier = 4
 app.conf.worker_max_tasks_per_child = 1000
 
+@worker_shutting_down.connect
+def drain_lectura_buffer(**kwargs):
+    """Persist buffered readings before the worker goes away"""
+    from api.services import LecturaBuffer
+    
+    if LecturaBuffer.is_enabled():
+        LecturaBuffer.drain()
+
 @app.task(bind=True)
 def debug_task(self):
     """Debug task to test Celery is working"""
@@ -66,6 +66,14 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-none-match',
+    'if-modified-since',
+]
+
+# Lets browser clients read the validators for conditional GETs
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'last-modified',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -346,9 +354,17 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'America/Tijuana'
-CELERY_TASK_TIME_LIMIT = 30 * 60
+# Hard / soft limit in seconds for every task, long tasks such as
+# train_craving_model set their own
+CELERY_TASK_TIME_LIMIT = int(os.environ.get('CELERY_TASK_TIME_LIMIT', '300'))
+CELERY_TASK_SOFT_TIME_LIMIT = int(os.environ.get('CELERY_TASK_SOFT_TIME_LIMIT', '240'))
 CELERY_RESULT_EXPIRES = 60 * 60 * 24
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+# Model training runs on its own low-priority queue, served by a
+# dedicated worker: celery -A WearableApi worker -Q training -c 1 --prefetch-multiplier=1
+CELERY_TASK_ROUTES = {
+    'api.tasks.train_craving_model': {'queue': 'training'},
+}
 
 SENTRY_DSN = os.environ.get('SENTRY_DSN')
 
@@ -372,7 +388,15 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
         'LOCATION': os.environ.get('CELERY_BROKER_URL', 'redis://localhost:6379/1'),
-    }
+    },
+    # Per-process L1 in front of Redis for dashboard responses
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard-l1',
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('DASHBOARD_CACHE_L1_MAX_ENTRIES', '1000')),
+        },
+    },
 }
 
 if not DEBUG:
@@ -388,6 +412,80 @@ if not DEBUG:
 
 ML_MODELS_DIR = os.path.join(BASE_DIR, 'models')
 os.makedirs(ML_MODELS_DIR, exist_ok=True)
+ML_MODEL_PATH = os.path.join(ML_MODELS_DIR, 'smoking_craving_model.pkl')
+# Scaler/coefficients exported by testers/train_model.py, preferred over
+# the pickle when present so workers score with NumPy only
+ML_MODEL_ARTIFACT_PATH = os.path.join(ML_MODELS_DIR, 'smoking_craving_model.npz')
+# Seconds between checks of the model file mtime and version key
+ML_MODEL_CHECK_INTERVAL = float(os.environ.get('ML_MODEL_CHECK_INTERVAL', '5'))
+
+# 'direct' runs one predict_smoking_craving task per request,
+# 'batched' queues requests in Redis and scores them as micro-batches
+PREDICTION_MODE = os.environ.get('PREDICTION_MODE', 'direct')
+PREDICTION_BATCH_REDIS_URL = os.environ.get('PREDICTION_BATCH_REDIS_URL', CACHES['default']['LOCATION'])
+PREDICTION_BATCH_MAX_SIZE = int(os.environ.get('PREDICTION_BATCH_MAX_SIZE', '64'))
+PREDICTION_BATCH_MAX_WAIT_MS = int(os.environ.get('PREDICTION_BATCH_MAX_WAIT_MS', '50'))
+# Time budget of POST /predict/?mode=sync before it falls back to a task
+PREDICTION_SYNC_BUDGET_MS = int(os.environ.get('PREDICTION_SYNC_BUDGET_MS', '250'))
+
+# Dashboard views answered from their mv_* materialized variant by default
+# (comma separated vw_* names), ?source=live|materialized overrides it per request
+DASHBOARD_MATERIALIZED_VIEWS = [
+    name.strip() for name in os.environ.get('DASHBOARD_MATERIALIZED_VIEWS', '').split(',') if name.strip()
+]
+# Seconds between REFRESH MATERIALIZED VIEW CONCURRENTLY of each variant,
+# per view overrides as "vw_heart_rate_today=60,vw_weekly_comparison=3600"
+MATERIALIZED_VIEW_REFRESH_INTERVAL = int(os.environ.get('MATERIALIZED_VIEW_REFRESH_INTERVAL', '300'))
+MATERIALIZED_VIEW_REFRESH_INTERVALS = {
+    name.strip(): int(seconds)
+    for name, _, seconds in (
+        item.partition('=') for item in os.environ.get('MATERIALIZED_VIEW_REFRESH_INTERVALS', '').split(',')
+    )
+    if name.strip() and seconds.strip()
+}
+
+# Per-consumer response cache of the dashboard viewsets, invalidated by
+# a data version bumped on writes. Seconds in Redis and in the local L1
+DASHBOARD_CACHE_ENABLED = os.environ.get('DASHBOARD_CACHE_ENABLED', 'True').lower() in ('true', '1', 'yes')
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', '300'))
+DASHBOARD_CACHE_L1_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_L1_TIMEOUT', '60'))
+
+# Threads running the sections of GET /api/dashboard/ per process, each
+# may keep a database connection open (CONN_MAX_AGE)
+DASHBOARD_MAX_WORKERS = int(os.environ.get('DASHBOARD_MAX_WORKERS', '8'))
+# Unread notifications included in GET /api/dashboard/
+DASHBOARD_NOTIFICATIONS_LIMIT = int(os.environ.get('DASHBOARD_NOTIFICATIONS_LIMIT', '5'))
+
+# Points of /api/dashboard/heart-rate/series/ by default and at most, and how
+# many times finer the SQL buckets are before LTTB picks the points
+HR_SERIES_DEFAULT_POINTS = int(os.environ.get('HR_SERIES_DEFAULT_POINTS', '300'))
+HR_SERIES_MAX_POINTS = int(os.environ.get('HR_SERIES_MAX_POINTS', '2000'))
+HR_SERIES_LTTB_OVERSAMPLING = int(os.environ.get('HR_SERIES_LTTB_OVERSAMPLING', '4'))
+
+# Sensor ingestion
+LECTURA_BATCH_MAX_SIZE = int(os.environ.get('LECTURA_BATCH_MAX_SIZE', '1000'))
+LECTURA_CALCULATION_INTERVAL = int(os.environ.get('LECTURA_CALCULATION_INTERVAL', '5'))
+# Seconds a binary frame's base_timestamp may lie before its ventana or in
+# the future and still be used as the readings' created_at
+LECTURA_FRAME_CLOCK_SKEW = int(os.environ.get('LECTURA_FRAME_CLOCK_SKEW', '300'))
+
+# 'direct' writes each reading to PostgreSQL inside the request,
+# 'buffered' queues it in Redis and lets flush_lectura_buffer persist it
+LECTURA_INGESTION_MODE = os.environ.get('LECTURA_INGESTION_MODE', 'direct')
+LECTURA_BUFFER_REDIS_URL = os.environ.get('LECTURA_BUFFER_REDIS_URL', CACHES['default']['LOCATION'])
+LECTURA_BUFFER_CHUNK_SIZE = int(os.environ.get('LECTURA_BUFFER_CHUNK_SIZE', '5000'))
+LECTURA_BUFFER_FLUSH_INTERVAL = float(os.environ.get('LECTURA_BUFFER_FLUSH_INTERVAL', '5'))
+LECTURA_BUFFER_LOCK_TIMEOUT = int(os.environ.get('LECTURA_BUFFER_LOCK_TIMEOUT', '120'))
+# Chunks taken from one ventana per flush, the rest waits for the next one
+LECTURA_BUFFER_MAX_CHUNKS = int(os.environ.get('LECTURA_BUFFER_MAX_CHUNKS', '10'))
+# Failed flushes of a ventana's chunk before it is moved to a dead-letter list
+LECTURA_BUFFER_MAX_RETRIES = int(os.environ.get('LECTURA_BUFFER_MAX_RETRIES', '5'))
+
+# Recompute ventana statistics from every lectura and compare them with
+# the incremental accumulator on each calculate_ventana_statistics run
+VENTANA_STATS_VERIFY = os.environ.get('VENTANA_STATS_VERIFY', 'False').lower() in ('true', '1', 'yes')
+# Pending ventanas handled per calculate_ventana_statistics_batch task
+VENTANA_STATS_CHUNK_SIZE = int(os.environ.get('VENTANA_STATS_CHUNK_SIZE', '500'))
 
 print("="*60)
 print("🚀 WearableApi Configuration")
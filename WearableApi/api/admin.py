@@ -1,7 +1,9 @@
 
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 from api.models import *
+from api.services import DailyRollupService
 
 class ConsumidorInline(admin.StackedInline):
     model = Consumidor
@@ -244,7 +246,13 @@ class DeseoAdmin(admin.ModelAdmin):
     resolved_display.short_description = 'Estado'
     
     def mark_as_resolved(self, request, queryset):
-        count = queryset.update(resolved=True)
+        days = list(queryset.values_list('consumidor_id', 'created_at', 'updated_at'))
+        now = timezone.now()
+        # updated_at moves like save() would, it feeds ETags and the rollups
+        count = queryset.update(resolved=True, updated_at=now)
+        # queryset.update() sends no post_save, refresh the daily rollups here
+        for consumidor_id, created_at, updated_at in days:
+            DailyRollupService.touch(consumidor_id, created_at, updated_at, now)
         self.message_user(request, f'{count} desires marked as resolved.')
     mark_as_resolved.short_description = 'Mark selected as resolved'
 
@@ -269,12 +277,12 @@ class NotificacionAdmin(admin.ModelAdmin):
     leida_display.short_description = 'Estado'
     
     def mark_as_read(self, request, queryset):
-        count = queryset.update(leida=True)
+        count = queryset.update(leida=True, updated_at=timezone.now())
         self.message_user(request, f'{count} notifications marked as read.')
     mark_as_read.short_description = 'Mark selected as read'
     
     def mark_as_unread(self, request, queryset):
-        count = queryset.update(leida=False)
+        count = queryset.update(leida=False, updated_at=timezone.now())
         self.message_user(request, f'{count} notifications marked as unread.')
     mark_as_unread.short_description = 'Mark selected as unread'
 
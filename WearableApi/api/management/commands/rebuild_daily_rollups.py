@@ -0,0 +1,75 @@
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from api.models import Consumidor, ResumenDiario, ResumenHabitoDiario
+from api.services import DailyRollupService
+from api.services.daily_rollup import ROLLUP_COLUMNS
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily rollup tables (resumenes_diarios, resumenes_habito_diarios) "
+        "from formularios, deseos, analisis and ventanas, repairing any drift of the "
+        "incremental updates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumidor',
+            type=int,
+            help='Only rebuild the rows of this consumidor id'
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report the rows that would change and roll back'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("rebuild_daily_rollups requires PostgreSQL")
+
+        consumidor_id = options['consumidor']
+        if consumidor_id is not None and not Consumidor.objects.filter(id=consumidor_id).exists():
+            raise CommandError(f"Consumidor {consumidor_id} does not exist")
+
+        started = time.perf_counter()
+
+        with transaction.atomic():
+            before = self.snapshot(consumidor_id)
+            stats = DailyRollupService.rebuild(consumidor_id)
+            after = self.snapshot(consumidor_id)
+
+            if options['check']:
+                transaction.set_rollback(True)
+
+        drift = {key for key in before.keys() | after.keys() if before.get(key) != after.get(key)}
+        for key in sorted(drift, key=str)[:20]:
+            self.stdout.write(f"   {key}: {before.get(key)} -> {after.get(key)}")
+        if len(drift) > 20:
+            self.stdout.write(f"   ... and {len(drift) - 20} more")
+
+        verb = "would change" if options['check'] else "changed"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['resumenes_diarios']:,} days and {stats['resumenes_habito_diarios']:,} habit days "
+            f"recomputed in {time.perf_counter() - started:.1f}s, {len(drift):,} rows {verb}"
+        ))
+
+    @staticmethod
+    def snapshot(consumidor_id):
+        """Current rollup rows keyed by (table, consumidor, [habito,] fecha)"""
+        daily = ResumenDiario.objects.all()
+        habits = ResumenHabitoDiario.objects.all()
+        if consumidor_id is not None:
+            daily = daily.filter(consumidor_id=consumidor_id)
+            habits = habits.filter(consumidor_id=consumidor_id)
+
+        rows = {}
+        for row in daily.values_list('consumidor_id', 'fecha', *ROLLUP_COLUMNS):
+            rows[('dia',) + row[:2]] = tuple(round(value, 6) for value in row[2:])
+        for consumidor, habito, fecha, cigarrillos in habits.values_list(
+            'consumidor_id', 'habito_nombre', 'fecha', 'cigarrillos'
+        ):
+            rows[('habito', consumidor, habito, fecha)] = (cigarrillos,)
+
+        return rows
@@ -0,0 +1,36 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_lectura_count(apps, schema_editor):
+    Ventana = apps.get_model('api', 'Ventana')
+    Lectura = apps.get_model('api', 'Lectura')
+
+    Ventana.objects.update(
+        lectura_count=Coalesce(
+            models.Subquery(
+                Lectura.objects.filter(ventana_id=models.OuterRef('pk'))
+                .order_by()
+                .values('ventana_id')
+                .annotate(total=models.Count('id'))
+                .values('total')
+            ),
+            0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_vwheartratetoday_alter_vwdailysummary_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ventana',
+            name='lectura_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of lecturas stored in this window'),
+        ),
+        migrations.RunPython(backfill_lectura_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_ventana_lectura_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AcumuladorVentana',
+            fields=[
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Timestamp when the record was last updated')),
+                ('ventana', models.OneToOneField(help_text='Window these running statistics belong to', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='acumulador', serialize=False, to='api.ventana')),
+                ('lectura_count', models.PositiveIntegerField(default=0, help_text='Number of lecturas folded into this accumulator')),
+                ('hr_count', models.PositiveIntegerField(default=0, help_text='Number of non-null heart rate values')),
+                ('hr_mean', models.FloatField(default=0.0, help_text='Running mean of heart rate (Welford)')),
+                ('hr_m2', models.FloatField(default=0.0, help_text='Running sum of squared deviations of heart rate (Welford)')),
+                ('accel_counts', models.JSONField(default=list, help_text='Non-null value count per accelerometer axis [x, y, z]')),
+                ('accel_sum_squares', models.FloatField(default=0.0, help_text='Running sum of squared accelerometer values')),
+                ('gyro_counts', models.JSONField(default=list, help_text='Non-null value count per gyroscope axis [x, y, z]')),
+                ('gyro_sum_squares', models.FloatField(default=0.0, help_text='Running sum of squared gyroscope values')),
+            ],
+            options={
+                'verbose_name': 'Acumulador de Ventana',
+                'verbose_name_plural': 'Acumuladores de Ventana',
+                'db_table': 'acumuladores_ventana',
+            },
+        ),
+    ]
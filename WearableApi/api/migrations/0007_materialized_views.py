@@ -0,0 +1,186 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_acumuladorventana'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MvDailySummary',
+            fields=[
+                ('consumidor_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('cigarrillos_hoy', models.IntegerField()),
+                ('cigarrillos_semana', models.IntegerField()),
+                ('cigarrillos_mes', models.IntegerField()),
+                ('hr_promedio_hoy', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('deseos_hoy', models.IntegerField()),
+                ('deseos_resueltos_hoy', models.IntegerField()),
+                ('deseos_activos', models.IntegerField()),
+                ('predicciones_hoy', models.IntegerField()),
+                ('total_predicciones_correctas', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Daily Summary (materialized)',
+                'verbose_name_plural': 'Daily Summary (materialized)',
+                'db_table': 'mv_daily_summary',
+                'ordering': ['-fecha'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MvDesiresStats',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('consumidor_id', models.IntegerField()),
+                ('deseo_tipo', models.CharField(max_length=50)),
+                ('total_deseos', models.IntegerField()),
+                ('deseos_resueltos', models.IntegerField()),
+                ('deseos_activos', models.IntegerField()),
+                ('porcentaje_resolucion', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('promedio_horas_resolucion', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('deseos_hoy', models.IntegerField()),
+                ('deseos_resueltos_hoy', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Desires Statistics (materialized)',
+                'verbose_name_plural': 'Desires Statistics (materialized)',
+                'db_table': 'mv_desires_stats',
+                'ordering': ['consumidor_id', 'deseo_tipo'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MvHabitStats',
+            fields=[
+                ('consumidor_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('habito_nombre', models.CharField(max_length=50)),
+                ('total_eventos', models.IntegerField()),
+                ('primer_registro', models.DateTimeField()),
+                ('ultimo_registro', models.DateTimeField()),
+                ('promedio_diario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('eventos_mes_actual', models.IntegerField()),
+                ('eventos_mes_anterior', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Habit Statistics (materialized)',
+                'verbose_name_plural': 'Habit Statistics (materialized)',
+                'db_table': 'mv_habit_stats',
+                'ordering': ['consumidor_id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MvHabitTracking',
+            fields=[
+                ('consumidor_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('habito_nombre', models.CharField(max_length=50)),
+                ('fecha', models.DateField()),
+                ('total_cigarrillos', models.IntegerField()),
+                ('cigarrillos_hoy', models.IntegerField()),
+                ('cigarrillos_semana', models.IntegerField()),
+                ('cigarrillos_mes', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Habit Tracking (materialized)',
+                'verbose_name_plural': 'Habit Tracking (materialized)',
+                'db_table': 'mv_habit_tracking',
+                'ordering': ['-fecha'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MvHeartRateStats',
+            fields=[
+                ('consumidor_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('total_mediciones', models.IntegerField()),
+                ('hr_promedio_general', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('hr_minimo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('hr_maximo', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('hr_desviacion', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('hr_promedio_hoy', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('hr_promedio_semana', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+            ],
+            options={
+                'verbose_name': 'Heart Rate Statistics (materialized)',
+                'verbose_name_plural': 'Heart Rate Statistics (materialized)',
+                'db_table': 'mv_heart_rate_stats',
+                'ordering': ['consumidor_id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MvHeartRateToday',
+            fields=[
+                ('consumidor_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField()),
+                ('total_ventanas', models.IntegerField()),
+                ('ventanas_con_datos', models.IntegerField()),
+                ('promedio_dia', models.DecimalField(decimal_places=1, max_digits=10, null=True)),
+                ('minimo_dia', models.DecimalField(decimal_places=1, max_digits=10, null=True)),
+                ('maximo_dia', models.DecimalField(decimal_places=1, max_digits=10, null=True)),
+                ('ventanas', models.JSONField()),
+            ],
+            options={
+                'verbose_name': 'Heart Rate Today (materialized)',
+                'verbose_name_plural': 'Heart Rate Today (materialized)',
+                'db_table': 'mv_heart_rate_today',
+                'ordering': ['consumidor_id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MvPredictionSummary',
+            fields=[
+                ('consumidor_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('total_predicciones', models.IntegerField()),
+                ('predicciones_urge', models.IntegerField()),
+                ('predicciones_no_urge', models.IntegerField()),
+                ('porcentaje_urge', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('predicciones_hoy', models.IntegerField()),
+                ('predicciones_semana', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Prediction Summary (materialized)',
+                'verbose_name_plural': 'Prediction Summary (materialized)',
+                'db_table': 'mv_prediction_summary',
+                'ordering': ['consumidor_id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MvWeeklyComparison',
+            fields=[
+                ('consumidor_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('cigarrillos_semana_actual', models.IntegerField()),
+                ('cigarrillos_semana_anterior', models.IntegerField()),
+                ('porcentaje_cambio', models.DecimalField(decimal_places=2, max_digits=5, null=True)),
+                ('deseos_semana_actual', models.IntegerField()),
+                ('deseos_semana_anterior', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Weekly Comparison (materialized)',
+                'verbose_name_plural': 'Weekly Comparison (materialized)',
+                'db_table': 'mv_weekly_comparison',
+                'ordering': ['consumidor_id'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='MaterializedViewRefresh',
+            fields=[
+                ('view_name', models.CharField(help_text='Live view whose mv_* variant was refreshed (e.g. vw_daily_summary)', max_length=63, primary_key=True, serialize=False)),
+                ('refreshed_at', models.DateTimeField(help_text='When the last REFRESH MATERIALIZED VIEW finished')),
+                ('duration_ms', models.FloatField(default=0.0, help_text='How long the last refresh took')),
+            ],
+            options={
+                'verbose_name': 'Materialized View Refresh',
+                'verbose_name_plural': 'Materialized View Refreshes',
+                'db_table': 'materialized_view_refreshes',
+                'ordering': ['view_name'],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_materialized_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Timestamp when the record was last updated')),
+                ('fecha', models.DateField(help_text='Day of the events (DATE() of their timestamp, as in Views.sql)')),
+                ('cigarrillos', models.PositiveIntegerField(default=0, help_text='Formularios sent this day')),
+                ('deseos', models.PositiveIntegerField(default=0, help_text='Deseos created this day')),
+                ('deseos_activos', models.PositiveIntegerField(default=0, help_text='Deseos created this day that are still unresolved')),
+                ('deseos_resueltos', models.PositiveIntegerField(default=0, help_text='Resolved deseos last updated this day')),
+                ('predicciones', models.PositiveIntegerField(default=0, help_text='Analisis of ventanas starting this day')),
+                ('predicciones_urge', models.PositiveIntegerField(default=0, help_text='Analisis of ventanas starting this day with urge_label = 1')),
+                ('hr_sum', models.FloatField(default=0.0, help_text='Sum of hr_mean of ventanas starting this day')),
+                ('hr_count', models.PositiveIntegerField(default=0, help_text='Ventanas starting this day with an hr_mean')),
+                ('consumidor', models.ForeignKey(help_text='Consumer these daily counts belong to', on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_diarios', to='api.consumidor')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario',
+                'verbose_name_plural': 'Resúmenes Diarios',
+                'db_table': 'resumenes_diarios',
+                'ordering': ['-fecha'],
+                'constraints': [models.UniqueConstraint(fields=('consumidor', 'fecha'), name='unique_resumen_diario')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenHabitoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the record was created')),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Timestamp when the record was last updated')),
+                ('habito_nombre', models.CharField(help_text="habito->>'nombre' of the formularios, 'Sin hábito' when missing", max_length=50)),
+                ('fecha', models.DateField(help_text='Day the formularios were sent')),
+                ('cigarrillos', models.PositiveIntegerField(default=0, help_text='Formularios sent this day for this habit')),
+                ('consumidor', models.ForeignKey(help_text='Consumer these daily counts belong to', on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_habito_diarios', to='api.consumidor')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Hábito Diario',
+                'verbose_name_plural': 'Resúmenes de Hábito Diarios',
+                'db_table': 'resumenes_habito_diarios',
+                'ordering': ['-fecha'],
+                'constraints': [models.UniqueConstraint(fields=('consumidor', 'habito_nombre', 'fecha'), name='unique_resumen_habito_diario')],
+            },
+        ),
+    ]
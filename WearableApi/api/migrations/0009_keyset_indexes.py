@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:50
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # lecturas is large, build the indexes without locking writes
+    atomic = False
+
+    dependencies = [
+        ('api', '0008_daily_rollups'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='analisis',
+            index=models.Index(fields=['created_at', 'id'], name='analisis_created_411dce_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='lectura',
+            index=models.Index(fields=['created_at', 'id'], name='lecturas_created_1412e5_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lectura',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='Timestamp when the record was created'),
+        ),
+    ]
@@ -24,7 +24,8 @@ from .form import (
 
 from .sensor import (
     Ventana,
-    Lectura
+    Lectura,
+    AcumuladorVentana
 )
 
 from .analysis import (
@@ -35,6 +36,11 @@ from .analysis import (
     NotificacionTipoChoices
 )
 
+from .rollup import (
+    ResumenDiario,
+    ResumenHabitoDiario
+)
+
 from .dashboard import (
     VwHabitTracking,
     VwHabitStats,
@@ -46,7 +52,16 @@ from .dashboard import (
     VwDesiresTracking,
     VwDesiresStats,
     VwDailySummary,
-    VwWeeklyComparison
+    VwWeeklyComparison,
+    MvHabitTracking,
+    MvHabitStats,
+    MvHeartRateStats,
+    MvHeartRateToday,
+    MvPredictionSummary,
+    MvDesiresStats,
+    MvDailySummary,
+    MvWeeklyComparison,
+    MaterializedViewRefresh
 )
 
 __all__ = [
@@ -71,6 +86,7 @@ __all__ = [
     
     'Ventana',
     'Lectura',
+    'AcumuladorVentana',
     
     'Analisis',
     'Deseo',
@@ -78,6 +94,9 @@ __all__ = [
     'DeseoTipoChoices',
     'NotificacionTipoChoices',
     
+    'ResumenDiario',
+    'ResumenHabitoDiario',
+    
     'VwHabitTracking',
     'VwHabitStats',
     'VwHeartRateTimeline',
@@ -89,5 +108,14 @@ __all__ = [
     'VwDesiresStats',
     'VwDailySummary',
     'VwWeeklyComparison',
+    'MvHabitTracking',
+    'MvHabitStats',
+    'MvHeartRateStats',
+    'MvHeartRateToday',
+    'MvPredictionSummary',
+    'MvDesiresStats',
+    'MvDailySummary',
+    'MvWeeklyComparison',
+    'MaterializedViewRefresh',
 ]
 
@@ -67,6 +67,8 @@ class Analisis(TimeStampedModel):
         indexes = [
             models.Index(fields=['ventana']),
             models.Index(fields=['probabilidad_modelo']),
+            # Keyset pagination of the analisis endpoint
+            models.Index(fields=['created_at', 'id']),
         ]
         constraints = [
             models.CheckConstraint(
@@ -1,7 +1,7 @@
 
 from django.db import models
 
-class VwHabitTracking(models.Model):
+class HabitTrackingColumns(models.Model):
     
     consumidor_id = models.IntegerField(primary_key=True)
     habito_nombre = models.CharField(max_length=50)
@@ -11,6 +11,11 @@ class VwHabitTracking(models.Model):
     cigarrillos_semana = models.IntegerField()
     cigarrillos_mes = models.IntegerField()
     
+    class Meta:
+        abstract = True
+
+class VwHabitTracking(HabitTrackingColumns):
+
     class Meta:
         managed = False
         db_table = 'vw_habit_tracking'
@@ -18,7 +23,16 @@ class VwHabitTracking(models.Model):
         verbose_name_plural = 'Habit Tracking'
         ordering = ['-fecha']
 
-class VwHabitStats(models.Model):
+class MvHabitTracking(HabitTrackingColumns):
+
+    class Meta:
+        managed = False
+        db_table = 'mv_habit_tracking'
+        verbose_name = 'Habit Tracking (materialized)'
+        verbose_name_plural = 'Habit Tracking (materialized)'
+        ordering = ['-fecha']
+
+class HabitStatsColumns(models.Model):
     
     consumidor_id = models.IntegerField(primary_key=True)
     habito_nombre = models.CharField(max_length=50)
@@ -29,6 +43,11 @@ class VwHabitStats(models.Model):
     eventos_mes_actual = models.IntegerField()
     eventos_mes_anterior = models.IntegerField()
     
+    class Meta:
+        abstract = True
+
+class VwHabitStats(HabitStatsColumns):
+
     class Meta:
         managed = False
         db_table = 'vw_habit_stats'
@@ -36,6 +55,15 @@ class VwHabitStats(models.Model):
         verbose_name_plural = 'Habit Statistics'
         ordering = ['consumidor_id']
 
+class MvHabitStats(HabitStatsColumns):
+
+    class Meta:
+        managed = False
+        db_table = 'mv_habit_stats'
+        verbose_name = 'Habit Statistics (materialized)'
+        verbose_name_plural = 'Habit Statistics (materialized)'
+        ordering = ['consumidor_id']
+
 class VwHeartRateTimeline(models.Model):
     
     id = models.IntegerField(primary_key=True)
@@ -56,7 +84,7 @@ class VwHeartRateTimeline(models.Model):
         verbose_name_plural = 'Heart Rate Timeline'
         ordering = ['-fecha', '-hora']
 
-class VwHeartRateStats(models.Model):
+class HeartRateStatsColumns(models.Model):
     
     consumidor_id = models.IntegerField(primary_key=True)
     total_mediciones = models.IntegerField()
@@ -67,6 +95,11 @@ class VwHeartRateStats(models.Model):
     hr_promedio_hoy = models.DecimalField(max_digits=10, decimal_places=2, null=True)
     hr_promedio_semana = models.DecimalField(max_digits=10, decimal_places=2, null=True)
     
+    class Meta:
+        abstract = True
+
+class VwHeartRateStats(HeartRateStatsColumns):
+
     class Meta:
         managed = False
         db_table = 'vw_heart_rate_stats'
@@ -74,7 +107,16 @@ class VwHeartRateStats(models.Model):
         verbose_name_plural = 'Heart Rate Statistics'
         ordering = ['consumidor_id']
 
-class VwHeartRateToday(models.Model):
+class MvHeartRateStats(HeartRateStatsColumns):
+
+    class Meta:
+        managed = False
+        db_table = 'mv_heart_rate_stats'
+        verbose_name = 'Heart Rate Statistics (materialized)'
+        verbose_name_plural = 'Heart Rate Statistics (materialized)'
+        ordering = ['consumidor_id']
+
+class HeartRateTodayColumns(models.Model):
     
     consumidor_id = models.IntegerField(primary_key=True)
     fecha = models.DateField()
@@ -85,6 +127,11 @@ class VwHeartRateToday(models.Model):
     maximo_dia = models.DecimalField(max_digits=10, decimal_places=1, null=True)
     ventanas = models.JSONField()
     
+    class Meta:
+        abstract = True
+
+class VwHeartRateToday(HeartRateTodayColumns):
+
     class Meta:
         managed = False
         db_table = 'vw_heart_rate_today'
@@ -92,6 +139,15 @@ class VwHeartRateToday(models.Model):
         verbose_name_plural = 'Heart Rate Today'
         ordering = ['consumidor_id']
 
+class MvHeartRateToday(HeartRateTodayColumns):
+
+    class Meta:
+        managed = False
+        db_table = 'mv_heart_rate_today'
+        verbose_name = 'Heart Rate Today (materialized)'
+        verbose_name_plural = 'Heart Rate Today (materialized)'
+        ordering = ['consumidor_id']
+
 class VwPredictionTimeline(models.Model):
     
     analisis_id = models.IntegerField(primary_key=True)
@@ -112,7 +168,7 @@ class VwPredictionTimeline(models.Model):
         verbose_name_plural = 'Prediction Timeline'
         ordering = ['-fecha', '-hora']
 
-class VwPredictionSummary(models.Model):
+class PredictionSummaryColumns(models.Model):
     
     consumidor_id = models.IntegerField(primary_key=True)
     total_predicciones = models.IntegerField()
@@ -122,6 +178,11 @@ class VwPredictionSummary(models.Model):
     predicciones_hoy = models.IntegerField()
     predicciones_semana = models.IntegerField()
     
+    class Meta:
+        abstract = True
+
+class VwPredictionSummary(PredictionSummaryColumns):
+
     class Meta:
         managed = False
         db_table = 'vw_prediction_summary'
@@ -129,6 +190,15 @@ class VwPredictionSummary(models.Model):
         verbose_name_plural = 'Prediction Summary'
         ordering = ['consumidor_id']
 
+class MvPredictionSummary(PredictionSummaryColumns):
+
+    class Meta:
+        managed = False
+        db_table = 'mv_prediction_summary'
+        verbose_name = 'Prediction Summary (materialized)'
+        verbose_name_plural = 'Prediction Summary (materialized)'
+        ordering = ['consumidor_id']
+
 class VwDesiresTracking(models.Model):
     
     deseo_id = models.IntegerField(primary_key=True)
@@ -149,7 +219,7 @@ class VwDesiresTracking(models.Model):
         verbose_name_plural = 'Desires Tracking'
         ordering = ['-fecha_creacion']
 
-class VwDesiresStats(models.Model):
+class DesiresStatsColumns(models.Model):
     
     id = models.IntegerField(primary_key=True)
     consumidor_id = models.IntegerField()
@@ -162,6 +232,11 @@ class VwDesiresStats(models.Model):
     deseos_hoy = models.IntegerField()
     deseos_resueltos_hoy = models.IntegerField()
     
+    class Meta:
+        abstract = True
+
+class VwDesiresStats(DesiresStatsColumns):
+
     class Meta:
         managed = False
         db_table = 'vw_desires_stats'
@@ -169,7 +244,16 @@ class VwDesiresStats(models.Model):
         verbose_name_plural = 'Desires Statistics'
         ordering = ['consumidor_id', 'deseo_tipo']
 
-class VwDailySummary(models.Model):
+class MvDesiresStats(DesiresStatsColumns):
+
+    class Meta:
+        managed = False
+        db_table = 'mv_desires_stats'
+        verbose_name = 'Desires Statistics (materialized)'
+        verbose_name_plural = 'Desires Statistics (materialized)'
+        ordering = ['consumidor_id', 'deseo_tipo']
+
+class DailySummaryColumns(models.Model):
     
     consumidor_id = models.IntegerField(primary_key=True)
     fecha = models.DateField()
@@ -183,6 +267,11 @@ class VwDailySummary(models.Model):
     predicciones_hoy = models.IntegerField()
     total_predicciones_correctas = models.IntegerField()
     
+    class Meta:
+        abstract = True
+
+class VwDailySummary(DailySummaryColumns):
+
     class Meta:
         managed = False
         db_table = 'vw_daily_summary'
@@ -190,7 +279,16 @@ class VwDailySummary(models.Model):
         verbose_name_plural = 'Daily Summary'
         ordering = ['-fecha']
 
-class VwWeeklyComparison(models.Model):
+class MvDailySummary(DailySummaryColumns):
+
+    class Meta:
+        managed = False
+        db_table = 'mv_daily_summary'
+        verbose_name = 'Daily Summary (materialized)'
+        verbose_name_plural = 'Daily Summary (materialized)'
+        ordering = ['-fecha']
+
+class WeeklyComparisonColumns(models.Model):
     
     consumidor_id = models.IntegerField(primary_key=True)
     cigarrillos_semana_actual = models.IntegerField()
@@ -199,6 +297,11 @@ class VwWeeklyComparison(models.Model):
     deseos_semana_actual = models.IntegerField()
     deseos_semana_anterior = models.IntegerField()
     
+    class Meta:
+        abstract = True
+
+class VwWeeklyComparison(WeeklyComparisonColumns):
+
     class Meta:
         managed = False
         db_table = 'vw_weekly_comparison'
@@ -206,3 +309,33 @@ class VwWeeklyComparison(models.Model):
         verbose_name_plural = 'Weekly Comparison'
         ordering = ['consumidor_id']
 
+class MvWeeklyComparison(WeeklyComparisonColumns):
+
+    class Meta:
+        managed = False
+        db_table = 'mv_weekly_comparison'
+        verbose_name = 'Weekly Comparison (materialized)'
+        verbose_name_plural = 'Weekly Comparison (materialized)'
+        ordering = ['consumidor_id']
+
+
+class MaterializedViewRefresh(models.Model):
+    
+    view_name = models.CharField(
+        max_length=63,
+        primary_key=True,
+        help_text='Live view whose mv_* variant was refreshed (e.g. vw_daily_summary)'
+    )
+    refreshed_at = models.DateTimeField(
+        help_text='When the last REFRESH MATERIALIZED VIEW finished'
+    )
+    duration_ms = models.FloatField(
+        default=0.0,
+        help_text='How long the last refresh took'
+    )
+    
+    class Meta:
+        db_table = 'materialized_view_refreshes'
+        verbose_name = 'Materialized View Refresh'
+        verbose_name_plural = 'Materialized View Refreshes'
+        ordering = ['view_name']
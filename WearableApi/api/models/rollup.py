@@ -0,0 +1,102 @@
+
+from django.db import models
+from .base import TimeStampedModel
+from .user import Consumidor
+
+class ResumenDiario(TimeStampedModel):
+
+    consumidor = models.ForeignKey(
+        Consumidor,
+        on_delete=models.CASCADE,
+        related_name='resumenes_diarios',
+        help_text="Consumer these daily counts belong to"
+    )
+    fecha = models.DateField(
+        help_text="Day of the events (DATE() of their timestamp, as in Views.sql)"
+    )
+    cigarrillos = models.PositiveIntegerField(
+        default=0,
+        help_text="Formularios sent this day"
+    )
+    deseos = models.PositiveIntegerField(
+        default=0,
+        help_text="Deseos created this day"
+    )
+    deseos_activos = models.PositiveIntegerField(
+        default=0,
+        help_text="Deseos created this day that are still unresolved"
+    )
+    deseos_resueltos = models.PositiveIntegerField(
+        default=0,
+        help_text="Resolved deseos last updated this day"
+    )
+    predicciones = models.PositiveIntegerField(
+        default=0,
+        help_text="Analisis of ventanas starting this day"
+    )
+    predicciones_urge = models.PositiveIntegerField(
+        default=0,
+        help_text="Analisis of ventanas starting this day with urge_label = 1"
+    )
+    hr_sum = models.FloatField(
+        default=0.0,
+        help_text="Sum of hr_mean of ventanas starting this day"
+    )
+    hr_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Ventanas starting this day with an hr_mean"
+    )
+
+    class Meta:
+        db_table = 'resumenes_diarios'
+        verbose_name = 'Resumen Diario'
+        verbose_name_plural = 'Resúmenes Diarios'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['consumidor', 'fecha'],
+                name='unique_resumen_diario'
+            )
+        ]
+
+    def __str__(self):
+        return f"Resumen {self.consumidor_id} - {self.fecha}"
+
+    @property
+    def hr_promedio(self):
+        return self.hr_sum / self.hr_count if self.hr_count else None
+
+class ResumenHabitoDiario(TimeStampedModel):
+
+    consumidor = models.ForeignKey(
+        Consumidor,
+        on_delete=models.CASCADE,
+        related_name='resumenes_habito_diarios',
+        help_text="Consumer these daily counts belong to"
+    )
+    habito_nombre = models.CharField(
+        max_length=50,
+        help_text="habito->>'nombre' of the formularios, 'Sin hábito' when missing"
+    )
+    fecha = models.DateField(
+        help_text="Day the formularios were sent"
+    )
+    cigarrillos = models.PositiveIntegerField(
+        default=0,
+        help_text="Formularios sent this day for this habit"
+    )
+
+    class Meta:
+        db_table = 'resumenes_habito_diarios'
+        verbose_name = 'Resumen de Hábito Diario'
+        verbose_name_plural = 'Resúmenes de Hábito Diarios'
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['consumidor', 'habito_nombre', 'fecha'],
+                name='unique_resumen_habito_diario'
+            )
+        ]
+
+    def __str__(self):
+        return f"Resumen {self.consumidor_id} - {self.habito_nombre} - {self.fecha}"
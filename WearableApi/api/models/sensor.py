@@ -1,5 +1,6 @@
 
 from django.db import models
+from django.utils import timezone
 from .base import TimeStampedModel
 from .user import Consumidor
 
@@ -52,6 +53,10 @@ class Ventana(TimeStampedModel):
         blank=True,
         help_text="Vector embedding of solutions (for ML)"
     )
+    lectura_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of lecturas stored in this window"
+    )
     
     class Meta:
         db_table = 'ventanas'
@@ -109,6 +114,13 @@ class Ventana(TimeStampedModel):
 
 class Lectura(TimeStampedModel):
     
+    # A default instead of auto_now_add, so a buffered reading's receive
+    # time goes into the same INSERT (see LecturaIngestionService.bulk_insert)
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        help_text="Timestamp when the record was created"
+    )
     ventana = models.ForeignKey(
         Ventana,
         on_delete=models.CASCADE,
@@ -158,6 +170,8 @@ class Lectura(TimeStampedModel):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['ventana', 'created_at']),
+            # Keyset pagination of the lecturas endpoint
+            models.Index(fields=['created_at', 'id']),
         ]
     
     def __str__(self):
@@ -201,3 +215,53 @@ class Lectura(TimeStampedModel):
             return math.sqrt(x**2 + y**2 + z**2)
         return None
 
+
+class AcumuladorVentana(TimeStampedModel):
+    
+    ventana = models.OneToOneField(
+        Ventana,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='acumulador',
+        help_text="Window these running statistics belong to"
+    )
+    lectura_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of lecturas folded into this accumulator"
+    )
+    hr_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Number of non-null heart rate values"
+    )
+    hr_mean = models.FloatField(
+        default=0.0,
+        help_text="Running mean of heart rate (Welford)"
+    )
+    hr_m2 = models.FloatField(
+        default=0.0,
+        help_text="Running sum of squared deviations of heart rate (Welford)"
+    )
+    accel_counts = models.JSONField(
+        default=list,
+        help_text="Non-null value count per accelerometer axis [x, y, z]"
+    )
+    accel_sum_squares = models.FloatField(
+        default=0.0,
+        help_text="Running sum of squared accelerometer values"
+    )
+    gyro_counts = models.JSONField(
+        default=list,
+        help_text="Non-null value count per gyroscope axis [x, y, z]"
+    )
+    gyro_sum_squares = models.FloatField(
+        default=0.0,
+        help_text="Running sum of squared gyroscope values"
+    )
+    
+    class Meta:
+        db_table = 'acumuladores_ventana'
+        verbose_name = 'Acumulador de Ventana'
+        verbose_name_plural = 'Acumuladores de Ventana'
+    
+    def __str__(self):
+        return f"Accumulator for Window {self.ventana_id} ({self.lectura_count} readings)"
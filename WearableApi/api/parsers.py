@@ -0,0 +1,80 @@
+
+import math
+import struct
+import numpy as np
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+class LecturaFrameParser(BaseParser):
+    """
+    Fixed-layout little-endian sensor frame sent by the ESP32
+
+    Header (16 bytes):
+        uint32  ventana_id
+        uint32  sample_count
+        float64 base_timestamp (unix epoch seconds of the first sample)
+
+    Body: sample_count rows of 7 float32 values
+        heart_rate, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z
+
+    NaN marks a missing value. The rows are exposed as a read-only
+    (sample_count, 7) NumPy view over the request body, no copy is made.
+    A frame holds at most LECTURA_BATCH_MAX_SIZE samples, larger bodies
+    are rejected before they are read into memory.
+    """
+
+    media_type = 'application/octet-stream'
+
+    HEADER = struct.Struct('<IId')
+    ROW_DTYPE = np.dtype('<f4')
+    ROW_WIDTH = 7
+    ROW_SIZE = ROW_DTYPE.itemsize * ROW_WIDTH
+
+    @classmethod
+    def max_frame_size(cls) -> int:
+        return cls.HEADER.size + settings.LECTURA_BATCH_MAX_SIZE * cls.ROW_SIZE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        max_size = self.max_frame_size()
+
+        request = (parser_context or {}).get('request')
+        content_length = request.META.get('CONTENT_LENGTH') if request is not None else None
+        if content_length and content_length.isdigit() and int(content_length) > max_size:
+            raise ParseError(f'Frame too large: {content_length} bytes, at most {max_size}')
+
+        # One byte over the limit is enough to tell the body is too large
+        data = stream.read(max_size + 1) if stream is not None else b''
+        if len(data) > max_size:
+            raise ParseError(f'Frame too large: more than {max_size} bytes')
+
+        if len(data) < self.HEADER.size:
+            raise ParseError(
+                f'Frame too short: {len(data)} bytes, header needs {self.HEADER.size}'
+            )
+
+        ventana_id, sample_count, base_timestamp = self.HEADER.unpack_from(data)
+
+        if not math.isfinite(base_timestamp):
+            raise ParseError(f'Frame base_timestamp is not a finite number: {base_timestamp}')
+
+        expected_size = self.HEADER.size + sample_count * self.ROW_SIZE
+        if len(data) != expected_size:
+            raise ParseError(
+                f'Frame size mismatch: got {len(data)} bytes, expected {expected_size} '
+                f'for {sample_count} samples'
+            )
+
+        samples = np.frombuffer(
+            data,
+            dtype=self.ROW_DTYPE,
+            count=sample_count * self.ROW_WIDTH,
+            offset=self.HEADER.size
+        ).reshape(sample_count, self.ROW_WIDTH)
+
+        return {
+            'ventana_id': ventana_id,
+            'sample_count': sample_count,
+            'base_timestamp': base_timestamp,
+            'samples': samples,
+        }
@@ -1,4 +1,5 @@
 
+from django.conf import settings
 from rest_framework import serializers
 from api.models import *
 
@@ -153,10 +154,10 @@ class VentanaSerializer(serializers.ModelSerializer):
             'id', 'consumidor', 'consumidor_nombre', 'window_start', 'window_end',
             'hr_mean', 'hr_std', 'gyro_energy', 'accel_energy',
             'emotion_embedding', 'motive_embedding', 'solution_embedding',
-            'duration_minutes', 'has_sensor_data', 'has_embeddings',
+            'lectura_count', 'duration_minutes', 'has_sensor_data', 'has_embeddings',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'lectura_count', 'created_at', 'updated_at']
 
 class LecturaSerializer(serializers.ModelSerializer):
     
@@ -365,3 +366,20 @@ class UserProfileSerializer(serializers.Serializer):
     
     area_responsable = serializers.CharField(max_length=100, required=False, allow_blank=True)
 
+class LecturaSampleSerializer(serializers.ModelSerializer):
+    
+    class Meta:
+        model = Lectura
+        fields = [
+            'heart_rate',
+            'accel_x', 'accel_y', 'accel_z',
+            'gyro_x', 'gyro_y', 'gyro_z',
+        ]
+
+class LecturaBatchSerializer(serializers.Serializer):
+    
+    lecturas = LecturaSampleSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.LECTURA_BATCH_MAX_SIZE
+    )
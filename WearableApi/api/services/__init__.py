@@ -1,6 +1,34 @@
 
 from .auth_service import AuthenticationService
 from .user_factory import UserFactory
+from .lectura_ingestion import LecturaIngestionService
+from .lectura_buffer import LecturaBuffer
+from .lectura_counter import LecturaCounter
+from .ventana_features import VentanaFeatureService
+from .ventana_stats import VentanaStatsService
+from .linear_scorer import LinearScorer
+from .model_registry import ModelRegistry
+from .prediction_batcher import PredictionBatcher
+from .model_trainer import ModelTrainer
+from .materialized_views import MaterializedViewService
+from .daily_rollup import DailyRollupService
+from .dashboard_cache import DashboardCache
+from .heart_rate_series import HeartRateSeriesService
 
-__all__ = ['AuthenticationService', 'UserFactory']
-
+__all__ = [
+    'AuthenticationService',
+    'UserFactory',
+    'LecturaIngestionService',
+    'LecturaBuffer',
+    'LecturaCounter',
+    'VentanaFeatureService',
+    'VentanaStatsService',
+    'LinearScorer',
+    'ModelRegistry',
+    'PredictionBatcher',
+    'ModelTrainer',
+    'MaterializedViewService',
+    'DailyRollupService',
+    'DashboardCache',
+    'HeartRateSeriesService',
+]
@@ -0,0 +1,192 @@
+
+import logging
+from functools import partial
+from typing import Dict, Iterable, Optional
+from django.db import connection, transaction
+from .dashboard_cache import DashboardCache
+
+logger = logging.getLogger(__name__)
+
+# Per-day counts of every source table, one SELECT per event type. {scope}
+# placeholders are filled by _scope() so the same query serves the
+# incremental refresh of a few days and the full rebuild.
+EVENTS_SQL = """
+    SELECT f.consumidor_id, DATE(f.fecha_envio) AS fecha,
+           COUNT(*) AS cigarrillos, 0 AS deseos, 0 AS deseos_activos, 0 AS deseos_resueltos,
+           0 AS predicciones, 0 AS predicciones_urge, 0.0::FLOAT8 AS hr_sum, 0 AS hr_count
+    FROM formularios f
+    WHERE {formularios}
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT d.consumidor_id, DATE(d.created_at),
+           0, COUNT(*), COUNT(*) FILTER (WHERE d.resolved = FALSE), 0,
+           0, 0, 0.0, 0
+    FROM deseos d
+    WHERE {deseos_creados}
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT d.consumidor_id, DATE(d.updated_at),
+           0, 0, 0, COUNT(*),
+           0, 0, 0.0, 0
+    FROM deseos d
+    WHERE d.resolved = TRUE AND {deseos_resueltos}
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT v.consumidor_id, DATE(v.window_start),
+           0, 0, 0, 0,
+           COUNT(*), COUNT(*) FILTER (WHERE a.urge_label = 1), 0.0, 0
+    FROM analisis a
+    JOIN ventanas v ON v.id = a.ventana_id
+    WHERE {ventanas}
+    GROUP BY 1, 2
+    UNION ALL
+    SELECT v.consumidor_id, DATE(v.window_start),
+           0, 0, 0, 0,
+           0, 0, SUM(v.hr_mean), COUNT(*)
+    FROM ventanas v
+    WHERE v.hr_mean IS NOT NULL AND {ventanas}
+    GROUP BY 1, 2
+"""
+
+ROLLUP_COLUMNS = (
+    'cigarrillos', 'deseos', 'deseos_activos', 'deseos_resueltos',
+    'predicciones', 'predicciones_urge', 'hr_sum', 'hr_count',
+)
+
+UPSERT_DAILY_SQL = f"""
+    INSERT INTO resumenes_diarios (consumidor_id, fecha, {', '.join(ROLLUP_COLUMNS)}, created_at, updated_at)
+    SELECT consumidor_id, fecha, {', '.join(f'SUM({column})' for column in ROLLUP_COLUMNS)}, NOW(), NOW()
+    FROM ({EVENTS_SQL}) AS eventos
+    GROUP BY consumidor_id, fecha
+    ON CONFLICT (consumidor_id, fecha) DO UPDATE SET
+        {', '.join(f'{column} = EXCLUDED.{column}' for column in ROLLUP_COLUMNS)},
+        updated_at = EXCLUDED.updated_at
+"""
+
+UPSERT_HABIT_SQL = """
+    INSERT INTO resumenes_habito_diarios (consumidor_id, habito_nombre, fecha, cigarrillos, created_at, updated_at)
+    SELECT f.consumidor_id, LEFT(COALESCE(f.habito->>'nombre', 'Sin hábito'), 50), DATE(f.fecha_envio), COUNT(*), NOW(), NOW()
+    FROM formularios f
+    WHERE {formularios}
+    GROUP BY 1, 2, 3
+    ON CONFLICT (consumidor_id, habito_nombre, fecha) DO UPDATE SET
+        cigarrillos = EXCLUDED.cigarrillos,
+        updated_at = EXCLUDED.updated_at
+"""
+
+class DailyRollupService:
+    """
+    Per consumer and day counters behind the daily summary, weekly
+    comparison and habit tracking views
+
+    A write to Formulario, Deseo, Analisis or Ventana (see api/signals.py
+    and calculate_ventana_statistics_batch) recomputes only the
+    (consumidor, fecha) rows its timestamps fall on, after the transaction
+    commits. Days follow DATE() in the database session, like the views.
+    rebuild() recomputes everything and repairs any drift, e.g. after
+    queryset.update() or raw SQL that bypass the signals.
+    """
+
+    @staticmethod
+    def fecha(timestamp):
+        """Day of a timestamp as DATE() sees it in the database session"""
+        return timestamp.astimezone(connection.timezone).date()
+
+    @staticmethod
+    def _scope(consumidor_id: Optional[int], fechas: Optional[list]) -> Dict[str, str]:
+        """WHERE clauses of EVENTS_SQL for one consumer's days, one consumer, or everything"""
+        def clause(alias, column):
+            if consumidor_id is None:
+                return 'TRUE'
+            if fechas is None:
+                return f'{alias}.consumidor_id = %(consumidor_id)s'
+            # The range keeps the (consumidor, timestamp) indexes usable
+            return (
+                f'{alias}.consumidor_id = %(consumidor_id)s '
+                f'AND {alias}.{column} >= %(desde)s::DATE '
+                f'AND {alias}.{column} < %(hasta)s::DATE + 1 '
+                f'AND DATE({alias}.{column}) = ANY(%(fechas)s::DATE[])'
+            )
+
+        return {
+            'formularios': clause('f', 'fecha_envio'),
+            'deseos_creados': clause('d', 'created_at'),
+            'deseos_resueltos': clause('d', 'updated_at'),
+            'ventanas': clause('v', 'window_start'),
+        }
+
+    @classmethod
+    def _recompute(cls, consumidor_id: Optional[int] = None, fechas: Optional[list] = None) -> Dict:
+        params = {'consumidor_id': consumidor_id, 'fechas': fechas}
+        if fechas:
+            params.update({'desde': min(fechas), 'hasta': max(fechas)})
+
+        if consumidor_id is None:
+            target = 'TRUE'
+        elif fechas is None:
+            target = 'consumidor_id = %(consumidor_id)s'
+        else:
+            target = 'consumidor_id = %(consumidor_id)s AND fecha = ANY(%(fechas)s::DATE[])'
+
+        scope = cls._scope(consumidor_id, fechas)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Days whose events are all gone must disappear, the upserts
+            # below only touch days that still have some
+            cursor.execute(f'DELETE FROM resumenes_diarios WHERE {target}', params)
+            cursor.execute(f'DELETE FROM resumenes_habito_diarios WHERE {target}', params)
+
+            cursor.execute(UPSERT_DAILY_SQL.format(**scope), params)
+            daily = cursor.rowcount
+            cursor.execute(UPSERT_HABIT_SQL.format(formularios=scope['formularios']), params)
+            habits = cursor.rowcount
+
+        return {'resumenes_diarios': daily, 'resumenes_habito_diarios': habits}
+
+    @classmethod
+    def refresh(cls, consumidor_id: int, fechas: Iterable) -> Dict:
+        """Recompute the rollup rows of one consumer for the given days"""
+        fechas = sorted(set(fechas))
+        if not fechas:
+            return {'resumenes_diarios': 0, 'resumenes_habito_diarios': 0}
+        return cls._recompute(consumidor_id, fechas)
+
+    @classmethod
+    def touch(cls, consumidor_id: Optional[int], *timestamps) -> None:
+        """
+        Schedule a refresh of the days the timestamps fall on once the
+        current transaction commits, followed by a bump of the consumer's
+        dashboard data version, so cached view responses of every write
+        path that reaches here are dropped. A failed refresh is logged and
+        left for rebuild() instead of failing the write.
+        """
+        fechas = {cls.fecha(timestamp) for timestamp in timestamps if timestamp is not None}
+        if consumidor_id is None or not fechas:
+            return
+
+        transaction.on_commit(partial(cls.refresh, consumidor_id, fechas), robust=True)
+        DashboardCache.invalidate(consumidor_id)
+
+    @classmethod
+    def touch_ventanas(cls, ventanas: Iterable) -> None:
+        """touch() for ventanas whose hr_mean changed without a save() signal"""
+        days = {}
+        for ventana in ventanas:
+            days.setdefault(ventana.consumidor_id, []).append(ventana.window_start)
+
+        for consumidor_id, window_starts in days.items():
+            cls.touch(consumidor_id, *window_starts)
+
+    @classmethod
+    def rebuild(cls, consumidor_id: Optional[int] = None) -> Dict:
+        """Recompute every rollup row, or every row of one consumer"""
+        stats = cls._recompute(consumidor_id)
+        if consumidor_id is None:
+            DashboardCache.invalidate_all()
+        else:
+            DashboardCache.invalidate(consumidor_id)
+        logger.info(
+            f"Rebuilt daily rollups{f' of consumidor {consumidor_id}' if consumidor_id else ''}: "
+            f"{stats['resumenes_diarios']} days, {stats['resumenes_habito_diarios']} habit days"
+        )
+        return stats
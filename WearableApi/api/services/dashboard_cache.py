@@ -0,0 +1,108 @@
+
+import hashlib
+import logging
+import time
+from functools import partial
+from typing import Any, Optional, Tuple
+import redis
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+from django.utils import timezone
+from django.utils.http import urlencode
+
+logger = logging.getLogger(__name__)
+
+class DashboardCache:
+    """
+    Response cache of the dashboard viewsets, per consumer
+
+    Keys are (endpoint, consumidor_id, query params, data version, day).
+    The data version is a Redis counter per consumer that write paths bump
+    with invalidate() once their transaction commits, plus a global one
+    bumped when every consumer changes at once (materialized view refresh,
+    rollup rebuild). Bumping changes every key of the consumer, so nothing
+    is deleted: old entries just expire. Entries live in Redis (the
+    default cache) and in a small per-process L1 (the 'local' cache);
+    the version is always read from Redis, so the L1 never serves a
+    response another worker has invalidated.
+    """
+
+    KEY_PREFIX = 'dashboard'
+    VERSION_PREFIX = 'dashboard_version'
+    GLOBAL = 'all'
+
+    @classmethod
+    def version_key(cls, consumidor_id=None) -> str:
+        return f'{cls.VERSION_PREFIX}:{cls.GLOBAL if consumidor_id is None else consumidor_id}'
+
+    @staticmethod
+    def _seed() -> int:
+        # A version that is larger than any previous counter even if
+        # Redis lost the key, so old entries cannot be matched again
+        return time.time_ns() // 1000
+
+    @classmethod
+    def version(cls, consumidor_id) -> str:
+        """'<consumer version>.<global version>', seeding missing counters"""
+        keys = [cls.version_key(consumidor_id), cls.version_key()]
+        versions = cache.get_many(keys)
+
+        for key in keys:
+            if key not in versions:
+                cache.add(key, cls._seed(), timeout=None)
+                versions[key] = cache.get(key)
+
+        return '.'.join(str(versions[key]) for key in keys)
+
+    @classmethod
+    def bump(cls, consumidor_id=None) -> None:
+        """Move a consumer (None: everyone) to a new data version right away"""
+        key = cls.version_key(consumidor_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, cls._seed(), timeout=None)
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable, dashboard cache version {key} not bumped: {e}")
+
+    @classmethod
+    def invalidate(cls, *consumidor_ids) -> None:
+        """Bump the consumers' versions once the current transaction commits"""
+        for consumidor_id in {consumidor_id for consumidor_id in consumidor_ids if consumidor_id is not None}:
+            transaction.on_commit(partial(cls.bump, consumidor_id), robust=True)
+
+    @classmethod
+    def invalidate_all(cls) -> None:
+        transaction.on_commit(partial(cls.bump, None), robust=True)
+
+    @classmethod
+    def key(cls, endpoint: str, consumidor_id, params) -> str:
+        """Cache key of a request; params is the request's QueryDict"""
+        query = urlencode(sorted((name, sorted(params.getlist(name))) for name in params), doseq=True)
+        digest = hashlib.md5(query.encode()).hexdigest()
+        # Views compare against CURRENT_DATE, a new day is new data
+        today = timezone.now().date().isoformat()
+
+        return f'{cls.KEY_PREFIX}:{endpoint}:{consumidor_id}:{cls.version(consumidor_id)}:{today}:{digest}'
+
+    @staticmethod
+    def get(key: str) -> Tuple[Optional[Any], Optional[str]]:
+        """(entry, 'L1' or 'L2'), (None, None) on a miss"""
+        local = caches['local']
+
+        entry = local.get(key)
+        if entry is not None:
+            return entry, 'L1'
+
+        entry = cache.get(key)
+        if entry is not None:
+            local.set(key, entry, settings.DASHBOARD_CACHE_L1_TIMEOUT)
+            return entry, 'L2'
+
+        return None, None
+
+    @staticmethod
+    def set(key: str, entry: Any) -> None:
+        cache.set(key, entry, settings.DASHBOARD_CACHE_TIMEOUT)
+        caches['local'].set(key, entry, settings.DASHBOARD_CACHE_L1_TIMEOUT)
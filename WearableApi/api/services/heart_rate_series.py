@@ -0,0 +1,162 @@
+
+import logging
+import math
+from datetime import datetime, timedelta
+from typing import Dict, List
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Per-bucket HR of one consumer in [desde, hasta). The lecturas query
+# reaches them through the consumer's ventanas, so it can use the
+# (consumidor, window_start) and (ventana, created_at) indexes; a reading
+# is never older than its window.
+SERIES_SQL = {
+    'reading': """
+        SELECT date_bin(%(step)s, l.created_at, %(origin)s) AS bucket,
+               AVG(l.heart_rate), MIN(l.heart_rate), MAX(l.heart_rate), COUNT(*)
+        FROM ventanas v
+        JOIN lecturas l ON l.ventana_id = v.id
+        WHERE v.consumidor_id = %(consumidor_id)s
+          AND v.window_start < %(hasta)s
+          AND l.created_at >= %(desde)s AND l.created_at < %(hasta)s
+          AND l.heart_rate IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """,
+    'window': """
+        SELECT date_bin(%(step)s, v.window_start, %(origin)s) AS bucket,
+               AVG(v.hr_mean), MIN(v.hr_mean), MAX(v.hr_mean), COUNT(*)
+        FROM ventanas v
+        WHERE v.consumidor_id = %(consumidor_id)s
+          AND v.window_start >= %(desde)s AND v.window_start < %(hasta)s
+          AND v.hr_mean IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """,
+}
+
+# Bucket widths a chart axis reads well, in seconds
+BUCKET_STEPS = (
+    1, 2, 5, 10, 15, 30,
+    60, 120, 300, 600, 900, 1800,
+    3600, 7200, 10800, 21600, 43200, 86400,
+)
+
+class HeartRateSeriesService:
+    """
+    Heart-rate time series for charts, bounded to max_points whatever the range
+
+    Lecturas (granularity 'reading') or ventana hr_mean ('window') are
+    averaged into fixed-width buckets by date_bin() in PostgreSQL; the
+    width is the smallest step of BUCKET_STEPS (or whole days) that
+    yields at most max_points buckets. With downsample='lttb' the SQL
+    buckets are HR_SERIES_LTTB_OVERSAMPLING times finer and
+    Largest-Triangle-Three-Buckets keeps the max_points that preserve the
+    shape of the curve, peaks included.
+    """
+
+    GRANULARITIES = tuple(SERIES_SQL)
+
+    @staticmethod
+    def bucket_seconds(desde: datetime, hasta: datetime, max_points: int) -> int:
+        span = max((hasta - desde).total_seconds(), 1)
+        # Buckets are aligned to the origin, so the range may straddle one more
+        needed = span / max(max_points - 1, 1)
+
+        for step in BUCKET_STEPS:
+            if step >= needed:
+                return step
+        return math.ceil(needed / 86400) * 86400
+
+    @staticmethod
+    def origin() -> datetime:
+        # A local midnight, so day buckets start at midnight in TIME_ZONE
+        return timezone.make_aware(datetime(2000, 1, 3))
+
+    @classmethod
+    def buckets(cls, consumidor_id: int, desde: datetime, hasta: datetime,
+                step: int, granularity: str = 'window') -> List[tuple]:
+        """(bucket start, mean, min, max, samples) rows, oldest first"""
+        with connection.cursor() as cursor:
+            cursor.execute(SERIES_SQL[granularity], {
+                'consumidor_id': consumidor_id,
+                'desde': desde,
+                'hasta': hasta,
+                'step': timedelta(seconds=step),
+                'origin': cls.origin(),
+            })
+            return cursor.fetchall()
+
+    @staticmethod
+    def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+        """Indices of the threshold points LTTB keeps, first and last included"""
+        n = len(x)
+        if threshold >= n or threshold < 3:
+            return np.arange(n)
+
+        every = (n - 2) / (threshold - 2)
+        selected = np.empty(threshold, dtype=np.int64)
+        selected[0], selected[-1] = 0, n - 1
+        a = 0
+
+        for i in range(threshold - 2):
+            start = int(i * every) + 1
+            end = int((i + 1) * every) + 1
+            next_end = min(int((i + 2) * every) + 1, n)
+
+            # Triangle of the previously kept point, each candidate of this
+            # bucket and the average of the next one
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+            area = np.abs(
+                (x[a] - avg_x) * (y[start:end] - y[a])
+                - (x[a] - x[start:end]) * (avg_y - y[a])
+            )
+
+            a = start + int(np.argmax(area))
+            selected[i + 1] = a
+
+        return selected
+
+    @classmethod
+    def series(cls, consumidor_id: int, desde: datetime, hasta: datetime,
+               max_points: int, granularity: str = 'window', downsample: str = None) -> Dict:
+        lttb = downsample == 'lttb'
+        resolution = max_points * settings.HR_SERIES_LTTB_OVERSAMPLING if lttb else max_points
+
+        step = cls.bucket_seconds(desde, hasta, resolution)
+        rows = cls.buckets(consumidor_id, desde, hasta, step, granularity)
+
+        if lttb and len(rows) > max_points:
+            x = np.array([row[0].timestamp() for row in rows], dtype=np.float64)
+            y = np.array([row[1] for row in rows], dtype=np.float64)
+            rows = [rows[index] for index in cls.lttb(x, y, max_points)]
+
+        logger.debug(
+            f"HR series of consumidor {consumidor_id}: {len(rows)} points, "
+            f"{step}s {granularity} buckets{' + LTTB' if lttb else ''}"
+        )
+
+        return {
+            'consumidor_id': consumidor_id,
+            'from': desde.isoformat(),
+            'to': hasta.isoformat(),
+            'granularity': granularity,
+            'bucket_seconds': step,
+            'downsample': 'lttb' if lttb else None,
+            'count': len(rows),
+            'points': [
+                {
+                    'timestamp': bucket.isoformat(),
+                    'hr_mean': round(mean, 2),
+                    'hr_min': round(minimum, 2),
+                    'hr_max': round(maximum, 2),
+                    'samples': samples,
+                }
+                for bucket, mean, minimum, maximum, samples in rows
+            ],
+        }
@@ -0,0 +1,295 @@
+
+import json
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from api.models import Ventana
+from .lectura_ingestion import LecturaIngestionService
+
+logger = logging.getLogger(__name__)
+
+class LecturaBuffer:
+    """
+    Redis write-behind buffer for sensor readings
+
+    Readings are appended to one Redis list per ventana and a set indexes
+    the ventanas with pending data. The flush_lectura_buffer task drains
+    the lists in chunks into the lecturas table. A chunk that keeps
+    failing to insert is moved to a dead-letter list per ventana after
+    LECTURA_BUFFER_MAX_RETRIES flushes, see requeue_dead_letters().
+    """
+
+    KEY_PREFIX = 'lectura_buffer'
+    INDEX_KEY = f'{KEY_PREFIX}:ventanas'
+    LOCK_KEY = f'{KEY_PREFIX}:flush_lock'
+    STATS_KEY = f'{KEY_PREFIX}:last_flush'
+    DEAD_INDEX_KEY = f'{KEY_PREFIX}:dead:ventanas'
+
+    _client = None
+
+    @classmethod
+    def client(cls) -> redis.Redis:
+        if cls._client is None:
+            cls._client = redis.Redis.from_url(settings.LECTURA_BUFFER_REDIS_URL)
+        return cls._client
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.LECTURA_INGESTION_MODE == 'buffered'
+
+    @classmethod
+    def list_key(cls, ventana_id) -> str:
+        return f'{cls.KEY_PREFIX}:{ventana_id}'
+
+    @classmethod
+    def retries_key(cls, ventana_id) -> str:
+        return f'{cls.KEY_PREFIX}:retries:{ventana_id}'
+
+    @classmethod
+    def processing_key(cls, ventana_id) -> str:
+        return f'{cls.KEY_PREFIX}:processing:{ventana_id}'
+
+    @classmethod
+    def dead_key(cls, ventana_id) -> str:
+        return f'{cls.KEY_PREFIX}:dead:{ventana_id}'
+
+    @classmethod
+    def ventana_exists(cls, ventana_id) -> bool:
+        """Existence check cached in Redis so the hot path skips PostgreSQL"""
+        cache_key = f'{cls.KEY_PREFIX}:known:{ventana_id}'
+        if cache.get(cache_key):
+            return True
+
+        exists = Ventana.objects.filter(id=ventana_id).exists()
+        if exists:
+            cache.set(cache_key, True, timeout=3600)
+        return exists
+
+    @classmethod
+    def push(cls, ventana_id, samples: Iterable[Dict]) -> int:
+        """Append samples for a ventana and return its buffered length"""
+        received_at = time.time()
+        payload = [json.dumps({**sample, 'received_at': received_at}) for sample in samples]
+
+        pipe = cls.client().pipeline()
+        pipe.rpush(cls.list_key(ventana_id), *payload)
+        pipe.sadd(cls.INDEX_KEY, ventana_id)
+        length, _ = pipe.execute()
+
+        return length
+
+    @classmethod
+    def flush(cls, chunk_size=None) -> Dict:
+        """
+        Drain every buffered ventana into the database in chunks
+
+        Each chunk is moved with LMOVE to the ventana's processing list and
+        only dropped from there once its insert has committed, so a worker
+        killed mid-flush leaves it to be inserted by the next flush instead
+        of losing it. A ventana leaves the index only once its lists are
+        empty, and at most LECTURA_BUFFER_MAX_CHUNKS chunks are taken from
+        one ventana per flush so a backlog cannot starve the others. A chunk
+        that fails to insert is pushed back to the head of its list and the
+        flush moves on to the next ventana; once it has failed
+        LECTURA_BUFFER_MAX_RETRIES times it goes to the dead-letter list
+        instead, so one bad ventana cannot hold back the others.
+        """
+        chunk_size = chunk_size or settings.LECTURA_BUFFER_CHUNK_SIZE
+
+        client = cls.client()
+        # Token checked on release, a flush that outlived the timeout must
+        # not delete the lock of the flush that took over
+        lock = client.lock(cls.LOCK_KEY, timeout=settings.LECTURA_BUFFER_LOCK_TIMEOUT, blocking=False)
+        if not lock.acquire():
+            return {'skipped': True, 'reason': 'flush already running'}
+
+        flushed = 0
+        dropped = 0
+        failed = 0
+        dead_lettered = 0
+        ventanas_flushed = 0
+        max_lag = 0.0
+
+        try:
+            for raw_id in client.smembers(cls.INDEX_KEY):
+                ventana_id = int(raw_id)
+                key = cls.list_key(ventana_id)
+                processing_key = cls.processing_key(ventana_id)
+
+                ventana = Ventana.objects.filter(id=ventana_id).first()
+
+                for _ in range(settings.LECTURA_BUFFER_MAX_CHUNKS):
+                    # Left over by a flush that died before it committed
+                    raw_samples = client.lrange(processing_key, 0, -1)
+                    if not raw_samples:
+                        pipe = client.pipeline()
+                        for _ in range(chunk_size):
+                            pipe.lmove(key, processing_key, 'LEFT', 'RIGHT')
+                        raw_samples = [raw for raw in pipe.execute() if raw is not None]
+
+                    if not raw_samples:
+                        break
+
+                    if ventana is None:
+                        logger.warning(
+                            f"Dropping {len(raw_samples)} buffered lecturas for "
+                            f"missing Ventana {ventana_id}"
+                        )
+                        client.delete(processing_key)
+                        dropped += len(raw_samples)
+                        continue
+
+                    samples = [json.loads(raw) for raw in raw_samples]
+                    for sample in samples:
+                        # Keep the time the reading reached the API, not the flush time
+                        sample['created_at'] = datetime.fromtimestamp(sample['received_at'], tz=dt_timezone.utc)
+
+                    try:
+                        lecturas, lectura_count = LecturaIngestionService.bulk_insert(ventana, samples)
+                    except Exception as e:
+                        failed += len(raw_samples)
+                        retries = client.incr(cls.retries_key(ventana_id))
+
+                        if retries < settings.LECTURA_BUFFER_MAX_RETRIES:
+                            logger.warning(
+                                f"Could not flush {len(raw_samples)} lecturas for Ventana {ventana_id} "
+                                f"(attempt {retries}), retrying next flush: {e}"
+                            )
+                            pipe = client.pipeline()
+                            pipe.lpush(key, *reversed(raw_samples))
+                            pipe.delete(processing_key)
+                            pipe.execute()
+                            break
+
+                        logger.error(
+                            f"Moving {len(raw_samples)} lecturas for Ventana {ventana_id} to the "
+                            f"dead-letter list after {retries} failed flushes: {e}"
+                        )
+                        pipe = client.pipeline()
+                        pipe.rpush(cls.dead_key(ventana_id), *raw_samples)
+                        pipe.sadd(cls.DEAD_INDEX_KEY, ventana_id)
+                        pipe.delete(cls.retries_key(ventana_id), processing_key)
+                        pipe.execute()
+                        dead_lettered += len(raw_samples)
+                        continue
+
+                    client.delete(processing_key, cls.retries_key(ventana_id))
+                    LecturaIngestionService.schedule_calculation(
+                        ventana, lectura_count - len(lecturas), lectura_count
+                    )
+
+                    flushed += len(lecturas)
+                    oldest = min(sample['received_at'] for sample in samples)
+                    max_lag = max(max_lag, time.time() - oldest)
+
+                # push() adds to the list and the index in one transaction,
+                # so readings pushed after the SREM are seen by the LLEN
+                client.srem(cls.INDEX_KEY, ventana_id)
+                if client.llen(key) or client.llen(processing_key):
+                    client.sadd(cls.INDEX_KEY, ventana_id)
+
+                if ventana is not None:
+                    ventanas_flushed += 1
+        finally:
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                logger.warning(
+                    f"Lectura buffer flush lock expired after "
+                    f"{settings.LECTURA_BUFFER_LOCK_TIMEOUT}s, another flush may have run"
+                )
+
+        stats = {
+            'flushed': flushed,
+            'dropped': dropped,
+            'failed': failed,
+            'dead_lettered': dead_lettered,
+            'ventanas': ventanas_flushed,
+            'max_lag_seconds': round(max_lag, 3),
+            'flushed_at': time.time(),
+            **cls.pending(),
+        }
+        cache.set(cls.STATS_KEY, stats, timeout=None)
+
+        return stats
+
+    @classmethod
+    def drain(cls, timeout=60) -> Dict:
+        """Flush repeatedly until nothing is pending, used on worker shutdown"""
+        deadline = time.time() + timeout
+        stats = cls.pending()
+
+        while stats['pending'] and time.time() < deadline:
+            stats = cls.flush()
+            if stats.get('skipped'):
+                time.sleep(0.5)
+                stats = cls.pending()
+
+        return stats
+
+    @classmethod
+    def pending(cls) -> Dict:
+        """Buffered readings not yet flushed and the age of the oldest one"""
+        client = cls.client()
+        ventana_ids = list(client.smembers(cls.INDEX_KEY))
+
+        if not ventana_ids:
+            return {'pending': 0, 'oldest_pending_seconds': 0.0}
+
+        pipe = client.pipeline()
+        for ventana_id in ventana_ids:
+            key = cls.list_key(int(ventana_id))
+            processing_key = cls.processing_key(int(ventana_id))
+            pipe.llen(key)
+            pipe.llen(processing_key)
+            pipe.lindex(processing_key, 0)
+            pipe.lindex(key, 0)
+        results = pipe.execute()
+
+        pending = sum(results[0::4]) + sum(results[1::4])
+        heads = [json.loads(head)['received_at'] for head in results[2::4] + results[3::4] if head]
+        oldest = time.time() - min(heads) if heads else 0.0
+
+        return {'pending': pending, 'oldest_pending_seconds': round(oldest, 3)}
+
+    @classmethod
+    def dead_letters(cls) -> Dict:
+        """Readings parked in the dead-letter lists, per ventana"""
+        client = cls.client()
+        ventana_ids = sorted(int(ventana_id) for ventana_id in client.smembers(cls.DEAD_INDEX_KEY))
+
+        pipe = client.pipeline()
+        for ventana_id in ventana_ids:
+            pipe.llen(cls.dead_key(ventana_id))
+
+        return {ventana_id: length for ventana_id, length in zip(ventana_ids, pipe.execute()) if length}
+
+    @classmethod
+    def requeue_dead_letters(cls, ventana_id=None) -> int:
+        """Move dead-lettered readings back into the buffer once the cause is fixed"""
+        client = cls.client()
+        ventana_ids = [ventana_id] if ventana_id is not None else list(cls.dead_letters())
+        requeued = 0
+
+        for ventana_id in ventana_ids:
+            dead_key = cls.dead_key(ventana_id)
+            while client.lmove(dead_key, cls.list_key(ventana_id), 'LEFT', 'RIGHT') is not None:
+                requeued += 1
+            client.srem(cls.DEAD_INDEX_KEY, ventana_id)
+            client.sadd(cls.INDEX_KEY, ventana_id)
+
+        logger.info(f"Requeued {requeued} dead-lettered lecturas from {len(ventana_ids)} ventanas")
+        return requeued
+
+    @classmethod
+    def status(cls) -> Dict:
+        return {
+            'mode': settings.LECTURA_INGESTION_MODE,
+            'last_flush': cache.get(cls.STATS_KEY),
+            'dead_letters': cls.dead_letters(),
+            **cls.pending(),
+        }
@@ -0,0 +1,112 @@
+
+import logging
+from datetime import timedelta
+from typing import Dict, Optional
+import redis
+from django.core.cache import cache
+from django.db import models
+from django.utils import timezone
+from api.models import Ventana
+
+logger = logging.getLogger(__name__)
+
+class LecturaCounter:
+    """
+    Per-ventana reading counters that avoid COUNT(*) over lecturas
+
+    Ventana.lectura_count is incremented in the same transaction as the
+    insert, so it is the durable value. Redis holds a copy that is bumped
+    with INCRBY and read by the hot paths, and is seeded from the column
+    whenever the key is missing or Redis is unavailable. The
+    reconcile_lectura_counters task corrects both against the real count.
+    """
+
+    KEY_PREFIX = 'lectura_count'
+    TIMEOUT = 60 * 60 * 24
+
+    @classmethod
+    def key(cls, ventana_id) -> str:
+        return f'{cls.KEY_PREFIX}:{ventana_id}'
+
+    @classmethod
+    def increment(cls, ventana_id, amount=1) -> int:
+        """
+        Add amount to the ventana's counter and return the new total.
+        Call it inside the transaction that inserted the lecturas.
+        """
+        Ventana.objects.filter(id=ventana_id).update(
+            lectura_count=models.F('lectura_count') + amount
+        )
+
+        try:
+            return cache.incr(cls.key(ventana_id), amount)
+        except ValueError:
+            pass  # Key expired or never seeded, fall back to the column
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable for lectura counter {ventana_id}: {e}")
+
+        return cls._load(ventana_id)
+
+    @classmethod
+    def get(cls, ventana_id) -> Optional[int]:
+        """Current number of lecturas, None if the ventana does not exist"""
+        try:
+            count = cache.get(cls.key(ventana_id))
+            if count is not None:
+                return count
+        except redis.RedisError as e:
+            logger.warning(f"Redis unavailable for lectura counter {ventana_id}: {e}")
+
+        return cls._load(ventana_id)
+
+    @classmethod
+    def _load(cls, ventana_id) -> Optional[int]:
+        count = Ventana.objects.filter(id=ventana_id).values_list(
+            'lectura_count', flat=True
+        ).first()
+
+        if count is not None:
+            try:
+                # add, not set: a counter another process seeded and bumped
+                # since the column was read must not be overwritten
+                cache.add(cls.key(ventana_id), count, timeout=cls.TIMEOUT)
+            except redis.RedisError:
+                pass
+
+        return count
+
+    @classmethod
+    def invalidate(cls, ventana_ids) -> None:
+        """Drop cached counters so they are reloaded from the column"""
+        try:
+            cache.delete_many([cls.key(ventana_id) for ventana_id in ventana_ids])
+        except redis.RedisError as e:
+            logger.warning(f"Could not invalidate lectura counters: {e}")
+
+    @classmethod
+    def reconcile(cls, hours=24) -> Dict:
+        """
+        Compare the counters of recent ventanas with COUNT(*) and fix drift
+
+        Counter and real count are read in one statement, and the column
+        is corrected by the difference instead of overwritten, so readings
+        inserted while reconciling are not lost.
+        """
+        since = timezone.now() - timedelta(hours=hours)
+
+        rows = list(Ventana.objects.filter(window_end__gte=since).annotate(
+            actual_count=models.Count('lecturas')
+        ).values_list('id', 'lectura_count', 'actual_count'))
+
+        drifted = []
+        for ventana_id, lectura_count, actual_count in rows:
+            if lectura_count != actual_count:
+                Ventana.objects.filter(id=ventana_id).update(
+                    lectura_count=models.F('lectura_count') + (actual_count - lectura_count)
+                )
+                drifted.append(ventana_id)
+
+        # Redis can drift on its own (rolled back inserts), always reseed
+        cls.invalidate([ventana_id for ventana_id, _, _ in rows])
+
+        return {'checked': len(rows), 'corrected': len(drifted), 'corrected_ids': drifted[:50]}
@@ -0,0 +1,109 @@
+
+import logging
+import numpy as np
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Iterable, List, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from api.models import Lectura, Ventana
+from .lectura_counter import LecturaCounter
+from .ventana_stats import VentanaStatsService
+
+logger = logging.getLogger(__name__)
+
+SENSOR_FIELDS = (
+    'heart_rate',
+    'accel_x', 'accel_y', 'accel_z',
+    'gyro_x', 'gyro_y', 'gyro_z',
+)
+
+class LecturaIngestionService:
+
+    @staticmethod
+    def bulk_insert(ventana: Ventana, samples: Iterable[Dict]) -> Tuple[List[Lectura], int]:
+        """
+        Write a batch of validated samples for one ventana in a single
+        transaction and return the created lecturas plus the new total.
+        A sample's optional 'created_at' (when it was taken or received)
+        replaces the insert time.
+        """
+        now = timezone.now()
+        lecturas = [
+            Lectura(
+                ventana=ventana,
+                created_at=sample.get('created_at') or now,
+                **{field: sample.get(field) for field in SENSOR_FIELDS}
+            )
+            for sample in samples
+        ]
+
+        with transaction.atomic():
+            Lectura.objects.bulk_create(lecturas)
+            lectura_count = LecturaCounter.increment(ventana.id, len(lecturas))
+            VentanaStatsService.accumulate(ventana.id, lecturas)
+
+        logger.info(
+            f"Bulk inserted {len(lecturas)} lecturas into Ventana {ventana.id} "
+            f"(total: {lectura_count})"
+        )
+
+        return lecturas, lectura_count
+
+    @staticmethod
+    def samples_from_array(samples: np.ndarray) -> List[Dict]:
+        """
+        Convert an (n, 7) array whose columns follow SENSOR_FIELDS into
+        sample dicts. NaN means a missing value and becomes None.
+        """
+        if np.isinf(samples).any():
+            raise ValueError('Sensor frame contains infinite values')
+
+        return [
+            {field: (None if value != value else value) for field, value in zip(SENSOR_FIELDS, row)}
+            for row in samples.tolist()
+        ]
+
+    @staticmethod
+    def frame_time(ventana: Ventana, base_timestamp: float):
+        """
+        Aware datetime of a frame's base_timestamp, or None when it cannot
+        be a sample time of the ventana: not a number, before the window
+        started (e.g. seconds since boot on a device without NTP) or in the
+        future, both beyond LECTURA_FRAME_CLOCK_SKEW seconds.
+        """
+        skew = timedelta(seconds=settings.LECTURA_FRAME_CLOCK_SKEW)
+
+        try:
+            taken_at = datetime.fromtimestamp(base_timestamp, tz=dt_timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            return None
+
+        if taken_at < ventana.window_start - skew or taken_at > timezone.now() + skew:
+            return None
+        return taken_at
+
+    @staticmethod
+    def schedule_calculation(ventana: Ventana, previous_count: int, lectura_count: int) -> bool:
+        """
+        Enqueue at most one statistics check for the readings added since
+        previous_count, plus a forced calculation once the window has ended.
+        Returns True when a check was enqueued.
+        """
+        from api.tasks import check_and_calculate_ventana_stats, calculate_ventana_statistics
+
+        interval = settings.LECTURA_CALCULATION_INTERVAL
+        calculation_pending = lectura_count // interval > previous_count // interval
+
+        if calculation_pending:
+            logger.info(
+                f"Triggering ventana calculation check for Ventana {ventana.id} "
+                f"(count: {lectura_count})"
+            )
+            check_and_calculate_ventana_stats.delay(ventana.id, min_readings=interval)
+
+        if ventana.window_end and timezone.now() >= ventana.window_end:
+            logger.info(f"Ventana {ventana.id} window ended, forcing calculation")
+            calculate_ventana_statistics.delay(ventana.id)
+
+        return calculation_pending
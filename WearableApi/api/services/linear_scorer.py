@@ -0,0 +1,122 @@
+
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class LinearScorer:
+    """
+    Pure-NumPy scorer for the StandardScaler + LogisticRegression package
+
+    The artifact is a .npz holding the scaler mean/scale, coefficients,
+    intercept and feature order, plus the package metadata as JSON, so
+    workers can score without importing scikit-learn or pandas. The
+    scaler is folded into the weights at load time and a prediction is
+    a single dot product followed by the logistic function, the same
+    computation LogisticRegression.predict_proba does for two classes.
+    """
+
+    def __init__(self, feature_names: List[str], mean, scale, coef, intercept,
+                 classes=(0, 1), metadata: Optional[Dict] = None):
+        self.feature_names = list(feature_names)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64).reshape(-1)
+        self.intercept = float(np.asarray(intercept, dtype=np.float64).reshape(-1)[0])
+        self.classes = np.asarray(classes)
+        self.metadata = metadata or {}
+
+        if not (len(self.feature_names) == len(self.mean) == len(self.scale) == len(self.coef)):
+            raise ValueError("Feature names, scaler and coefficients have different lengths")
+        if len(self.classes) != 2:
+            raise ValueError(f"Only binary models are supported, got {len(self.classes)} classes")
+
+        # (x - mean) / scale . coef + b  ==  x . weights + bias
+        self.weights = self.coef / self.scale
+        self.bias = self.intercept - float(np.dot(self.mean, self.weights))
+
+    @classmethod
+    def from_package(cls, model_package: Dict) -> Optional['LinearScorer']:
+        """Build from a joblib model package, None when the model is not a binary linear model"""
+        model = model_package.get('model')
+        scaler = model_package.get('scaler')
+        if model is None or scaler is None or not hasattr(model, 'coef_'):
+            return None
+        if len(getattr(model, 'classes_', ())) != 2:
+            return None
+
+        n_features = len(model_package['feature_names'])
+        mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None else np.zeros(n_features)
+        scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None else np.ones(n_features)
+
+        return cls(
+            feature_names=model_package['feature_names'],
+            mean=mean,
+            scale=scale,
+            coef=model.coef_,
+            intercept=model.intercept_,
+            classes=model.classes_,
+            metadata={
+                # Packages saved before model_name was recorded are named like train_model.py does
+                'model_name': model_package.get('model_name') or f'{type(model).__name__}_v1',
+                'training_date': model_package.get('training_date'),
+                'metrics': model_package.get('metrics', {}),
+            },
+        )
+
+    def save(self, path: str) -> None:
+        """Write the .npz artifact, through a temporary file so readers never see it half written"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                feature_names=np.array(self.feature_names),
+                mean=self.mean,
+                scale=self.scale,
+                coef=self.coef,
+                intercept=np.array([self.intercept]),
+                classes=self.classes,
+                metadata=np.array(json.dumps(self.metadata, default=float)),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'LinearScorer':
+        with np.load(path, allow_pickle=False) as artifact:
+            return cls(
+                feature_names=[str(name) for name in artifact['feature_names']],
+                mean=artifact['mean'],
+                scale=artifact['scale'],
+                coef=artifact['coef'],
+                intercept=artifact['intercept'],
+                classes=artifact['classes'],
+                metadata=json.loads(str(artifact['metadata'])),
+            )
+
+    def package(self) -> Dict:
+        """Model package in the shape the prediction tasks expect"""
+        return {
+            'scorer': self,
+            'feature_names': self.feature_names,
+            'model_name': self.metadata.get('model_name'),
+            'training_date': self.metadata.get('training_date'),
+            'metrics': self.metadata.get('metrics', {}),
+        }
+
+    def matrix(self, feature_rows: Iterable[Dict]) -> np.ndarray:
+        """Feature dicts as a 2D array in training column order"""
+        return np.array(
+            [[row[name] for name in self.feature_names] for row in feature_rows],
+            dtype=np.float64,
+        ).reshape(-1, len(self.feature_names))
+
+    def score(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (predictions, probabilities of the positive class) for a 2D array"""
+        decision = np.asarray(X, dtype=np.float64) @ self.weights + self.bias
+        # 1 / (1 + exp(-z)) without overflow for large negative z
+        probabilities = np.exp(-np.logaddexp(0.0, -decision))
+        predictions = self.classes[(decision > 0).astype(np.intp)]
+        return predictions, probabilities
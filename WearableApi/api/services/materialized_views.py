@@ -0,0 +1,124 @@
+
+import logging
+import time
+from typing import Dict, Iterable, Optional
+from django.conf import settings
+from django.db import connection, DatabaseError
+from django.utils import timezone
+from api.models import MaterializedViewRefresh
+
+logger = logging.getLogger(__name__)
+
+# Live view -> materialized variant (see MATERIALIZED VARIANTS in Views.sql)
+MATERIALIZED_VIEWS = {
+    'vw_habit_tracking': 'mv_habit_tracking',
+    'vw_habit_stats': 'mv_habit_stats',
+    'vw_heart_rate_stats': 'mv_heart_rate_stats',
+    'vw_heart_rate_today': 'mv_heart_rate_today',
+    'vw_prediction_summary': 'mv_prediction_summary',
+    'vw_desires_stats': 'mv_desires_stats',
+    'vw_daily_summary': 'mv_daily_summary',
+    'vw_weekly_comparison': 'mv_weekly_comparison',
+}
+
+class MaterializedViewService:
+    """
+    Refresh and report on the mv_* snapshots of the dashboard views
+
+    Each refresh is REFRESH MATERIALIZED VIEW CONCURRENTLY, which needs the
+    unique index created in Views.sql and lets readers keep querying the
+    old rows meanwhile. The finish time of the last refresh is stored in
+    MaterializedViewRefresh; it is the freshness the API reports, and a
+    variant that was never refreshed is not served.
+    """
+
+    @staticmethod
+    def interval(view_name: str) -> int:
+        """Seconds between refreshes of one view"""
+        return settings.MATERIALIZED_VIEW_REFRESH_INTERVALS.get(
+            view_name, settings.MATERIALIZED_VIEW_REFRESH_INTERVAL
+        )
+
+    @staticmethod
+    def refresh(view_name: str) -> MaterializedViewRefresh:
+        """Refresh one variant and record when it finished"""
+        table = MATERIALIZED_VIEWS[view_name]
+
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute(f'REFRESH MATERIALIZED VIEW CONCURRENTLY {table}')
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        record, _ = MaterializedViewRefresh.objects.update_or_create(
+            view_name=view_name,
+            defaults={'refreshed_at': timezone.now(), 'duration_ms': duration_ms}
+        )
+        return record
+
+    @classmethod
+    def due(cls, now=None) -> list:
+        """Views whose last refresh is older than their interval"""
+        now = now or timezone.now()
+        last = dict(MaterializedViewRefresh.objects.values_list('view_name', 'refreshed_at'))
+
+        return [
+            view_name for view_name in MATERIALIZED_VIEWS
+            if view_name not in last
+            or (now - last[view_name]).total_seconds() >= cls.interval(view_name)
+        ]
+
+    @classmethod
+    def refresh_many(cls, view_names: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Refresh the given views (default: the ones that are due). A failing
+        view is logged and skipped so it does not hold back the others.
+        """
+        view_names = cls.due() if view_names is None else list(view_names)
+        stats = {'refreshed': {}, 'failed': {}}
+
+        for view_name in view_names:
+            try:
+                record = cls.refresh(view_name)
+                stats['refreshed'][view_name] = round(record.duration_ms, 1)
+            except DatabaseError as e:
+                logger.error(f"Could not refresh {MATERIALIZED_VIEWS[view_name]}: {e}")
+                stats['failed'][view_name] = str(e)
+
+        return stats
+
+    @staticmethod
+    def freshness(view_name: Optional[str] = None):
+        """
+        refreshed_at of one view (None if never refreshed), or a dict with
+        refreshed_at, age and duration for every materialized view
+        """
+        if view_name is not None:
+            return (
+                MaterializedViewRefresh.objects.filter(view_name=view_name)
+                .values_list('refreshed_at', flat=True)
+                .first()
+            )
+
+        now = timezone.now()
+        records = {record.view_name: record for record in MaterializedViewRefresh.objects.all()}
+
+        return {
+            view_name: {
+                'table': table,
+                'refreshed_at': records[view_name].refreshed_at if view_name in records else None,
+                'age_seconds': (
+                    round((now - records[view_name].refreshed_at).total_seconds(), 1)
+                    if view_name in records else None
+                ),
+                'duration_ms': records[view_name].duration_ms if view_name in records else None,
+                'interval_seconds': MaterializedViewService.interval(view_name),
+            }
+            for view_name, table in MATERIALIZED_VIEWS.items()
+        }
+
+    @staticmethod
+    def default_source(view_name: str) -> str:
+        """'materialized' or 'live', from DASHBOARD_MATERIALIZED_VIEWS"""
+        if view_name in settings.DASHBOARD_MATERIALIZED_VIEWS:
+            return 'materialized'
+        return 'live'
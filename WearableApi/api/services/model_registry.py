@@ -0,0 +1,157 @@
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Optional
+import joblib
+from django.conf import settings
+from django.core.cache import cache
+from .linear_scorer import LinearScorer
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """
+    Per-process cache of the craving model package
+
+    The pickle is loaded once per worker process and kept in memory.
+    At most every ML_MODEL_CHECK_INTERVAL seconds the file's mtime and
+    the version key in Redis are compared with the loaded copy. When
+    either changed the package is reloaded and swapped in as a whole,
+    so callers never see a half-updated model/scaler pair. A failed
+    reload keeps serving the previous package.
+
+    When the exported .npz artifact exists it is served instead of the
+    pickle, so the worker never imports scikit-learn. Packages loaded
+    from the pickle get a LinearScorer as well when the model allows it.
+    """
+
+    VERSION_KEY = 'ml_model_version'
+
+    _lock = threading.Lock()
+    _package = None
+    _path = None
+    _mtime = None
+    _version = None
+    _loaded_at = None
+    _load_seconds = None
+    _checked_at = 0.0
+
+    @staticmethod
+    def model_path() -> str:
+        """The NumPy artifact when it has been exported, else the joblib pickle"""
+        if os.path.exists(settings.ML_MODEL_ARTIFACT_PATH):
+            return settings.ML_MODEL_ARTIFACT_PATH
+        return settings.ML_MODEL_PATH
+
+    @classmethod
+    def get(cls) -> Dict:
+        """
+        Return the current model package, loading or reloading it if needed.
+        Raises FileNotFoundError when no model has been trained yet.
+        """
+        package = cls._package
+        if package is not None and time.monotonic() - cls._checked_at < settings.ML_MODEL_CHECK_INTERVAL:
+            return package
+
+        with cls._lock:
+            if cls._package is None or cls._is_stale():
+                cls._load()
+            cls._checked_at = time.monotonic()
+            return cls._package
+
+    @classmethod
+    def _is_stale(cls) -> bool:
+        path = cls.model_path()
+        if path != cls._path:
+            return True
+
+        try:
+            if os.path.getmtime(path) != cls._mtime:
+                return True
+        except OSError:
+            return False  # File is being replaced, keep the loaded model
+
+        return cls.published_version() != cls._version
+
+    @classmethod
+    def _load(cls) -> None:
+        path = cls.model_path()
+        version = cls.published_version()
+
+        started = time.perf_counter()
+        try:
+            mtime = os.path.getmtime(path)
+            package = cls._read(path)
+        except Exception as e:
+            if cls._package is None:
+                raise
+            logger.error(f"Model reload from {path} failed, keeping version {cls._version}: {e}")
+            return
+
+        cls._package = package
+        cls._path = path
+        cls._mtime = mtime
+        cls._version = version
+        cls._load_seconds = time.perf_counter() - started
+        cls._loaded_at = datetime.now(dt_timezone.utc)
+
+        logger.info(
+            f"Loaded ML model from {path} (version: {cls.version()}, "
+            f"{cls._load_seconds * 1000:.0f}ms)"
+        )
+
+    @staticmethod
+    def _read(path: str) -> Dict:
+        if path.endswith('.npz'):
+            return LinearScorer.load(path).package()
+
+        package = joblib.load(path)
+        scorer = LinearScorer.from_package(package)
+        if scorer is not None:
+            package['scorer'] = scorer
+        return package
+
+    @classmethod
+    def published_version(cls) -> Optional[str]:
+        """Version announced in Redis, None when unset or Redis is unreachable"""
+        try:
+            return cache.get(cls.VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Could not read model version key: {e}")
+            return cls._version
+
+    @classmethod
+    def publish_version(cls, version: str) -> None:
+        """Tell every worker to reload the model on its next check"""
+        cache.set(cls.VERSION_KEY, version, timeout=None)
+
+    @classmethod
+    def version(cls) -> Optional[str]:
+        """Version of the loaded package: the published key, else the training date"""
+        if cls._version is not None:
+            return cls._version
+        if cls._package is not None:
+            return cls._package.get('training_date')
+        return None
+
+    @classmethod
+    def info(cls) -> Dict:
+        return {
+            'loaded': cls._package is not None,
+            'path': cls._path or cls.model_path(),
+            'scorer': (
+                ('numpy' if 'scorer' in cls._package else 'sklearn')
+                if cls._package is not None else None
+            ),
+            'version': cls.version(),
+            'loaded_at': cls._loaded_at.isoformat() if cls._loaded_at else None,
+            'load_seconds': round(cls._load_seconds, 4) if cls._load_seconds is not None else None,
+            'file_mtime': (
+                datetime.fromtimestamp(cls._mtime, dt_timezone.utc).isoformat()
+                if cls._mtime is not None else None
+            ),
+            'pid': os.getpid(),
+        }
@@ -0,0 +1,214 @@
+
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+import joblib
+import numpy as np
+from django.conf import settings
+from api.models import Analisis
+from .linear_scorer import LinearScorer
+from .model_registry import ModelRegistry
+from .ventana_features import FEATURE_NAMES, VentanaFeatureService
+
+logger = logging.getLogger(__name__)
+
+class ModelTrainer:
+    """
+    Retrain the craving model inside a worker and publish it safely
+
+    Features come from the same SQL aggregates the prediction path uses,
+    labels from Analisis.urge_label. testers/train_model.py builds its
+    dataset and fits through the same dataset() and fit(). The new pickle
+    and NumPy artifact are written to temporary files and renamed over
+    the served ones, then the version key is bumped so every
+    ModelRegistry reloads on its next check instead of all workers
+    re-reading a half written file.
+    """
+
+    FEATURE_CHUNK_SIZE = 1000
+
+    @classmethod
+    def features(cls, ventana_ids, progress: Optional[Callable] = None) -> Dict[int, list]:
+        """Feature vectors in FEATURE_NAMES order of the ventanas that have lecturas, keyed by id"""
+        ventana_ids = sorted(set(ventana_ids))
+
+        features = {}
+        for start in range(0, len(ventana_ids), cls.FEATURE_CHUNK_SIZE):
+            chunk = ventana_ids[start:start + cls.FEATURE_CHUNK_SIZE]
+            for ventana_id, row in VentanaFeatureService.aggregate_many(chunk).items():
+                row = VentanaFeatureService.features(row, fill_value=0.0)
+                features[ventana_id] = [row[name] for name in FEATURE_NAMES]
+            if progress:
+                progress('features', min(start + len(chunk), len(ventana_ids)), len(ventana_ids))
+
+        return features
+
+    @classmethod
+    def dataset(cls, progress: Optional[Callable] = None, after_analisis_id: Optional[int] = None,
+                max_analisis_id: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (ventana_ids, X, y) with one row per labelled Analisis whose ventana
+        has lecturas, optionally restricted to Analisis ids in
+        (after_analisis_id, max_analisis_id]
+        """
+        labels = Analisis.objects.filter(urge_label__isnull=False)
+        if after_analisis_id is not None:
+            labels = labels.filter(id__gt=after_analisis_id)
+        if max_analisis_id is not None:
+            labels = labels.filter(id__lte=max_analisis_id)
+        labels = list(labels.order_by('id').values_list('ventana_id', 'urge_label'))
+
+        features = cls.features((ventana_id for ventana_id, _ in labels), progress)
+
+        rows = [(ventana_id, label) for ventana_id, label in labels if ventana_id in features]
+        X = np.array([features[ventana_id] for ventana_id, _ in rows], dtype=np.float64)
+        ids = np.array([ventana_id for ventana_id, _ in rows], dtype=np.int64)
+        y = np.array([label for _, label in rows], dtype=np.int64)
+
+        return ids, X.reshape(-1, len(FEATURE_NAMES)), y
+
+    @staticmethod
+    def split(X, y):
+        """80/20 train/test split, stratified when every class has two samples"""
+        # scikit-learn is imported inside the training methods only, so
+        # serving workers do not load it
+        from sklearn.model_selection import train_test_split
+
+        classes, counts = np.unique(y, return_counts=True)
+        if len(classes) < 2:
+            raise ValueError(f"Training needs both classes, only found {classes.tolist()}")
+
+        return train_test_split(
+            X, y,
+            test_size=0.2,
+            random_state=42,
+            stratify=y if counts.min() >= 2 else None
+        )
+
+    @staticmethod
+    def fit_default(X_train, y_train) -> Tuple:
+        """(scaler, model): StandardScaler + the regularised, balanced LogisticRegression"""
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler()
+        model = LogisticRegression(
+            max_iter=1000,
+            random_state=42,
+            class_weight='balanced',
+            C=0.1,
+            penalty='l2',
+            solver='lbfgs'
+        )
+        model.fit(scaler.fit_transform(X_train), y_train)
+
+        return scaler, model
+
+    @staticmethod
+    def evaluate(scaler, model, X_train, y_train, X_test, y_test) -> Dict:
+        """Test-set metrics, plus the train accuracy to spot overfitting"""
+        from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+
+        X_test_scaled = scaler.transform(X_test)
+        y_pred = model.predict(X_test_scaled)
+        metrics = {
+            'accuracy': float(accuracy_score(y_test, y_pred)),
+            'precision': float(precision_score(y_test, y_pred, zero_division=0)),
+            'recall': float(recall_score(y_test, y_pred, zero_division=0)),
+            'f1_score': float(f1_score(y_test, y_pred, zero_division=0)),
+            'train_accuracy': float(accuracy_score(y_train, model.predict(scaler.transform(X_train)))),
+            'train_samples': int(len(y_train)),
+            'test_samples': int(len(y_test)),
+        }
+        if len(np.unique(y_test)) > 1:
+            metrics['roc_auc'] = float(roc_auc_score(y_test, model.predict_proba(X_test_scaled)[:, 1]))
+
+        return metrics
+
+    @classmethod
+    def fit(cls, X, y, fit_model: Optional[Callable] = None) -> Dict:
+        """
+        Split, fit and evaluate, returning the model package the registry
+        serves. fit_model(X_train, y_train) -> (scaler, model[, report])
+        replaces fit_default, e.g. with the hyperparameter search of
+        testers/train_model.py; a report is stored under 'search'.
+        """
+        X_train, X_test, y_train, y_test = cls.split(X, y)
+
+        scaler, model, *report = (fit_model or cls.fit_default)(X_train, y_train)
+
+        package = {
+            'model': model,
+            'scaler': scaler,
+            'feature_names': list(FEATURE_NAMES),
+            'model_name': f'{type(model).__name__}_v1',
+            'training_date': datetime.now().isoformat(),
+            'metrics': cls.evaluate(scaler, model, X_train, y_train, X_test, y_test),
+        }
+        if report and report[0] is not None:
+            package['search'] = report[0]
+
+        return package
+
+    @staticmethod
+    def _replace(source: str, target: str) -> None:
+        """Copy source over target through a temporary file and an atomic rename"""
+        tmp_path = f'{target}.tmp'
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, target)
+
+    @classmethod
+    def publish(cls, package: Dict, version: str) -> Dict:
+        """
+        Write the package next to the served model and swap it in.
+        The pickle goes first, the artifact second (the registry prefers
+        it), and the version key last.
+        """
+        models_dir = os.path.dirname(settings.ML_MODEL_PATH)
+        os.makedirs(models_dir, exist_ok=True)
+        package['version'] = version
+
+        model_path = os.path.join(models_dir, f'smoking_craving_model_{version}.pkl')
+        joblib.dump(package, f'{model_path}.tmp')
+        os.replace(f'{model_path}.tmp', model_path)
+        cls._replace(model_path, settings.ML_MODEL_PATH)
+
+        artifact_path = None
+        scorer = LinearScorer.from_package(package)
+        if scorer is not None:
+            artifact_path = os.path.join(models_dir, f'smoking_craving_model_{version}.npz')
+            scorer.save(artifact_path)
+            cls._replace(artifact_path, settings.ML_MODEL_ARTIFACT_PATH)
+        elif os.path.exists(settings.ML_MODEL_ARTIFACT_PATH):
+            os.remove(settings.ML_MODEL_ARTIFACT_PATH)
+
+        ModelRegistry.publish_version(version)
+        logger.info(f"Published ML model version {version} ({model_path})")
+
+        return {'version': version, 'model_path': model_path, 'artifact_path': artifact_path}
+
+    @classmethod
+    def train(cls, progress: Optional[Callable] = None, publish: bool = True) -> Dict:
+        """Build the dataset, fit, and publish. progress(step, done, total) is called along the way"""
+        _, X, y = cls.dataset(progress)
+        if progress:
+            progress('fit', 0, 1)
+
+        package = cls.fit(X, y)
+        if progress:
+            progress('fit', 1, 1)
+
+        result = {
+            'samples': int(len(y)),
+            'metrics': package['metrics'],
+        }
+
+        if publish:
+            if progress:
+                progress('publish', 0, 1)
+            version = datetime.now().strftime('%Y%m%d_%H%M%S')
+            result.update(cls.publish(package, version))
+
+        return result
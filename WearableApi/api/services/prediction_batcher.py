@@ -0,0 +1,108 @@
+
+import json
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+import redis
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+class PredictionBatcher:
+    """
+    Micro-batching queue for craving predictions
+
+    submit() appends a request to a Redis list and makes sure one
+    predict_smoking_craving_batch task is scheduled. That task collects
+    requests for a short window, scores them as a single matrix and
+    stores every result under its request id for check_task_status.
+    """
+
+    KEY_PREFIX = 'prediction_batch'
+    QUEUE_KEY = f'{KEY_PREFIX}:queue'
+    SCHEDULED_KEY = f'{KEY_PREFIX}:scheduled'
+    RESULT_TIMEOUT = 3600
+
+    _client = None
+
+    @classmethod
+    def client(cls) -> redis.Redis:
+        if cls._client is None:
+            cls._client = redis.Redis.from_url(settings.PREDICTION_BATCH_REDIS_URL)
+        return cls._client
+
+    @staticmethod
+    def is_enabled() -> bool:
+        return settings.PREDICTION_MODE == 'batched'
+
+    @classmethod
+    def result_key(cls, request_id) -> str:
+        return f'{cls.KEY_PREFIX}:result:{request_id}'
+
+    @classmethod
+    def submit(cls, user_id, features_dict=None) -> str:
+        """Queue a prediction request and return its id"""
+        request_id = str(uuid.uuid4())
+        cache.set(cls.result_key(request_id), {'status': 'pending'}, timeout=cls.RESULT_TIMEOUT)
+
+        cls.client().rpush(cls.QUEUE_KEY, json.dumps({
+            'request_id': request_id,
+            'user_id': user_id,
+            'features_dict': features_dict,
+        }))
+        cls.schedule()
+
+        return request_id
+
+    @classmethod
+    def schedule(cls) -> None:
+        """Enqueue a batch task unless one is already waiting to run"""
+        if cache.add(cls.SCHEDULED_KEY, True, timeout=60):
+            from api.tasks import predict_smoking_craving_batch
+            predict_smoking_craving_batch.delay()
+
+    @classmethod
+    def collect(cls) -> List[Dict]:
+        """
+        Pop up to PREDICTION_BATCH_MAX_SIZE requests, waiting at most
+        PREDICTION_BATCH_MAX_WAIT_MS for the batch to fill up
+        """
+        # Requests submitted from now on schedule the next batch
+        cache.delete(cls.SCHEDULED_KEY)
+
+        client = cls.client()
+        max_size = settings.PREDICTION_BATCH_MAX_SIZE
+        deadline = time.monotonic() + settings.PREDICTION_BATCH_MAX_WAIT_MS / 1000
+
+        raw_requests = []
+        while len(raw_requests) < max_size:
+            popped = client.lpop(cls.QUEUE_KEY, max_size - len(raw_requests))
+            if popped:
+                raw_requests.extend(popped)
+                continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            popped = client.blpop(cls.QUEUE_KEY, timeout=remaining)
+            if popped is None:
+                break
+            raw_requests.append(popped[1])
+
+        # Anything left over (a full batch) goes to the next task
+        if client.llen(cls.QUEUE_KEY):
+            cls.schedule()
+
+        return [json.loads(raw) for raw in raw_requests]
+
+    @classmethod
+    def store_result(cls, request_id, result: Dict) -> None:
+        cache.set(cls.result_key(request_id), result, timeout=cls.RESULT_TIMEOUT)
+
+    @classmethod
+    def result(cls, request_id) -> Optional[Dict]:
+        """Result of a batched request, {'status': 'pending'} until scored, None if unknown"""
+        return cache.get(cls.result_key(request_id))
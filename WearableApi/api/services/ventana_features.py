@@ -0,0 +1,110 @@
+
+import logging
+from typing import Dict, Iterable
+from django.db.models import Avg, Count, F, FloatField, Max, Min, StdDev, Sum
+from django.db.models.functions import Sqrt
+from api.models import Lectura
+
+logger = logging.getLogger(__name__)
+
+ACCEL_FIELDS = ('accel_x', 'accel_y', 'accel_z')
+GYRO_FIELDS = ('gyro_x', 'gyro_y', 'gyro_z')
+
+FEATURE_NAMES = (
+    'hr_mean', 'hr_std', 'hr_min', 'hr_max', 'hr_range',
+    'accel_magnitude_mean', 'accel_magnitude_std',
+    'gyro_magnitude_mean', 'gyro_magnitude_std',
+    'accel_energy', 'gyro_energy',
+)
+
+def _magnitude(fields):
+    """sqrt(x*x + y*y + z*z), NULL when any axis is missing"""
+    x, y, z = (F(field) for field in fields)
+    return Sqrt(x * x + y * y + z * z, output_field=FloatField())
+
+def _aggregates():
+    aggregates = {
+        'lectura_count': Count('id'),
+        'hr_count': Count('heart_rate'),
+        'hr_mean': Avg('heart_rate'),
+        'hr_std': StdDev('heart_rate'),
+        'hr_min': Min('heart_rate'),
+        'hr_max': Max('heart_rate'),
+        'accel_magnitude_mean': Avg(_magnitude(ACCEL_FIELDS)),
+        'accel_magnitude_std': StdDev(_magnitude(ACCEL_FIELDS)),
+        'gyro_magnitude_mean': Avg(_magnitude(GYRO_FIELDS)),
+        'gyro_magnitude_std': StdDev(_magnitude(GYRO_FIELDS)),
+    }
+    for field in ACCEL_FIELDS + GYRO_FIELDS:
+        aggregates[f'{field}_count'] = Count(field)
+        aggregates[f'{field}_sum_squares'] = Sum(F(field) * F(field), output_field=FloatField())
+    return aggregates
+
+def _energy(row, fields):
+    """Sum of squared values over all axes, None unless every axis has values"""
+    sums = [row[f'{field}_sum_squares'] for field in fields]
+    return None if None in sums else sum(sums)
+
+class VentanaFeatureService:
+    """
+    Sensor features of a ventana computed by the database
+
+    All features come from one SQL aggregate query over lecturas (AVG,
+    STDDEV_POP, MIN, MAX, per-axis SUM of squares, magnitudes via SQRT),
+    so no Lectura instances are loaded. Missing values are skipped the
+    way SQL aggregates skip NULL, a magnitude needs all three axes.
+    Standard deviations are population values, matching np.std.
+    ModelTrainer.dataset builds the training features from these same
+    aggregates, so training and serving see the same features.
+    """
+
+    @staticmethod
+    def _finish(row: Dict) -> Dict:
+        if row['hr_min'] is not None and row['hr_max'] is not None:
+            row['hr_range'] = row['hr_max'] - row['hr_min']
+        else:
+            row['hr_range'] = None
+        row['accel_energy'] = _energy(row, ACCEL_FIELDS)
+        row['gyro_energy'] = _energy(row, GYRO_FIELDS)
+        return row
+
+    @classmethod
+    def aggregate(cls, ventana_id) -> Dict:
+        """Feature row for one ventana, one query"""
+        row = Lectura.objects.filter(ventana_id=ventana_id).aggregate(**_aggregates())
+        return cls._finish(row)
+
+    @classmethod
+    def aggregate_many(cls, ventana_ids: Iterable[int]) -> Dict[int, Dict]:
+        """Feature rows for many ventanas in one GROUP BY query, keyed by ventana id"""
+        rows = (
+            Lectura.objects.filter(ventana_id__in=list(ventana_ids))
+            .order_by()
+            .values('ventana_id')
+            .annotate(**_aggregates())
+        )
+        return {row.pop('ventana_id'): cls._finish(row) for row in rows}
+
+    @staticmethod
+    def features(row: Dict, fill_value=None) -> Dict:
+        """Model feature dict from an aggregate row, None replaced by fill_value"""
+        return {
+            name: float(row[name]) if row[name] is not None else fill_value
+            for name in FEATURE_NAMES
+        }
+
+    @staticmethod
+    def accumulator_state(row: Dict) -> Dict:
+        """Express an aggregate row as a VentanaStatsService accumulator state"""
+        hr_count = row['hr_count']
+
+        return {
+            'lectura_count': row['lectura_count'],
+            'hr_count': hr_count,
+            'hr_mean': row['hr_mean'] if hr_count else 0.0,
+            'hr_m2': row['hr_std'] ** 2 * hr_count if hr_count else 0.0,
+            'accel_counts': [row[f'{field}_count'] for field in ACCEL_FIELDS],
+            'accel_sum_squares': sum(row[f'{field}_sum_squares'] or 0.0 for field in ACCEL_FIELDS),
+            'gyro_counts': [row[f'{field}_count'] for field in GYRO_FIELDS],
+            'gyro_sum_squares': sum(row[f'{field}_sum_squares'] or 0.0 for field in GYRO_FIELDS),
+        }
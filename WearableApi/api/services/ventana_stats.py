@@ -0,0 +1,229 @@
+
+import logging
+import math
+from typing import Dict, Iterable
+import numpy as np
+from django.db import transaction
+from api.models import AcumuladorVentana, Lectura, Ventana
+from .ventana_features import VentanaFeatureService
+
+logger = logging.getLogger(__name__)
+
+HR_FIELD = 'heart_rate'
+ACCEL_FIELDS = ('accel_x', 'accel_y', 'accel_z')
+GYRO_FIELDS = ('gyro_x', 'gyro_y', 'gyro_z')
+STAT_FIELDS = (HR_FIELD,) + ACCEL_FIELDS + GYRO_FIELDS
+
+STATE_FIELDS = (
+    'lectura_count',
+    'hr_count', 'hr_mean', 'hr_m2',
+    'accel_counts', 'accel_sum_squares',
+    'gyro_counts', 'gyro_sum_squares',
+)
+
+class VentanaStatsService:
+    """
+    Running per-ventana sensor statistics maintained at ingest time
+
+    Each insert folds its readings into the ventana's AcumuladorVentana
+    (Welford mean/M2 for heart rate, sums of squares for the motion
+    sensors) inside the insert transaction. calculate_ventana_statistics
+    then fills the Ventana fields from that state without reading lecturas.
+    """
+
+    @staticmethod
+    def sample_matrix(lecturas: Iterable[Lectura]) -> np.ndarray:
+        """(n, 7) float matrix in STAT_FIELDS order, NaN for missing values"""
+        rows = [[getattr(lectura, field) for field in STAT_FIELDS] for lectura in lecturas]
+        return np.array(rows, dtype=float).reshape(-1, len(STAT_FIELDS))
+
+    @staticmethod
+    def moments(values: np.ndarray) -> Dict:
+        """Accumulator state for a sample matrix"""
+        heart_rates = values[:, 0]
+        heart_rates = heart_rates[~np.isnan(heart_rates)]
+        accel = values[:, 1:4]
+        gyro = values[:, 4:7]
+
+        hr_mean = float(heart_rates.mean()) if heart_rates.size else 0.0
+
+        return {
+            'lectura_count': len(values),
+            'hr_count': int(heart_rates.size),
+            'hr_mean': hr_mean,
+            'hr_m2': float(np.sum((heart_rates - hr_mean) ** 2)),
+            'accel_counts': (~np.isnan(accel)).sum(axis=0).tolist(),
+            'accel_sum_squares': float(np.nansum(accel ** 2)),
+            'gyro_counts': (~np.isnan(gyro)).sum(axis=0).tolist(),
+            'gyro_sum_squares': float(np.nansum(gyro ** 2)),
+        }
+
+    @staticmethod
+    def merge(state: Dict, batch: Dict) -> Dict:
+        """Combine two accumulator states (Chan et al. parallel Welford update)"""
+        n_a = state['hr_count']
+        n_b = batch['hr_count']
+        n = n_a + n_b
+
+        if n_b == 0:
+            hr_mean, hr_m2 = state['hr_mean'], state['hr_m2']
+        else:
+            delta = batch['hr_mean'] - state['hr_mean']
+            hr_mean = state['hr_mean'] + delta * n_b / n
+            hr_m2 = state['hr_m2'] + batch['hr_m2'] + delta ** 2 * n_a * n_b / n
+
+        def add_counts(a, b):
+            return [x + y for x, y in zip(a or [0, 0, 0], b or [0, 0, 0])]
+
+        return {
+            'lectura_count': state['lectura_count'] + batch['lectura_count'],
+            'hr_count': n,
+            'hr_mean': hr_mean,
+            'hr_m2': hr_m2,
+            'accel_counts': add_counts(state['accel_counts'], batch['accel_counts']),
+            'accel_sum_squares': state['accel_sum_squares'] + batch['accel_sum_squares'],
+            'gyro_counts': add_counts(state['gyro_counts'], batch['gyro_counts']),
+            'gyro_sum_squares': state['gyro_sum_squares'] + batch['gyro_sum_squares'],
+        }
+
+    @staticmethod
+    def state(acumulador: AcumuladorVentana) -> Dict:
+        return {field: getattr(acumulador, field) for field in STATE_FIELDS}
+
+    @staticmethod
+    def statistics(state: Dict) -> Dict:
+        """
+        Ventana fields from an accumulator state. hr_std is the population
+        standard deviation, energies need values on all three axes.
+        """
+        hr_count = state['hr_count']
+        accel_counts = state['accel_counts'] or [0, 0, 0]
+        gyro_counts = state['gyro_counts'] or [0, 0, 0]
+
+        return {
+            'hr_mean': state['hr_mean'] if hr_count else None,
+            'hr_std': math.sqrt(max(state['hr_m2'], 0.0) / hr_count) if hr_count else None,
+            'accel_energy': state['accel_sum_squares'] if all(accel_counts) else None,
+            'gyro_energy': state['gyro_sum_squares'] if all(gyro_counts) else None,
+        }
+
+    @classmethod
+    def accumulate(cls, ventana_id, lecturas: Iterable[Lectura]) -> None:
+        """
+        Fold newly inserted lecturas into the ventana's accumulator
+
+        Call inside the insert transaction after LecturaCounter.increment,
+        whose UPDATE already holds the ventana row lock, so concurrent
+        inserts for the same ventana are applied one after the other.
+        """
+        batch = cls.moments(cls.sample_matrix(lecturas))
+
+        acumulador, _ = AcumuladorVentana.objects.select_for_update().get_or_create(
+            ventana_id=ventana_id
+        )
+        for field, value in cls.merge(cls.state(acumulador), batch).items():
+            setattr(acumulador, field, value)
+        acumulador.save()
+
+    @staticmethod
+    def recompute(ventana_id) -> Dict:
+        """Accumulator state from a full aggregate over the ventana's lecturas"""
+        return VentanaFeatureService.accumulator_state(VentanaFeatureService.aggregate(ventana_id))
+
+    @classmethod
+    def rebuild(cls, ventana_id) -> Dict:
+        """
+        Recompute the accumulator from scratch. The ventana row is locked
+        so inserts committing meanwhile are folded in after the rebuild.
+        """
+        with transaction.atomic():
+            list(Ventana.objects.select_for_update().filter(id=ventana_id).values_list('id'))
+            state = cls.recompute(ventana_id)
+            AcumuladorVentana.objects.update_or_create(ventana_id=ventana_id, defaults=state)
+
+        logger.info(f"Rebuilt accumulator for Ventana {ventana_id} ({state['lectura_count']} readings)")
+        return state
+
+    @classmethod
+    def current(cls, ventana: Ventana) -> Dict:
+        """
+        Accumulator state for a ventana, rebuilt when it does not cover
+        every lectura (rows loaded with COPY or stored before ingest-time
+        accumulation existed).
+        """
+        acumulador = AcumuladorVentana.objects.filter(ventana_id=ventana.id).first()
+
+        if acumulador is not None and acumulador.lectura_count == ventana.lectura_count:
+            return cls.state(acumulador)
+
+        return cls.rebuild(ventana.id)
+
+    @classmethod
+    def current_many(cls, ventanas: Iterable[Ventana]) -> Dict[int, Dict]:
+        """
+        Accumulator states for a chunk of ventanas, keyed by id
+
+        Complete accumulators are used as they are. The remaining ventanas
+        are rebuilt from a single GROUP BY aggregate over their lecturas
+        and upserted in bulk.
+        """
+        ventanas = list(ventanas)
+        acumuladores = AcumuladorVentana.objects.in_bulk([ventana.id for ventana in ventanas])
+
+        states = {}
+        stale_ids = []
+        for ventana in ventanas:
+            acumulador = acumuladores.get(ventana.id)
+            if acumulador is not None and acumulador.lectura_count == ventana.lectura_count:
+                states[ventana.id] = cls.state(acumulador)
+            else:
+                stale_ids.append(ventana.id)
+
+        if not stale_ids:
+            return states
+
+        with transaction.atomic():
+            # Same lock as rebuild(), taken in id order to avoid deadlocks
+            list(
+                Ventana.objects.select_for_update().filter(id__in=stale_ids)
+                .order_by('id').values_list('id')
+            )
+            rows = VentanaFeatureService.aggregate_many(stale_ids)
+            empty = cls.moments(np.empty((0, len(STAT_FIELDS))))
+            rebuilt = {
+                ventana_id: (
+                    VentanaFeatureService.accumulator_state(rows[ventana_id])
+                    if ventana_id in rows else dict(empty)
+                )
+                for ventana_id in stale_ids
+            }
+
+            AcumuladorVentana.objects.bulk_create(
+                [AcumuladorVentana(ventana_id=ventana_id, **state) for ventana_id, state in rebuilt.items()],
+                update_conflicts=True,
+                unique_fields=['ventana'],
+                update_fields=list(STATE_FIELDS) + ['updated_at']
+            )
+
+        logger.info(f"Rebuilt {len(stale_ids)} accumulators with one aggregate query")
+
+        states.update(rebuilt)
+        return states
+
+    @classmethod
+    def verify(cls, ventana_id, statistics: Dict, rel_tol=1e-9) -> Dict:
+        """Compare statistics with a full recompute and return the fields that differ"""
+        expected = cls.statistics(cls.recompute(ventana_id))
+
+        mismatches = {}
+        for field, value in expected.items():
+            actual = statistics.get(field)
+            if value is None or actual is None:
+                matches = value is actual
+            else:
+                matches = math.isclose(actual, value, rel_tol=rel_tol, abs_tol=1e-9)
+
+            if not matches:
+                mismatches[field] = {'incremental': actual, 'recomputed': value}
+
+        return mismatches
@@ -0,0 +1,83 @@
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from api.models import Analisis, Deseo, Formulario, Ventana
+from api.services.daily_rollup import DailyRollupService
+
+# Daily rollups (resumenes_diarios / resumenes_habito_diarios) follow the
+# rows they count. pre_save remembers the timestamps a row had before an
+# update, so the day it leaves is recomputed as well as the day it enters.
+
+# Ventana fields that decide which consumer's day a window counts on
+VENTANA_DAY_FIELDS = {'consumidor', 'consumidor_id', 'window_start'}
+
+@receiver(pre_save, sender=Formulario)
+def remember_formulario_day(sender, instance, **kwargs):
+    instance._rollup_previous = (
+        sender.objects.filter(pk=instance.pk).values_list('consumidor_id', 'fecha_envio').first()
+        if instance.pk else None
+    )
+
+@receiver(pre_save, sender=Deseo)
+def remember_deseo_days(sender, instance, **kwargs):
+    instance._rollup_previous = (
+        sender.objects.filter(pk=instance.pk).values_list('consumidor_id', 'created_at', 'updated_at').first()
+        if instance.pk else None
+    )
+
+@receiver(pre_save, sender=Ventana)
+def remember_ventana_day(sender, instance, update_fields=None, **kwargs):
+    # Ingestion saves only window_end / lectura_count, skip the lookup for
+    # saves that cannot move the window
+    if update_fields is not None and not VENTANA_DAY_FIELDS & set(update_fields):
+        instance._rollup_previous = None
+        return
+
+    instance._rollup_previous = (
+        sender.objects.filter(pk=instance.pk).values_list('consumidor_id', 'window_start').first()
+        if instance.pk else None
+    )
+
+@receiver(post_save, sender=Formulario)
+@receiver(post_save, sender=Deseo)
+@receiver(post_delete, sender=Formulario)
+@receiver(post_delete, sender=Deseo)
+def update_rollups_for_event(sender, instance, **kwargs):
+    if sender is Formulario:
+        DailyRollupService.touch(instance.consumidor_id, instance.fecha_envio)
+    else:
+        DailyRollupService.touch(instance.consumidor_id, instance.created_at, instance.updated_at)
+
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous:
+        DailyRollupService.touch(*previous)
+
+@receiver(post_save, sender=Analisis)
+@receiver(post_delete, sender=Analisis)
+def update_rollups_for_analisis(sender, instance, **kwargs):
+    ventana = Ventana.objects.filter(pk=instance.ventana_id).values_list('consumidor_id', 'window_start').first()
+    if ventana:
+        DailyRollupService.touch(*ventana)
+
+@receiver(post_save, sender=Ventana)
+@receiver(post_delete, sender=Ventana)
+def update_rollups_for_ventana(sender, instance, created=False, update_fields=None, **kwargs):
+    # A window moved to another consumer or day leaves its old day, with
+    # its hr_mean and predictions
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous and instance.window_start is not None and (
+        previous[0] != instance.consumidor_id
+        or DailyRollupService.fecha(previous[1]) != DailyRollupService.fecha(instance.window_start)
+    ):
+        DailyRollupService.touch(*previous)
+        DailyRollupService.touch(instance.consumidor_id, instance.window_start)
+        return
+
+    # Only the heart rate average is rolled up, window_end/lectura_count
+    # saves during ingestion do not touch it
+    if update_fields is not None and 'hr_mean' not in update_fields:
+        return
+    if created and instance.hr_mean is None:
+        return
+
+    DailyRollupService.touch(instance.consumidor_id, instance.window_start)
@@ -1,12 +1,16 @@
 from celery import shared_task
 import logging
-import numpy as np
-import pandas as pd
+import time
 from datetime import timedelta
-from django.db import models
+from django.conf import settings
+from django.db import models, connection, transaction, DatabaseError, OperationalError
 from django.core.cache import cache
 from django.utils import timezone
-from api.models import Consumidor, Analisis, Ventana, Usuario, Notificacion, Deseo, Lectura
+from api.models import Consumidor, Analisis, Ventana, Usuario, Notificacion, Deseo
+from api.services import (
+    LecturaBuffer, LecturaCounter, LecturaIngestionService, VentanaFeatureService, VentanaStatsService, ModelRegistry,
+    PredictionBatcher, ModelTrainer, MaterializedViewService, DailyRollupService, DashboardCache
+)
 
 logger = logging.getLogger(__name__)
 
@@ -23,234 +27,352 @@ def calculate_features_from_readings(consumidor, time_window_minutes=30):
         return None
     
     ventana = recent_ventanas.first()
-    lecturas = Lectura.objects.filter(ventana=ventana)
+    row = VentanaFeatureService.aggregate(ventana.id)
     
-    if not lecturas.exists():
+    if not row['lectura_count']:
         logger.warning(f"No lecturas found in ventana {ventana.id}")
         return None
     
-    heart_rates = [l.heart_rate or 0 for l in lecturas]
-    accel_x = [l.accel_x or 0 for l in lecturas]
-    accel_y = [l.accel_y or 0 for l in lecturas]
-    accel_z = [l.accel_z or 0 for l in lecturas]
-    gyro_x = [l.gyro_x or 0 for l in lecturas]
-    gyro_y = [l.gyro_y or 0 for l in lecturas]
-    gyro_z = [l.gyro_z or 0 for l in lecturas]
+    # The model needs every feature, a sensor without data counts as zero
+    # like the fillna(0) used at training time
+    features = VentanaFeatureService.features(row, fill_value=0.0)
     
-    hr_array = np.array(heart_rates)
+    return features, ventana
+
+def prepare_prediction(user_id, features_dict=None):
+    """
+    Resolve the consumidor and the features for a prediction request
     
-    accel_magnitude = np.sqrt(
-        np.array(accel_x)**2 + 
-        np.array(accel_y)**2 + 
-        np.array(accel_z)**2
-    )
+    Returns (consumidor, features_dict, existing_ventana, error). error is
+    the task result to report when the request cannot be scored.
+    """
+    try:
+        usuario = Usuario.objects.get(id=user_id)
+    except Usuario.DoesNotExist:
+        error_msg = f"Usuario {user_id} does not exist"
+        logger.error(error_msg)
+        return None, None, None, {
+            'success': False,
+            'error': error_msg
+        }
     
-    gyro_magnitude = np.sqrt(
-        np.array(gyro_x)**2 + 
-        np.array(gyro_y)**2 + 
-        np.array(gyro_z)**2
-    )
+    try:
+        consumidor = usuario.consumidor
+    except Consumidor.DoesNotExist:
+        error_msg = f"Usuario {user_id} has no linked Consumidor record"
+        logger.error(error_msg)
+        return None, None, None, {
+            'success': False,
+            'error': error_msg,
+            'user_id': user_id,
+            'user_email': usuario.email,
+            'suggestion': 'Create a Consumidor record for this Usuario'
+        }
     
-    features = {
-        'hr_mean': float(np.mean(hr_array)),
-        'hr_std': float(np.std(hr_array)),
-        'hr_min': float(np.min(hr_array)),
-        'hr_max': float(np.max(hr_array)),
-        'hr_range': float(np.max(hr_array) - np.min(hr_array)),
-        'accel_magnitude_mean': float(np.mean(accel_magnitude)),
-        'accel_magnitude_std': float(np.std(accel_magnitude)),
-        'gyro_magnitude_mean': float(np.mean(gyro_magnitude)),
-        'gyro_magnitude_std': float(np.std(gyro_magnitude)),
-        'accel_energy': float(np.sum(np.array(accel_x)**2 + np.array(accel_y)**2 + np.array(accel_z)**2)),
-        'gyro_energy': float(np.sum(np.array(gyro_x)**2 + np.array(gyro_y)**2 + np.array(gyro_z)**2)),
-    }
+    logger.info(f"Received features_dict: {features_dict}")
     
-    return features, ventana
-
-@shared_task(bind=True, max_retries=3)
-def predict_smoking_craving(self, user_id, features_dict=None):
-    try:
-        logger.info(f"Starting prediction for user {user_id}")
+    if features_dict is None or len(features_dict) == 0 or 'hr_mean' not in features_dict:
+        logger.info(f"Calculating features from sensor readings for consumidor {consumidor.id}")
+        result = calculate_features_from_readings(consumidor)
         
-        try:
-            usuario = Usuario.objects.get(id=user_id)
-        except Usuario.DoesNotExist:
-            error_msg = f"Usuario {user_id} does not exist"
-            logger.error(error_msg)
-            return {
-                'success': False,
-                'error': error_msg
-            }
-        
-        try:
-            consumidor = usuario.consumidor
-        except Consumidor.DoesNotExist:
-            error_msg = f"Usuario {user_id} has no linked Consumidor record"
+        if result is None:
+            error_msg = "No recent sensor readings found. Cannot make prediction."
             logger.error(error_msg)
-            return {
+            return consumidor, None, None, {
                 'success': False,
                 'error': error_msg,
-                'user_id': user_id,
-                'user_email': usuario.email,
-                'suggestion': 'Create a Consumidor record for this Usuario'
+                'suggestion': 'Ensure wearable is sending sensor data (Lectura records)'
             }
         
-        logger.info(f"Received features_dict: {features_dict}")
-        logger.info(f"features_dict is None: {features_dict is None}")
-        logger.info(f"features_dict type: {type(features_dict)}")
-        
-        if features_dict is None or len(features_dict) == 0 or 'hr_mean' not in features_dict:
-            logger.info(f"Calculating features from sensor readings for consumidor {consumidor.id}")
-            result = calculate_features_from_readings(consumidor)
-            
-            if result is None:
-                error_msg = "No recent sensor readings found. Cannot make prediction."
-                logger.error(error_msg)
-                return {
-                    'success': False,
-                    'error': error_msg,
-                    'suggestion': 'Ensure wearable is sending sensor data (Lectura records)'
-                }
-            
-            features_dict, existing_ventana = result
-            logger.info(f"Features calculated: {features_dict}")
-        else:
-            logger.info(f"Using provided manual features")
-            existing_ventana = None
-        
-        try:
-            import joblib
-            
-            model_package = cache.get('ml_model_package')
-            if model_package is None:
-                model_package = joblib.load('models/smoking_craving_model.pkl')
-                cache.set('ml_model_package', model_package, timeout=3600)
-            
-            model = model_package['model']
-            scaler = model_package['scaler']
-            feature_names = model_package['feature_names']
-            
-        except FileNotFoundError:
-            error_msg = "ML model file not found at 'models/smoking_craving_model.pkl'"
-            logger.error(error_msg)
-            return {
-                'success': False,
-                'error': error_msg,
-                'suggestion': 'Train and save your ML model first'
-            }
-        except KeyError as e:
-            error_msg = f"Model package missing key: {e}. Retrain the model."
-            logger.error(error_msg)
-            return {
-                'success': False,
-                'error': error_msg
-            }
-        except Exception as e:
-            logger.error(f"Error loading model: {e}")
-            return {
-                'success': False,
-                'error': f'Model loading failed: {str(e)}'
-            }
+        features_dict, existing_ventana = result
+        logger.info(f"Features calculated: {features_dict}")
+    else:
+        logger.info(f"Using provided manual features")
+        existing_ventana = None
+    
+    return consumidor, features_dict, existing_ventana, None
+
+def load_model_package():
+    """Return (model_package, error) from the in-process ModelRegistry"""
+    try:
+        # Kept in this worker's memory, reloaded only when the file or
+        # the published version changes
+        model_package = ModelRegistry.get()
         
-        features_df = pd.DataFrame([features_dict])
+        required = ('feature_names',) if 'scorer' in model_package else ('model', 'scaler', 'feature_names')
+        missing = [key for key in required if key not in model_package]
+        if missing:
+            raise KeyError(missing[0])
         
-        try:
-            features_df = features_df[feature_names]
-        except KeyError as e:
-            error_msg = f"Missing required features: {e}. Required: {feature_names}"
-            logger.error(error_msg)
-            return {
-                'success': False,
-                'error': error_msg
-            }
+        return model_package, None
         
-        features_scaled = scaler.transform(features_df)
-        
-        prediction = model.predict(features_scaled)[0]
-        probability = model.predict_proba(features_scaled)[0][1]
-        
-        model_metrics = model_package.get('metrics', {})
-        accuracy = model_metrics.get('accuracy')
-        precision = model_metrics.get('precision')
-        recall = model_metrics.get('recall')
-        f1 = model_metrics.get('f1_score')
-        if probability >= 0.7:
-            risk_level = 'high'
-            comentario = f'Alto riesgo de deseo detectado ({probability*100:.1f}%). Intervención inmediata recomendada.'
-        elif probability >= 0.4:
-            risk_level = 'medium'
-            comentario = f'Riesgo moderado de deseo ({probability*100:.1f}%). Monitoreo continuo recomendado.'
-        else:
-            risk_level = 'low'
-            comentario = f'Bajo riesgo de deseo ({probability*100:.1f}%). Estado estable.'
+    except FileNotFoundError:
+        error_msg = f"ML model file not found at '{ModelRegistry.model_path()}'"
+        logger.error(error_msg)
+        return None, {
+            'success': False,
+            'error': error_msg,
+            'suggestion': 'Train and save your ML model first'
+        }
+    except KeyError as e:
+        error_msg = f"Model package missing key: {e}. Retrain the model."
+        logger.error(error_msg)
+        return None, {
+            'success': False,
+            'error': error_msg
+        }
+    except Exception as e:
+        logger.error(f"Error loading model: {e}")
+        return None, {
+            'success': False,
+            'error': f'Model loading failed: {str(e)}'
+        }
+
+def missing_features_error(model_package, features_dict):
+    """Error result when features_dict lacks a feature the model needs"""
+    feature_names = model_package['feature_names']
+    missing = [name for name in feature_names if name not in features_dict]
+    
+    if not missing:
+        return None
+    
+    error_msg = f"Missing required features: {missing}. Required: {feature_names}"
+    logger.error(error_msg)
+    return {
+        'success': False,
+        'error': error_msg
+    }
+
+def score_features(model_package, feature_rows):
+    """
+    Score feature dicts as one matrix
+    Returns (predictions, probabilities) arrays aligned with feature_rows
+    """
+    scorer = model_package.get('scorer')
+    if scorer is not None:
+        return scorer.score(scorer.matrix(feature_rows))
+    
+    # Non-linear models still go through scikit-learn, pandas is only
+    # imported by workers that actually serve one
+    import pandas as pd
+    
+    features_df = pd.DataFrame(feature_rows)[model_package['feature_names']]
+    features_scaled = model_package['scaler'].transform(features_df)
+    
+    model = model_package['model']
+    return model.predict(features_scaled), model.predict_proba(features_scaled)[:, 1]
+
+def record_prediction(user_id, consumidor, features_dict, existing_ventana,
+                      prediction, probability, model_package):
+    """Store the Analisis (plus Deseo/Notificacion on high risk) and build the task result"""
+    model_metrics = model_package.get('metrics', {})
+    accuracy = model_metrics.get('accuracy')
+    precision = model_metrics.get('precision')
+    recall = model_metrics.get('recall')
+    f1 = model_metrics.get('f1_score')
+    if probability >= 0.7:
+        risk_level = 'high'
+        comentario = f'Alto riesgo de deseo detectado ({probability*100:.1f}%). Intervención inmediata recomendada.'
+    elif probability >= 0.4:
+        risk_level = 'medium'
+        comentario = f'Riesgo moderado de deseo ({probability*100:.1f}%). Monitoreo continuo recomendado.'
+    else:
+        risk_level = 'low'
+        comentario = f'Bajo riesgo de deseo ({probability*100:.1f}%). Estado estable.'
+    
+    logger.info(f"Prediction: probability={probability:.2%}, risk={risk_level}")
+    
+    if existing_ventana:
+        ventana = existing_ventana
+    else:
+        ventana = Ventana.objects.create(
+            consumidor=consumidor,
+            window_start=timezone.now(),
+            window_end=timezone.now() + timezone.timedelta(minutes=30)
+        )
+    
+    ventana.hr_mean = features_dict.get('hr_mean')
+    ventana.hr_std = features_dict.get('hr_std')
+    ventana.accel_energy = features_dict.get('accel_energy')
+    ventana.gyro_energy = features_dict.get('gyro_energy')
+    ventana.save(update_fields=['hr_mean', 'hr_std', 'accel_energy', 'gyro_energy', 'updated_at'])
+    
+    logger.info(f"Features saved to Ventana ID {ventana.id}")
+    
+    analisis = Analisis.objects.create(
+        ventana=ventana,
+        probabilidad_modelo=float(probability),
+        urge_label=int(prediction),
+        modelo_usado=model_package.get('model_name') or 'LogisticRegression_v1',
+        recall=recall,
+        f1_score=f1,
+        accuracy=accuracy,
+        roc_auc=None,
+        comentario_modelo=comentario
+    )
+    
+    logger.info(f"Prediction saved: Analisis ID {analisis.id}, risk={risk_level}, prob={probability:.2%}")
+    
+    if risk_level == 'high':
+        deseo = Deseo.objects.create(
+            consumidor=consumidor,
+            ventana=ventana,
+            tipo='sustancia',
+            resolved=False
+        )
         
-        logger.info(f"Prediction: probability={probability:.2%}, risk={risk_level}")
+        Notificacion.objects.create(
+            consumidor=consumidor,
+            deseo=deseo,
+            contenido=comentario,
+            tipo='alerta',
+            leida=False
+        )
         
-        if existing_ventana:
-            ventana = existing_ventana
-        else:
-            ventana = Ventana.objects.create(
-                consumidor=consumidor,
-                window_start=timezone.now(),
-                window_end=timezone.now() + timezone.timedelta(minutes=30)
+        logger.info(f"High risk notification created for consumidor {consumidor.id}")
+    
+    DashboardCache.invalidate(consumidor.id)
+    
+    return {
+        'success': True,
+        'analisis_id': analisis.id,
+        'probability': float(probability),
+        'prediction': int(prediction),
+        'risk_level': risk_level,
+        'comentario': comentario,
+        'model_metrics': {
+            'accuracy': accuracy,
+            'precision': precision,
+            'recall': recall,
+            'f1_score': f1
+        },
+        'model_version': ModelRegistry.version(),
+        'user_id': user_id,
+        'consumidor_id': consumidor.id
+    }
+
+def enqueue_prediction(user_id, features_dict=None, countdown=None):
+    """
+    Queue a craving prediction and return the id to poll with check_task_status
+    With PREDICTION_MODE='batched' the request joins the next micro-batch
+    """
+    if PredictionBatcher.is_enabled():
+        return PredictionBatcher.submit(user_id, features_dict)
+    
+    return predict_smoking_craving.apply_async(
+        kwargs={'user_id': user_id, 'features_dict': features_dict},
+        countdown=countdown
+    ).id
+
+def predict_inline(user_id, features_dict=None, budget_ms=None):
+    """
+    Run a craving prediction in the calling process within budget_ms
+    
+    Returns (result, timings). timings is a list of (stage, milliseconds)
+    for the stages that ran. result is None when the budget ran out or a
+    stage failed before anything was stored (the error is logged), the
+    caller should then queue the prediction. The feature query itself is
+    bounded with a PostgreSQL statement_timeout.
+    """
+    budget_ms = settings.PREDICTION_SYNC_BUDGET_MS if budget_ms is None else budget_ms
+    started = time.perf_counter()
+    timings = []
+    
+    def elapsed_ms():
+        return (time.perf_counter() - started) * 1000
+    
+    def stage(name, stage_started):
+        timings.append((name, (time.perf_counter() - stage_started) * 1000))
+    
+    stage_started = time.perf_counter()
+    try:
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT set_config('statement_timeout', %s, true)",
+                        [str(max(int(budget_ms), 1))]
+                    )
+            consumidor, features_dict, existing_ventana, error = prepare_prediction(user_id, features_dict)
+    except OperationalError as e:
+        logger.warning(f"Inline prediction for user {user_id} hit the time budget computing features: {e}")
+        stage('features', stage_started)
+        return None, timings
+    except DatabaseError as e:
+        logger.error(f"Inline prediction for user {user_id} failed computing features: {e}")
+        stage('features', stage_started)
+        return None, timings
+    except Exception as e:
+        logger.exception(f"Unexpected error computing inline features for user {user_id}: {e}")
+        stage('features', stage_started)
+        return None, timings
+    stage('features', stage_started)
+    if error:
+        return error, timings
+    
+    stage_started = time.perf_counter()
+    model_package, error = load_model_package()
+    stage('model', stage_started)
+    if error:
+        return error, timings
+    
+    error = missing_features_error(model_package, features_dict)
+    if error:
+        return error, timings
+    
+    stage_started = time.perf_counter()
+    try:
+        predictions, probabilities = score_features(model_package, [features_dict])
+    except Exception as e:
+        logger.exception(f"Inline scoring failed for user {user_id}: {e}")
+        stage('score', stage_started)
+        return None, timings
+    stage('score', stage_started)
+    
+    # Storing is not interruptible, only start it while within budget
+    if elapsed_ms() > budget_ms:
+        logger.warning(f"Inline prediction for user {user_id} exceeded {budget_ms}ms ({elapsed_ms():.1f}ms)")
+        return None, timings
+    
+    # Atomic, so a failed record leaves nothing behind for the queued retry
+    stage_started = time.perf_counter()
+    try:
+        with transaction.atomic():
+            result = record_prediction(
+                user_id, consumidor, features_dict, existing_ventana,
+                predictions[0], probabilities[0], model_package
             )
+    except Exception as e:
+        logger.exception(f"Inline prediction for user {user_id} failed storing the result: {e}")
+        stage('record', stage_started)
+        return None, timings
+    stage('record', stage_started)
+    
+    return result, timings
+
+@shared_task(bind=True, max_retries=3)
+def predict_smoking_craving(self, user_id, features_dict=None):
+    try:
+        logger.info(f"Starting prediction for user {user_id}")
         
-        ventana.hr_mean = features_dict.get('hr_mean')
-        ventana.hr_std = features_dict.get('hr_std')
-        ventana.accel_energy = features_dict.get('accel_energy')
-        ventana.gyro_energy = features_dict.get('gyro_energy')
-        ventana.save()
+        consumidor, features_dict, existing_ventana, error = prepare_prediction(user_id, features_dict)
+        if error:
+            return error
         
-        logger.info(f"Features saved to Ventana ID {ventana.id}")
+        model_package, error = load_model_package()
+        if error:
+            return error
         
-        analisis = Analisis.objects.create(
-            ventana=ventana,
-            probabilidad_modelo=float(probability),
-            urge_label=int(prediction),
-            modelo_usado='LogisticRegression_v1',
-            recall=recall,
-            f1_score=f1,
-            accuracy=accuracy,
-            roc_auc=None,
-            comentario_modelo=comentario
-        )
+        error = missing_features_error(model_package, features_dict)
+        if error:
+            return error
         
-        logger.info(f"Prediction saved: Analisis ID {analisis.id}, risk={risk_level}, prob={probability:.2%}")
+        predictions, probabilities = score_features(model_package, [features_dict])
         
-        if risk_level == 'high':
-            deseo = Deseo.objects.create(
-                consumidor=consumidor,
-                ventana=ventana,
-                tipo='sustancia',
-                resolved=False
-            )
-            
-            Notificacion.objects.create(
-                consumidor=consumidor,
-                deseo=deseo,
-                contenido=comentario,
-                tipo='alerta',
-                leida=False
-            )
-            
-            logger.info(f"High risk notification created for consumidor {consumidor.id}")
-        
-        return {
-            'success': True,
-            'analisis_id': analisis.id,
-            'probability': float(probability),
-            'prediction': int(prediction),
-            'risk_level': risk_level,
-            'comentario': comentario,
-            'model_metrics': {
-                'accuracy': accuracy,
-                'precision': precision,
-                'recall': recall,
-                'f1_score': f1
-            },
-            'user_id': user_id,
-            'consumidor_id': consumidor.id
-        }
+        return record_prediction(
+            user_id, consumidor, features_dict, existing_ventana,
+            predictions[0], probabilities[0], model_package
+        )
         
     except Exception as exc:
         logger.error(f"Unexpected error in prediction: {exc}")
@@ -261,6 +383,91 @@ def predict_smoking_craving(self, user_id, features_dict=None):
             }
         raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
 
+@shared_task(bind=True)
+def predict_smoking_craving_batch(self):
+    """
+    Score queued prediction requests as one micro-batch
+    Scheduled by PredictionBatcher.submit when PREDICTION_MODE='batched'
+    
+    Collects requests for up to PREDICTION_BATCH_MAX_WAIT_MS or
+    PREDICTION_BATCH_MAX_SIZE items, runs scaler and model once over the
+    whole matrix, then writes each request's Analisis/Deseo/Notificacion
+    and stores its result under the request id.
+    """
+    started = time.perf_counter()
+    requests = PredictionBatcher.collect()
+    
+    if not requests:
+        return {'success': True, 'requests': 0, 'scored': 0}
+    
+    model_package, error = load_model_package()
+    if error:
+        for request in requests:
+            PredictionBatcher.store_result(request['request_id'], error)
+        return {'success': False, 'requests': len(requests), 'error': error['error']}
+    
+    prepared = []
+    for request in requests:
+        try:
+            consumidor, features_dict, existing_ventana, error = prepare_prediction(
+                request['user_id'], request.get('features_dict')
+            )
+            if not error:
+                error = missing_features_error(model_package, features_dict)
+        except Exception as exc:
+            logger.error(f"[PREDICT-BATCH] Error preparing request {request['request_id']}: {exc}")
+            error = {'success': False, 'error': str(exc)}
+        
+        if error:
+            PredictionBatcher.store_result(request['request_id'], error)
+        else:
+            prepared.append((request, consumidor, features_dict, existing_ventana))
+    
+    if prepared:
+        try:
+            predictions, probabilities = score_features(
+                model_package, [features_dict for _, _, features_dict, _ in prepared]
+            )
+        except Exception as exc:
+            # The requests are already off the queue, answer them all
+            logger.error(f"[PREDICT-BATCH] Error scoring {len(prepared)} requests: {exc}")
+            error = {'success': False, 'error': f'Scoring failed: {exc}'}
+            for request, _, _, _ in prepared:
+                PredictionBatcher.store_result(request['request_id'], error)
+            return {
+                'success': False,
+                'requests': len(requests),
+                'scored': 0,
+                'error': str(exc)
+            }
+
+        for (request, consumidor, features_dict, existing_ventana), prediction, probability in zip(
+            prepared, predictions, probabilities
+        ):
+            try:
+                result = record_prediction(
+                    request['user_id'], consumidor, features_dict, existing_ventana,
+                    prediction, probability, model_package
+                )
+            except Exception as exc:
+                logger.error(f"[PREDICT-BATCH] Error recording request {request['request_id']}: {exc}")
+                result = {'success': False, 'error': str(exc)}
+            
+            PredictionBatcher.store_result(request['request_id'], result)
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logger.info(
+        f"[PREDICT-BATCH] ✓ Scored {len(prepared)} of {len(requests)} requests "
+        f"in {elapsed_ms:.1f}ms"
+    )
+    
+    return {
+        'success': True,
+        'requests': len(requests),
+        'scored': len(prepared),
+        'elapsed_ms': round(elapsed_ms, 1)
+    }
+
 @shared_task(bind=True, max_retries=2)
 def simulate_wearable_cycle(self):
     import random
@@ -298,41 +505,37 @@ def simulate_wearable_cycle(self):
         
         base_hr = random.uniform(65, 95)
         
-        lecturas_creadas = 0
+        samples = []
         for i in range(60):
             hr = base_hr + random.uniform(-5, 5)
             hr = max(50, min(150, hr))
             
-            accel_x = random.uniform(-1.5, 1.5)
-            accel_y = random.uniform(-1.5, 1.5)
-            accel_z = random.uniform(-1.5, 1.5)
-            
-            gyro_x = random.uniform(-0.8, 0.8)
-            gyro_y = random.uniform(-0.8, 0.8)
-            gyro_z = random.uniform(-0.8, 0.8)
-            
-            Lectura.objects.create(
-                ventana=ventana,
-                heart_rate=hr,
-                accel_x=accel_x,
-                accel_y=accel_y,
-                accel_z=accel_z,
-                gyro_x=gyro_x,
-                gyro_y=gyro_y,
-                gyro_z=gyro_z
-            )
-            lecturas_creadas += 1
+            samples.append({
+                'heart_rate': hr,
+                'accel_x': random.uniform(-1.5, 1.5),
+                'accel_y': random.uniform(-1.5, 1.5),
+                'accel_z': random.uniform(-1.5, 1.5),
+                'gyro_x': random.uniform(-0.8, 0.8),
+                'gyro_y': random.uniform(-0.8, 0.8),
+                'gyro_z': random.uniform(-0.8, 0.8),
+            })
+        
+        # Same path as real devices, so lectura_count and the
+        # statistics accumulator stay in step with the rows
+        lecturas, lectura_count = LecturaIngestionService.bulk_insert(ventana, samples)
+        LecturaIngestionService.schedule_calculation(
+            ventana, lectura_count - len(lecturas), lectura_count
+        )
+        lecturas_creadas = len(lecturas)
         
         logger.info(f"[OK] {lecturas_creadas} lecturas generadas (HR base: {base_hr:.1f})")
+        DashboardCache.invalidate(consumidor.id)
         
         logger.info(f"[ML] Disparando predicción ML...")
         
-        result = predict_smoking_craving.apply_async(
-            kwargs={'user_id': usuario.id, 'features_dict': None},
-            countdown=2
-        )
+        prediction_id = enqueue_prediction(usuario.id, None, countdown=2)
         
-        logger.info(f"[OK] Predicción encolada (Task ID: {result.id})")
+        logger.info(f"[OK] Predicción encolada (Task ID: {prediction_id})")
         logger.info("=" * 70)
         
         return {
@@ -340,7 +543,7 @@ def simulate_wearable_cycle(self):
             'consumidor_id': consumidor.id,
             'ventana_id': ventana.id,
             'lecturas_count': lecturas_creadas,
-            'prediction_task_id': result.id,
+            'prediction_task_id': prediction_id,
             'base_hr': round(base_hr, 1)
         }
         
@@ -359,7 +562,7 @@ def simulate_wearable_cycle(self):
 
 
 @shared_task(bind=True, max_retries=3)
-def calculate_ventana_statistics(self, ventana_id):
+def calculate_ventana_statistics(self, ventana_id, verify=None):
     """
     Calculate aggregated statistics for a ventana based on its lecturas
     Called periodically or when enough readings have accumulated
@@ -369,6 +572,11 @@ def calculate_ventana_statistics(self, ventana_id):
     - hr_std: Heart rate standard deviation
     - accel_energy: Total accelerometer energy (movement intensity)
     - gyro_energy: Total gyroscope energy (rotation intensity)
+    
+    Values come from the ventana's running accumulator, which is updated
+    at ingest time, so the cost does not grow with the number of readings.
+    With verify=True (default: settings.VENTANA_STATS_VERIFY) they are also
+    recomputed from every lectura and any mismatch is reported.
     """
     try:
         logger.info(f"[VENTANA-CALC] Starting calculation for Ventana {ventana_id}")
@@ -383,10 +591,10 @@ def calculate_ventana_statistics(self, ventana_id):
                 'error': f'Ventana {ventana_id} does not exist'
             }
         
-        # Get all lecturas for this ventana
-        lecturas = Lectura.objects.filter(ventana=ventana).order_by('created_at')
+        state = VentanaStatsService.current(ventana)
+        lectura_count = state['lectura_count']
         
-        if not lecturas.exists():
+        if not lectura_count:
             logger.warning(f"[VENTANA-CALC] No lecturas found for Ventana {ventana_id}")
             return {
                 'success': False,
@@ -394,83 +602,41 @@ def calculate_ventana_statistics(self, ventana_id):
                 'ventana_id': ventana_id
             }
         
-        lectura_count = lecturas.count()
         logger.info(f"[VENTANA-CALC] Processing {lectura_count} readings")
         
-        # Extract sensor data
-        heart_rates = []
-        accel_x_values = []
-        accel_y_values = []
-        accel_z_values = []
-        gyro_x_values = []
-        gyro_y_values = []
-        gyro_z_values = []
-        
-        for lectura in lecturas:
-            if lectura.heart_rate is not None:
-                heart_rates.append(lectura.heart_rate)
-            
-            if lectura.accel_x is not None:
-                accel_x_values.append(lectura.accel_x)
-            if lectura.accel_y is not None:
-                accel_y_values.append(lectura.accel_y)
-            if lectura.accel_z is not None:
-                accel_z_values.append(lectura.accel_z)
-            
-            if lectura.gyro_x is not None:
-                gyro_x_values.append(lectura.gyro_x)
-            if lectura.gyro_y is not None:
-                gyro_y_values.append(lectura.gyro_y)
-            if lectura.gyro_z is not None:
-                gyro_z_values.append(lectura.gyro_z)
-        
-        # Calculate heart rate statistics
-        if heart_rates:
-            hr_array = np.array(heart_rates)
-            ventana.hr_mean = float(np.mean(hr_array))
-            ventana.hr_std = float(np.std(hr_array))
+        statistics = VentanaStatsService.statistics(state)
+        
+        # Heart rate statistics
+        if statistics['hr_mean'] is not None:
+            ventana.hr_mean = statistics['hr_mean']
+            ventana.hr_std = statistics['hr_std']
             logger.info(f"[HR-STATS] Mean: {ventana.hr_mean:.2f}, Std: {ventana.hr_std:.2f}")
         else:
             logger.warning(f"[VENTANA-CALC] No heart rate data available")
         
-        # Calculate accelerometer energy (movement intensity)
-        if accel_x_values and accel_y_values and accel_z_values:
-            accel_x_array = np.array(accel_x_values)
-            accel_y_array = np.array(accel_y_values)
-            accel_z_array = np.array(accel_z_values)
-            
-            # Energy = sum of squared values
-            ventana.accel_energy = float(
-                np.sum(accel_x_array**2 + accel_y_array**2 + accel_z_array**2)
-            )
-            
+        # Accelerometer energy (movement intensity), sum of squared values
+        if statistics['accel_energy'] is not None:
+            ventana.accel_energy = statistics['accel_energy']
             logger.info(f"[ACCEL-ENERGY] {ventana.accel_energy:.4f}")
         else:
             logger.warning(f"[VENTANA-CALC] No accelerometer data available")
         
-        # Calculate gyroscope energy (rotation intensity)
-        if gyro_x_values and gyro_y_values and gyro_z_values:
-            gyro_x_array = np.array(gyro_x_values)
-            gyro_y_array = np.array(gyro_y_values)
-            gyro_z_array = np.array(gyro_z_values)
-            
-            # Energy = sum of squared values
-            ventana.gyro_energy = float(
-                np.sum(gyro_x_array**2 + gyro_y_array**2 + gyro_z_array**2)
-            )
-            
+        # Gyroscope energy (rotation intensity), sum of squared values
+        if statistics['gyro_energy'] is not None:
+            ventana.gyro_energy = statistics['gyro_energy']
             logger.info(f"[GYRO-ENERGY] {ventana.gyro_energy:.4f}")
         else:
             logger.warning(f"[VENTANA-CALC] No gyroscope data available")
         
         # Save the calculated statistics
-        ventana.save()
+        ventana.save(update_fields=['hr_mean', 'hr_std', 'accel_energy', 'gyro_energy', 'updated_at'])
+        DashboardCache.invalidate(ventana.consumidor_id)
         
         logger.info(
             f"[VENTANA-CALC] ✓ Successfully calculated statistics for Ventana {ventana_id}"
         )
         
-        return {
+        result = {
             'success': True,
             'ventana_id': ventana_id,
             'lecturas_processed': lectura_count,
@@ -482,6 +648,26 @@ def calculate_ventana_statistics(self, ventana_id):
             }
         }
         
+        if verify is None:
+            verify = settings.VENTANA_STATS_VERIFY
+        
+        if verify:
+            mismatches = VentanaStatsService.verify(ventana_id, statistics)
+            if mismatches:
+                logger.error(
+                    f"[VENTANA-VERIFY] Ventana {ventana_id} incremental statistics "
+                    f"differ from full recompute: {mismatches}"
+                )
+            else:
+                logger.info(f"[VENTANA-VERIFY] ✓ Ventana {ventana_id} matches full recompute")
+            
+            result['verification'] = {
+                'matches': not mismatches,
+                'mismatches': mismatches
+            }
+        
+        return result
+        
     except Exception as exc:
         logger.error(f"[VENTANA-CALC] Error calculating statistics: {exc}")
         raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
@@ -497,8 +683,9 @@ def check_and_calculate_ventana_stats(self, ventana_id, min_readings=5):
         min_readings: Minimum number of readings before calculating (default: 5)
     """
     try:
-        ventana = Ventana.objects.get(id=ventana_id)
-        lectura_count = Lectura.objects.filter(ventana=ventana).count()
+        lectura_count = LecturaCounter.get(ventana_id)
+        if lectura_count is None:
+            raise Ventana.DoesNotExist
         
         logger.info(
             f"[CHECK-CALC] Ventana {ventana_id} has {lectura_count} readings "
@@ -536,11 +723,64 @@ def check_and_calculate_ventana_stats(self, ventana_id, min_readings=5):
         }
 
 
+@shared_task(bind=True, max_retries=3)
+def calculate_ventana_statistics_batch(self, ventana_ids):
+    """
+    Calculate statistics for a chunk of ventanas in a single task
+    Queued by periodic_ventana_calculation, one task per chunk
+    
+    Accumulators are loaded in bulk (stale ones rebuilt from one ordered
+    lecturas query) and the ventanas are written back with bulk_update.
+    """
+    try:
+        ventanas = list(Ventana.objects.filter(id__in=ventana_ids))
+        states = VentanaStatsService.current_many(ventanas)
+        
+        updated = []
+        now = timezone.now()
+        for ventana in ventanas:
+            state = states[ventana.id]
+            if not state['lectura_count']:
+                continue
+            
+            for field, value in VentanaStatsService.statistics(state).items():
+                if value is not None:
+                    setattr(ventana, field, value)
+            ventana.updated_at = now
+            updated.append(ventana)
+        
+        Ventana.objects.bulk_update(
+            updated,
+            ['hr_mean', 'hr_std', 'accel_energy', 'gyro_energy', 'updated_at']
+        )
+        # bulk_update sends no post_save, refresh the heart rate rollups here
+        DailyRollupService.touch_ventanas(updated)
+        DashboardCache.invalidate(*{ventana.consumidor_id for ventana in updated})
+        
+        logger.info(
+            f"[VENTANA-BATCH] ✓ Calculated statistics for {len(updated)} of "
+            f"{len(ventana_ids)} ventanas"
+        )
+        
+        return {
+            'success': True,
+            'ventanas_requested': len(ventana_ids),
+            'ventanas_updated': len(updated)
+        }
+        
+    except Exception as exc:
+        logger.error(f"[VENTANA-BATCH] Error calculating statistics: {exc}")
+        raise self.retry(exc=exc, countdown=60 * (2 ** self.request.retries))
+
+
 @shared_task(bind=True)
-def periodic_ventana_calculation(self):
+def periodic_ventana_calculation(self, chunk_size=None):
     """
     Periodic task to calculate statistics for all active ventanas
     Run this every 5-10 minutes via Celery Beat
+    
+    Pending ventanas are split into chunks of VENTANA_STATS_CHUNK_SIZE
+    and each chunk is handled by one calculate_ventana_statistics_batch task.
     """
     try:
         logger.info("[PERIODIC] Starting periodic ventana calculation")
@@ -548,26 +788,29 @@ def periodic_ventana_calculation(self):
         # Get all ventanas from the last hour that have lecturas but no calculated stats
         one_hour_ago = timezone.now() - timedelta(hours=1)
         
-        ventanas_to_process = Ventana.objects.filter(
-            window_start__gte=one_hour_ago,
-            hr_mean__isnull=True  # Not yet calculated
-        ).annotate(
-            lectura_count=models.Count('lecturas')
-        ).filter(
-            lectura_count__gte=5  # At least 5 readings
+        ventana_ids = list(
+            Ventana.objects.filter(
+                window_start__gte=one_hour_ago,
+                hr_mean__isnull=True,  # Not yet calculated
+                lectura_count__gte=5  # At least 5 readings
+            ).order_by('id').values_list('id', flat=True)
         )
         
-        processed_count = 0
-        for ventana in ventanas_to_process:
-            logger.info(f"[PERIODIC] Processing Ventana {ventana.id}")
-            calculate_ventana_statistics.delay(ventana.id)
-            processed_count += 1
+        chunk_size = chunk_size or settings.VENTANA_STATS_CHUNK_SIZE
+        chunk_count = 0
+        for start in range(0, len(ventana_ids), chunk_size):
+            calculate_ventana_statistics_batch.delay(ventana_ids[start:start + chunk_size])
+            chunk_count += 1
         
-        logger.info(f"[PERIODIC] ✓ Triggered calculation for {processed_count} ventanas")
+        logger.info(
+            f"[PERIODIC] ✓ Triggered calculation for {len(ventana_ids)} ventanas "
+            f"in {chunk_count} chunks"
+        )
         
         return {
             'success': True,
-            'ventanas_processed': processed_count
+            'ventanas_processed': len(ventana_ids),
+            'chunks': chunk_count
         }
         
     except Exception as exc:
@@ -578,6 +821,111 @@ def periodic_ventana_calculation(self):
         }
 
 
+@shared_task(bind=True)
+def flush_lectura_buffer(self, chunk_size=None):
+    """
+    Drain the Redis write-behind buffer into the lecturas table
+    Run every LECTURA_BUFFER_FLUSH_INTERVAL seconds via Celery Beat
+    
+    Reports how many readings were written, the worst lag between a
+    reading being received and persisted, and what is still pending.
+    """
+    try:
+        stats = LecturaBuffer.flush(chunk_size)
+        
+        if stats.get('skipped'):
+            logger.info(f"[BUFFER-FLUSH] Skipped: {stats['reason']}")
+            return {'success': True, **stats}
+        
+        logger.info(
+            f"[BUFFER-FLUSH] ✓ Flushed {stats['flushed']} lecturas from "
+            f"{stats['ventanas']} ventanas (max lag: {stats['max_lag_seconds']}s, "
+            f"pending: {stats['pending']})"
+        )
+        if stats['failed'] or stats['dead_lettered']:
+            logger.warning(
+                f"[BUFFER-FLUSH] {stats['failed']} lecturas failed to insert, "
+                f"{stats['dead_lettered']} moved to the dead-letter list"
+            )
+        
+        return {'success': True, **stats}
+        
+    except Exception as exc:
+        logger.error(f"[BUFFER-FLUSH] Error flushing lectura buffer: {exc}")
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+
+@shared_task(bind=True)
+def reconcile_lectura_counters(self, hours=24):
+    """
+    Correct the per-ventana lectura counters against the real COUNT(*)
+    Run hourly via Celery Beat
+    
+    Catches drift from inserts that bypass the counter (COPY loads,
+    manual scripts) and from rolled back transactions.
+    """
+    try:
+        stats = LecturaCounter.reconcile(hours=hours)
+        
+        if stats['corrected']:
+            logger.warning(
+                f"[COUNTER-RECONCILE] Corrected {stats['corrected']} of "
+                f"{stats['checked']} ventanas: {stats['corrected_ids']}"
+            )
+        else:
+            logger.info(f"[COUNTER-RECONCILE] ✓ {stats['checked']} ventanas in sync")
+        
+        return {'success': True, **stats}
+        
+    except Exception as exc:
+        logger.error(f"[COUNTER-RECONCILE] Error reconciling counters: {exc}")
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+
+
+MATERIALIZED_VIEW_LOCK_KEY = 'refresh_materialized_views:lock'
+
+@shared_task(bind=True)
+def refresh_materialized_views(self, view_names=None):
+    """
+    REFRESH MATERIALIZED VIEW CONCURRENTLY the dashboard variants that are due
+    Run every minute via Celery Beat, each view is only refreshed once its
+    MATERIALIZED_VIEW_REFRESH_INTERVAL(S) has passed. Pass view_names to
+    refresh specific views right away.
+    """
+    if not cache.add(MATERIALIZED_VIEW_LOCK_KEY, self.request.id or True, timeout=10 * 60):
+        logger.info("[MV-REFRESH] Another refresh is still running, skipping")
+        return {
+            'success': False,
+            'error': 'Refresh already in progress'
+        }
+    
+    try:
+        stats = MaterializedViewService.refresh_many(view_names)
+        if stats['refreshed']:
+            # Every consumer's materialized responses changed
+            DashboardCache.bump()
+        
+        for view_name, duration_ms in stats['refreshed'].items():
+            logger.info(f"[MV-REFRESH] ✓ {view_name} refreshed in {duration_ms:.0f}ms")
+        
+        return {'success': not stats['failed'], **stats}
+        
+    except Exception as exc:
+        logger.error(f"[MV-REFRESH] Error refreshing materialized views: {exc}")
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+    finally:
+        cache.delete(MATERIALIZED_VIEW_LOCK_KEY)
+
+
 @shared_task(bind=True)
 def trigger_prediction_if_ready(self, ventana_id):
     """
@@ -609,8 +957,7 @@ def trigger_prediction_if_ready(self, ventana_id):
             }
             
             # Trigger prediction task
-            from api.tasks import predict_smoking_craving
-            predict_smoking_craving.delay(usuario.id, features)
+            enqueue_prediction(usuario.id, features)
             
             logger.info(f"[PREDICTION-TRIGGER] ✓ Prediction triggered for User {usuario.id}")
             
@@ -643,3 +990,47 @@ def trigger_prediction_if_ready(self, ventana_id):
             'success': False,
             'error': str(exc)
         }
+
+
+TRAINING_LOCK_KEY = 'train_craving_model:lock'
+
+@shared_task(bind=True, time_limit=60 * 60, soft_time_limit=55 * 60)
+def train_craving_model(self, publish=True):
+    """
+    Retrain the craving model and hot-swap it on every worker
+    Routed to the 'training' queue (see CELERY_TASK_ROUTES)
+    
+    Progress is reported as task state PROGRESS with step/done/total,
+    which check_task_status returns while the task runs. Only one
+    training runs at a time.
+    """
+    if not cache.add(TRAINING_LOCK_KEY, self.request.id or True, timeout=60 * 60):
+        logger.warning("[MODEL-TRAIN] Another training is already running")
+        return {
+            'success': False,
+            'error': 'Training already in progress'
+        }
+    
+    def progress(step, done, total):
+        self.update_state(state='PROGRESS', meta={'step': step, 'done': done, 'total': total})
+    
+    try:
+        started = time.perf_counter()
+        logger.info("[MODEL-TRAIN] Training craving model...")
+        
+        result = ModelTrainer.train(progress=progress, publish=publish)
+        
+        logger.info(
+            f"[MODEL-TRAIN] ✓ Version {result.get('version')} trained on {result['samples']} samples "
+            f"in {time.perf_counter() - started:.1f}s: {result['metrics']}"
+        )
+        return {'success': True, **result}
+        
+    except Exception as exc:
+        logger.error(f"[MODEL-TRAIN] Training failed: {exc}")
+        return {
+            'success': False,
+            'error': str(exc)
+        }
+    finally:
+        cache.delete(TRAINING_LOCK_KEY)
@@ -1,2 +1,645 @@
-from django.test import TestCase
+import io
+import math
+import struct
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from api.admin import NotificacionAdmin
+from api.models import (
+    AcumuladorVentana, Analisis, Consumidor, Lectura, MaterializedViewRefresh, Notificacion, ResumenDiario, Usuario,
+    Ventana,
+)
+from api.parsers import LecturaFrameParser
+from api.services import (
+    DailyRollupService, DashboardCache, HeartRateSeriesService, LecturaCounter, LecturaIngestionService,
+    MaterializedViewService, VentanaFeatureService, VentanaStatsService,
+)
+from api.services.materialized_views import MATERIALIZED_VIEWS
+from api.services.ventana_stats import STAT_FIELDS
+from api.views import DASHBOARD_SECTIONS, ConsumerDashboardViewSet, VwHeartRateStatsViewSet
+from utils.pagination import KeysetPagination
 
+def create_ventana(email='tests@example.com'):
+    usuario = Usuario.objects.create(nombre='Tests', email=email, password_hash='!')
+    consumidor = Consumidor.objects.create(usuario=usuario)
+    now = timezone.now()
+    return Ventana.objects.create(
+        consumidor=consumidor,
+        window_start=now - timedelta(minutes=1),
+        window_end=now + timedelta(minutes=1)
+    )
+
+def random_samples(rng, count, missing=0.1):
+    """Sample dicts with about `missing` of the values set to None"""
+    values = rng.normal(loc=[75, 0, 0, 1, 0, 0, 0], scale=[8, 0.5, 0.5, 0.5, 1, 1, 1], size=(count, 7))
+    values[rng.random(values.shape) < missing] = np.nan
+    return LecturaIngestionService.samples_from_array(values)
+
+class VentanaStatsAccumulatorTests(TestCase):
+    """Incremental Welford / Chan merge against the full SQL aggregate"""
+
+    def assertStatisticsEqual(self, actual, expected):
+        self.assertEqual(actual.keys(), expected.keys())
+        for field, value in expected.items():
+            if value is None:
+                self.assertIsNone(actual[field], field)
+            else:
+                self.assertTrue(
+                    math.isclose(actual[field], value, rel_tol=1e-9, abs_tol=1e-9),
+                    f"{field}: {actual[field]} != {value}"
+                )
+
+    def test_merge_of_chunks_matches_single_pass(self):
+        rng = np.random.default_rng(7)
+        values = rng.normal(75, 10, size=(257, len(STAT_FIELDS)))
+        values[rng.random(values.shape) < 0.2] = np.nan
+
+        state = VentanaStatsService.moments(np.empty((0, len(STAT_FIELDS))))
+        for chunk in np.array_split(values, [1, 2, 50, 51, 200]):
+            state = VentanaStatsService.merge(state, VentanaStatsService.moments(chunk))
+
+        self.assertStatisticsEqual(
+            VentanaStatsService.statistics(state),
+            VentanaStatsService.statistics(VentanaStatsService.moments(values))
+        )
+        self.assertEqual(state['lectura_count'], len(values))
+
+    def test_accumulate_over_chunks_matches_aggregate(self):
+        ventana = create_ventana()
+        rng = np.random.default_rng(42)
+
+        for size in (1, 17, 250, 3, 96):
+            LecturaIngestionService.bulk_insert(ventana, random_samples(rng, size))
+
+        acumulador = AcumuladorVentana.objects.get(ventana=ventana)
+        aggregate = VentanaFeatureService.aggregate(ventana.id)
+
+        self.assertEqual(acumulador.lectura_count, 367)
+        self.assertEqual(acumulador.hr_count, aggregate['hr_count'])
+        self.assertStatisticsEqual(
+            VentanaStatsService.statistics(VentanaStatsService.state(acumulador)),
+            VentanaStatsService.statistics(VentanaFeatureService.accumulator_state(aggregate))
+        )
+
+    def test_missing_axis_leaves_energy_empty(self):
+        ventana = create_ventana()
+        samples = random_samples(np.random.default_rng(1), 10, missing=0)
+        for sample in samples:
+            sample['gyro_z'] = None
+
+        LecturaIngestionService.bulk_insert(ventana, samples)
+        statistics = VentanaStatsService.statistics(
+            VentanaStatsService.state(AcumuladorVentana.objects.get(ventana=ventana))
+        )
+
+        self.assertIsNotNone(statistics['accel_energy'])
+        self.assertIsNone(statistics['gyro_energy'])
+
+class KeysetPaginationTests(TestCase):
+    """Cursor round trip and page walks over rows that share the ordering timestamp"""
+
+    ordering = ('-created_at', '-id')
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.view = SimpleNamespace(keyset_ordering=self.ordering)
+
+        ventana = create_ventana()
+        taken_at = timezone.now().replace(microsecond=0)
+        # Ten readings tied on created_at, two before and two after them
+        times = [taken_at] * 10 + [taken_at - timedelta(seconds=1)] * 2 + [taken_at + timedelta(seconds=1)] * 2
+        samples = random_samples(np.random.default_rng(5), len(times), missing=0)
+        for sample, created_at in zip(samples, times):
+            sample['created_at'] = created_at
+        LecturaIngestionService.bulk_insert(ventana, samples)
+
+        self.queryset = Lectura.objects.filter(ventana=ventana)
+        self.expected = list(self.queryset.order_by(*self.ordering).values_list('id', flat=True))
+
+    def paginate(self, url):
+        paginator = KeysetPagination()
+        rows = paginator.paginate_queryset(self.queryset, Request(self.factory.get(url)), view=self.view)
+        return [row.id for row in rows], paginator
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPagination()
+        paginator.request = Request(self.factory.get('/api/lecturas/'))
+        position = [timezone.now().isoformat(), 42]
+
+        url = paginator.encode_cursor(position, True)
+        cursor = paginator.decode_cursor(Request(self.factory.get(url)))
+
+        self.assertEqual(cursor['position'], (datetime.fromisoformat(position[0]), 42))
+        self.assertTrue(cursor['reverse'])
+
+    def test_invalid_cursor_is_not_found(self):
+        for cursor in ('not-base64!', 'eyJwIjogWyJ4IiwgMV19', 'e30='):
+            with self.assertRaises(NotFound):
+                self.paginate(f'/api/lecturas/?cursor={cursor}')
+
+    def test_pages_cover_ties_once_in_order(self):
+        pages, url = [], '/api/lecturas/?limit=3'
+        while url:
+            ids, paginator = self.paginate(url)
+            pages.append(ids)
+            url = paginator.get_next_link()
+
+        self.assertEqual([row for page in pages for row in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 3, 3, 2])
+
+    def test_previous_links_return_the_same_pages(self):
+        forward, url = [], '/api/lecturas/?limit=4'
+        while url:
+            ids, paginator = self.paginate(url)
+            forward.append(ids)
+            url, previous = paginator.get_next_link(), paginator.get_previous_link()
+
+        backward = []
+        while previous:
+            ids, paginator = self.paginate(previous)
+            backward.append(ids)
+            previous = paginator.get_previous_link()
+
+        self.assertEqual(backward[::-1], forward[:-1])
+
+class LecturaIngestionTests(TestCase):
+    """bulk_insert writes a sample's created_at in the INSERT itself"""
+
+    def test_created_at_in_one_insert(self):
+        ventana = create_ventana()
+        received_at = timezone.now() - timedelta(minutes=5)
+        samples = random_samples(np.random.default_rng(3), 3)
+        samples[0]['created_at'] = received_at
+
+        with CaptureQueriesContext(connection) as queries:
+            LecturaIngestionService.bulk_insert(ventana, samples)
+
+        writes = [query['sql'] for query in queries.captured_queries if '"lecturas"' in query['sql']]
+        self.assertEqual(len(writes), 1)
+        self.assertTrue(writes[0].startswith('INSERT'))
+        created = list(Lectura.objects.filter(ventana=ventana).order_by('id').values_list('created_at', flat=True))
+        self.assertEqual(created[0], received_at)
+        self.assertGreater(created[1], received_at)
+
+class LecturaCounterTests(TestCase):
+    """Redis copy of Ventana.lectura_count"""
+
+    def setUp(self):
+        cache.clear()
+        self.ventana = create_ventana()
+
+    def test_reseed_keeps_a_newer_counter(self):
+        # Another process seeded and bumped the key after this one missed it
+        cache.set(LecturaCounter.key(self.ventana.id), 7)
+
+        with mock.patch.object(cache, 'get', return_value=None):
+            self.assertEqual(LecturaCounter.get(self.ventana.id), 0)
+
+        self.assertEqual(cache.get(LecturaCounter.key(self.ventana.id)), 7)
+
+    def test_missing_key_is_seeded_from_the_column(self):
+        Ventana.objects.filter(id=self.ventana.id).update(lectura_count=4)
+
+        self.assertEqual(LecturaCounter.get(self.ventana.id), 4)
+        self.assertEqual(LecturaCounter.increment(self.ventana.id, 2), 6)
+        self.assertIsNone(LecturaCounter.get(0))
+
+class LecturaFrameParserTests(TestCase):
+    """Binary <IId header + float32 rows frames"""
+
+    def frame(self, ventana_id, rows, base_timestamp=1700000000.5, sample_count=None):
+        rows = np.asarray(rows, dtype='<f4').reshape(-1, LecturaFrameParser.ROW_WIDTH)
+        count = len(rows) if sample_count is None else sample_count
+        return LecturaFrameParser.HEADER.pack(ventana_id, count, base_timestamp) + rows.tobytes()
+
+    def parse(self, data):
+        return LecturaFrameParser().parse(io.BytesIO(data))
+
+    def test_parses_header_and_rows(self):
+        rows = [[72, 0.1, 0.2, 9.8, 0.01, 0.02, 0.03], [float('nan'), 0.1, 0.2, 9.7, 0, 0, 0]]
+
+        frame = self.parse(self.frame(7, rows))
+
+        self.assertEqual(LecturaFrameParser.HEADER.size, 16)
+        self.assertEqual(frame['ventana_id'], 7)
+        self.assertEqual(frame['sample_count'], 2)
+        self.assertEqual(frame['base_timestamp'], 1700000000.5)
+        self.assertEqual(frame['samples'].shape, (2, 7))
+        self.assertEqual(frame['samples'][0, 0], np.float32(72))
+        self.assertTrue(np.isnan(frame['samples'][1, 0]))
+        self.assertFalse(frame['samples'].flags.writeable)
+
+    def test_little_endian_layout(self):
+        data = struct.pack('<IId', 3, 1, 12.0) + struct.pack('<7f', *range(7))
+
+        frame = self.parse(data)
+
+        self.assertEqual(frame['ventana_id'], 3)
+        self.assertEqual(frame['samples'].tolist(), [[0, 1, 2, 3, 4, 5, 6]])
+
+    def test_short_frame(self):
+        with self.assertRaises(ParseError):
+            self.parse(b'\x01\x00\x00\x00')
+
+    def test_size_mismatch(self):
+        rows = np.zeros((2, 7))
+        for data in (self.frame(1, rows, sample_count=3), self.frame(1, rows, sample_count=1),
+                     self.frame(1, rows) + b'\x00'):
+            with self.assertRaises(ParseError):
+                self.parse(data)
+
+    def test_non_finite_base_timestamp(self):
+        for base_timestamp in (float('nan'), float('inf')):
+            with self.assertRaises(ParseError):
+                self.parse(self.frame(1, np.zeros((1, 7)), base_timestamp=base_timestamp))
+
+    @override_settings(LECTURA_BATCH_MAX_SIZE=2)
+    def test_frame_over_the_batch_limit(self):
+        self.assertEqual(self.parse(self.frame(1, np.zeros((2, 7))))['sample_count'], 2)
+
+        for data in (self.frame(1, np.zeros((3, 7))), self.frame(1, np.zeros((2, 7))) + b'\x00' * 100):
+            with self.assertRaises(ParseError):
+                self.parse(data)
+
+    @override_settings(LECTURA_BATCH_MAX_SIZE=2)
+    def test_content_length_checked_before_reading(self):
+        stream = mock.Mock()
+        request = SimpleNamespace(META={'CONTENT_LENGTH': str(LecturaFrameParser.max_frame_size() + 1)})
+
+        with self.assertRaises(ParseError):
+            LecturaFrameParser().parse(stream, parser_context={'request': request})
+        stream.read.assert_not_called()
+
+
+class VentanaRollupTests(TestCase):
+    """Daily rollups follow a ventana whose window_start moves to another day"""
+
+    def setUp(self):
+        self.ventana = create_ventana()
+        self.ventana.hr_mean = 80.0
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ventana.save()
+            Analisis.objects.create(ventana=self.ventana, probabilidad_modelo=0.9, urge_label=1)
+
+    def days(self):
+        return {
+            row.fecha: (row.hr_count, row.predicciones)
+            for row in ResumenDiario.objects.filter(consumidor_id=self.ventana.consumidor_id)
+        }
+
+    def move(self, **kwargs):
+        self.ventana.window_start -= timedelta(days=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ventana.save(**kwargs)
+
+    def test_move_leaves_the_old_day(self):
+        today = DailyRollupService.fecha(self.ventana.window_start)
+        self.assertEqual(self.days(), {today: (1, 1)})
+
+        self.move()
+
+        self.assertEqual(self.days(), {today - timedelta(days=2): (1, 1)})
+
+    def test_move_with_update_fields(self):
+        today = DailyRollupService.fecha(self.ventana.window_start)
+
+        self.move(update_fields=['window_start'])
+
+        self.assertEqual(self.days(), {today - timedelta(days=2): (1, 1)})
+
+    def test_ingestion_saves_skip_the_lookup(self):
+        self.ventana.window_end += timedelta(minutes=1)
+        with self.assertNumQueries(1):
+            self.ventana.save(update_fields=['window_end'])
+
+class DashboardVersionTests(TestCase):
+    """Writes that change what the dashboard views read bump the consumer's data version"""
+
+    def setUp(self):
+        self.ventana = create_ventana()
+        self.consumidor_id = self.ventana.consumidor_id
+        self.client = APIClient()
+        self.client.force_authenticate(self.ventana.consumidor.usuario)
+
+    def assertBumps(self, write):
+        before = DashboardCache.version(self.consumidor_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        self.assertNotEqual(DashboardCache.version(self.consumidor_id), before)
+
+    def test_rollup_touch(self):
+        self.assertBumps(lambda: DailyRollupService.touch(self.consumidor_id, timezone.now()))
+
+    def test_rest_ventana_update(self):
+        window_end = (self.ventana.window_end + timedelta(minutes=5)).isoformat()
+        self.assertBumps(lambda: self.client.patch(
+            f'/api/ventanas/{self.ventana.id}/', {'window_end': window_end}, format='json', secure=True
+        ))
+
+    def test_rest_analisis_create_and_delete(self):
+        responses = []
+        self.assertBumps(lambda: responses.append(self.client.post('/api/analisis/', {
+            'ventana': self.ventana.id, 'probabilidad_modelo': 0.2, 'urge_label': 0,
+        }, format='json', secure=True)))
+        self.assertEqual(responses[0].status_code, 201)
+
+        self.assertBumps(lambda: self.client.delete(f"/api/analisis/{responses[0].data['id']}/", secure=True))
+
+class DashboardCacheKeyTests(TestCase):
+    """Cache keys and data versions of DashboardCache"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_is_seeded_once(self):
+        version = DashboardCache.version(1)
+
+        self.assertRegex(version, r'^\d+\.\d+$')
+        self.assertEqual(DashboardCache.version(1), version)
+
+    def test_bump_moves_one_consumer_or_everyone(self):
+        first, second = DashboardCache.version(1), DashboardCache.version(2)
+
+        DashboardCache.bump(1)
+        self.assertNotEqual(DashboardCache.version(1), first)
+        self.assertEqual(DashboardCache.version(2), second)
+
+        first = DashboardCache.version(1)
+        DashboardCache.bump()
+        self.assertNotEqual(DashboardCache.version(1), first)
+        self.assertNotEqual(DashboardCache.version(2), second)
+
+    def test_lost_counter_is_reseeded_ahead(self):
+        consumer_version = int(DashboardCache.version(1).split('.')[0])
+
+        cache.delete(DashboardCache.version_key(1))
+
+        self.assertGreater(int(DashboardCache.version(1).split('.')[0]), consumer_version)
+
+    def test_key_parts(self):
+        key = DashboardCache.key('heart-rate', 1, QueryDict('consumidor_id=1&days=7'))
+
+        self.assertEqual(DashboardCache.key('heart-rate', 1, QueryDict('days=7&consumidor_id=1')), key)
+        self.assertNotEqual(DashboardCache.key('heart-rate', 1, QueryDict('consumidor_id=1&days=30')), key)
+        self.assertNotEqual(DashboardCache.key('habit-stats', 1, QueryDict('consumidor_id=1&days=7')), key)
+        self.assertNotEqual(DashboardCache.key('heart-rate', 2, QueryDict('consumidor_id=1&days=7')), key)
+
+        DashboardCache.bump(1)
+        self.assertNotEqual(DashboardCache.key('heart-rate', 1, QueryDict('consumidor_id=1&days=7')), key)
+
+    def test_key_changes_with_the_day(self):
+        params = QueryDict('consumidor_id=1')
+        now = timezone.now()
+
+        with mock.patch('api.services.dashboard_cache.timezone.now', return_value=now):
+            today = DashboardCache.key('daily-summary', 1, params)
+        with mock.patch('api.services.dashboard_cache.timezone.now', return_value=now + timedelta(days=1)):
+            tomorrow = DashboardCache.key('daily-summary', 1, params)
+
+        self.assertNotEqual(today, tomorrow)
+
+class ConditionalGetTests(TestCase):
+    """ETag / Last-Modified and 304 on a ConditionalGetMixin viewset"""
+
+    def setUp(self):
+        self.consumidor = create_ventana().consumidor
+        self.notificacion = Notificacion.objects.create(
+            consumidor=self.consumidor, contenido='Hola', tipo='recordatorio'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.consumidor.usuario)
+        self.url = f'/api/notificaciones/?consumidor_id={self.consumidor.id}'
+        self.detail_url = f'/api/notificaciones/{self.notificacion.id}/'
+
+    def get(self, url=None, **headers):
+        return self.client.get(url or self.url, secure=True, headers=headers)
+
+    def test_validators_on_200(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('Last-Modified', self.get(self.detail_url))
+
+    def test_if_none_match_gives_304(self):
+        etag = self.get()['ETag']
+
+        for tag in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            response = self.get(if_none_match=tag)
+            self.assertEqual(response.status_code, 304, tag)
+            self.assertEqual(response.content, b'')
+            self.assertEqual(response['ETag'], etag)
+
+        self.assertEqual(self.get(if_none_match='"other"').status_code, 200)
+
+    def test_if_modified_since_gives_304_on_detail_only(self):
+        last_modified = self.get(self.detail_url)['Last-Modified']
+
+        self.assertEqual(self.get(self.detail_url, if_modified_since=last_modified).status_code, 304)
+        self.assertEqual(
+            self.get(self.detail_url, if_modified_since='Thu, 01 Jan 2015 00:00:00 GMT').status_code, 200
+        )
+        self.assertEqual(self.get(if_modified_since=last_modified).status_code, 200)
+
+    def test_if_none_match_wins_over_if_modified_since(self):
+        last_modified = self.get(self.detail_url)['Last-Modified']
+
+        response = self.get(self.detail_url, if_none_match='"other"', if_modified_since=last_modified)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_with_the_data(self):
+        first = self.get()['ETag']
+
+        self.notificacion.leida = True
+        self.notificacion.save()
+        changed = self.get(if_none_match=first)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first)
+
+        Notificacion.objects.create(consumidor=self.consumidor, contenido='Otra', tipo='logro')
+        self.assertNotEqual(self.get()['ETag'], changed['ETag'])
+
+    def test_etag_changes_after_a_delete(self):
+        Notificacion.objects.create(consumidor=self.consumidor, contenido='Otra', tipo='logro')
+        etag = self.get()['ETag']
+
+        self.notificacion.delete()
+
+        self.assertEqual(self.get(if_none_match=etag).status_code, 200)
+
+    def test_etag_changes_after_an_admin_action(self):
+        etag = self.get()['ETag']
+        model_admin = NotificacionAdmin(Notificacion, admin.site)
+        model_admin.message_user = lambda *args, **kwargs: None
+
+        model_admin.mark_as_read(None, Notificacion.objects.filter(pk=self.notificacion.pk))
+
+        self.assertEqual(self.get(if_none_match=etag).status_code, 200)
+
+    def test_etag_depends_on_query_and_lookup(self):
+        etag = self.get()['ETag']
+        detail = self.get(self.detail_url)
+
+        self.assertEqual(detail.status_code, 200)
+        self.assertNotEqual(detail['ETag'], etag)
+        self.assertNotEqual(self.get(f'{self.url}&leida=false')['ETag'], etag)
+        self.assertEqual(self.get(self.detail_url, if_none_match=detail['ETag']).status_code, 304)
+
+    @override_settings(DASHBOARD_CACHE_TIMEOUT=300)
+    def test_dashboard_etag_expires_with_the_cache_timeout(self):
+        view = VwHeartRateStatsViewSet(basename='dashboard-heart-rate-stats', action='list', kwargs={})
+        request = Request(APIRequestFactory().get('/', {'consumidor_id': self.consumidor.id}))
+        request.accepted_renderer = SimpleNamespace(format='json')
+        start = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+        def etag_at(now):
+            with mock.patch('utils.mixins.timezone.now', return_value=now):
+                return view.get_validators(request)[0]
+
+        self.assertEqual(etag_at(start), etag_at(start + timedelta(seconds=1)))
+        self.assertNotEqual(etag_at(start), etag_at(start + timedelta(seconds=300)))
+
+class HeartRateSeriesTests(TestCase):
+    """LTTB downsampling and bucket widths of the heart-rate series"""
+
+    def test_lttb_keeps_everything_when_it_cannot_reduce(self):
+        x = np.arange(10, dtype=np.float64)
+        y = np.sin(x)
+
+        for threshold in (10, 11, 2, 0):
+            self.assertEqual(HeartRateSeriesService.lttb(x, y, threshold).tolist(), list(range(10)), threshold)
+
+    def test_lttb_selection(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.zeros(1000)
+        y[437] = 50.0
+
+        selected = HeartRateSeriesService.lttb(x, y, 20)
+
+        self.assertEqual(len(selected), 20)
+        self.assertEqual((selected[0], selected[-1]), (0, 999))
+        self.assertTrue((np.diff(selected) > 0).all())
+        self.assertIn(437, selected)
+
+    def test_lttb_minimum_threshold(self):
+        selected = HeartRateSeriesService.lttb(np.arange(5.0), np.array([0.0, 1.0, 9.0, 1.0, 0.0]), 3)
+
+        self.assertEqual(selected.tolist(), [0, 2, 4])
+
+    def test_bucket_seconds_uses_the_readable_steps(self):
+        start = timezone.now()
+
+        self.assertEqual(HeartRateSeriesService.bucket_seconds(start, start + timedelta(hours=1), 61), 60)
+        self.assertEqual(HeartRateSeriesService.bucket_seconds(start, start + timedelta(hours=1), 60), 120)
+        self.assertEqual(HeartRateSeriesService.bucket_seconds(start, start, 100), 1)
+        self.assertEqual(HeartRateSeriesService.bucket_seconds(start, start + timedelta(days=1), 1), 86400)
+
+    def test_bucket_seconds_beyond_a_day_are_whole_days(self):
+        start = timezone.now()
+
+        for days, max_points in ((400, 100), (30, 10), (365, 2)):
+            step = HeartRateSeriesService.bucket_seconds(start, start + timedelta(days=days), max_points)
+
+            self.assertEqual(step % 86400, 0, (days, max_points))
+            self.assertLessEqual(days * 86400 / step, max_points - 1)
+            self.assertGreater(days * 86400 / (step - 86400), max_points - 1)
+
+@override_settings(
+    MATERIALIZED_VIEW_REFRESH_INTERVAL=300,
+    MATERIALIZED_VIEW_REFRESH_INTERVALS={'vw_weekly_comparison': 3600},
+)
+class MaterializedViewDueTests(TestCase):
+    """Which mv_* variants the periodic refresh picks up"""
+
+    def refreshed(self, view_name, seconds_ago, now):
+        MaterializedViewRefresh.objects.create(
+            view_name=view_name, refreshed_at=now - timedelta(seconds=seconds_ago), duration_ms=1.0
+        )
+
+    def test_never_refreshed_views_are_due(self):
+        self.assertEqual(MaterializedViewService.due(), list(MATERIALIZED_VIEWS))
+
+    def test_due_after_the_interval(self):
+        now = timezone.now()
+        self.refreshed('vw_habit_tracking', 299, now)
+        self.refreshed('vw_habit_stats', 300, now)
+        self.refreshed('vw_weekly_comparison', 600, now)
+
+        due = MaterializedViewService.due(now)
+
+        self.assertNotIn('vw_habit_tracking', due)
+        self.assertIn('vw_habit_stats', due)
+        # Its own interval from MATERIALIZED_VIEW_REFRESH_INTERVALS
+        self.assertNotIn('vw_weekly_comparison', due)
+        self.assertIn('vw_weekly_comparison', MaterializedViewService.due(now + timedelta(hours=1)))
+        self.assertEqual(len(due), len(MATERIALIZED_VIEWS) - 2)
+
+class ConsumerDashboardTests(TestCase):
+    """Section selection and per-section error isolation of /api/dashboard/"""
+
+    def setUp(self):
+        self.consumidor = create_ventana().consumidor
+        self.client = APIClient()
+        self.client.force_authenticate(self.consumidor.usuario)
+
+    @staticmethod
+    def section(name, consumidor_id, source):
+        if name == 'daily_summary':
+            raise RuntimeError('view is gone')
+        return {'name': name, 'consumidor_id': consumidor_id}, source
+
+    def get(self, **params):
+        with mock.patch.object(ConsumerDashboardViewSet, 'section', side_effect=self.section):
+            return self.client.get(
+                '/api/dashboard/', {'consumidor_id': self.consumidor.id, **params}, secure=True
+            )
+
+    def test_selected_sections_only(self):
+        response = self.get(sections=' active_session,unread_notifications, active_session', source='live')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['sections']), ['active_session', 'unread_notifications'])
+        self.assertEqual(
+            response.data['sections']['active_session'],
+            {'name': 'active_session', 'consumidor_id': self.consumidor.id}
+        )
+        self.assertEqual(response.data['data_sources'], {'active_session': 'live', 'unread_notifications': 'live'})
+        self.assertEqual(set(response.data['timings']), {'active_session', 'unread_notifications', 'total'})
+        self.assertIn('active_session;dur=', response['Server-Timing'])
+        self.assertNotIn('errors', response.data)
+
+    def test_all_sections_by_default(self):
+        response = self.get()
+
+        self.assertEqual(list(response.data['sections']), DASHBOARD_SECTIONS)
+
+    def test_failing_section_does_not_fail_the_others(self):
+        response = self.get(sections='daily_summary,active_session')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['sections']['daily_summary'])
+        self.assertEqual(response.data['errors'], {'daily_summary': 'view is gone'})
+        self.assertEqual(response.data['sections']['active_session']['name'], 'active_session')
+
+    def test_invalid_parameters(self):
+        unknown = self.get(sections='active_session,nope')
+        self.assertEqual(unknown.status_code, 400)
+        self.assertEqual(unknown.data['available'], DASHBOARD_SECTIONS)
+
+        self.assertEqual(self.get(source='stale').status_code, 400)
+        self.assertEqual(self.get(consumidor_id='abc').status_code, 400)
@@ -28,6 +28,7 @@ router.register(r'notificaciones', views.NotificacionViewSet, basename='notifica
 # Device session management (ESP32)
 router.register(r'device-session', views.DeviceSessionViewSet, basename='device-session')
 
+router.register(r'dashboard', views.ConsumerDashboardViewSet, basename='dashboard')
 router.register(r'dashboard/habit-tracking', views.VwHabitTrackingViewSet, basename='dashboard-habit-tracking')
 router.register(r'dashboard/habit-stats', views.VwHabitStatsViewSet, basename='dashboard-habit-stats')
 router.register(r'dashboard/heart-rate', views.VwHeartRateTimelineViewSet, basename='dashboard-heart-rate')
@@ -45,5 +46,7 @@ urlpatterns = [
     path('', include(router.urls)),
     path('predict/', views.predict_craving),
     path('task-status/<str:task_id>/', views.check_task_status),
+    path('model-status/', views.model_status),
+    path('dashboard/freshness/', views.dashboard_freshness),
 ]
 
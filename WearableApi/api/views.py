@@ -4,15 +4,32 @@ from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from django.contrib.auth.hashers import check_password
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 from api.models import *
 from api.serializers import *
-from api.services import AuthenticationService, UserFactory
-from utils.mixins import LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin
+from api.services import (
+    AuthenticationService, UserFactory, LecturaIngestionService, LecturaBuffer, LecturaCounter,
+    VentanaStatsService, ModelRegistry, PredictionBatcher, MaterializedViewService, DashboardCache,
+    HeartRateSeriesService
+)
+from api.parsers import LecturaFrameParser
+from utils.mixins import (
+    LoggingMixin, ConsumerFilterMixin, ConsumerCacheMixin, ConditionalGetMixin, DataVersionMixin,
+    MaterializedSourceMixin, ReadOnlyMixin
+)
+from utils.conditional import is_not_modified, make_etag, not_modified, set_validators
+from utils.pagination import KeysetPagination
 from utils.decorators import log_endpoint
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Sum
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django.core.cache import cache
-from .tasks import predict_smoking_craving
+from .tasks import enqueue_prediction, predict_inline
 from celery.result import AsyncResult
 
 # Import the new Celery tasks
@@ -191,7 +208,7 @@ class UsuarioViewSet(LoggingMixin, viewsets.ModelViewSet):
                     try:
                         ventana = Ventana.objects.get(id=ventana_id)
                         ventana.window_end = timezone.now()
-                        ventana.save()
+                        ventana.save(update_fields=['window_end', 'updated_at'])
                         session_stopped = True
                     except Ventana.DoesNotExist:
                         pass
@@ -347,8 +364,16 @@ class DeviceSessionViewSet(LoggingMixin, viewsets.ViewSet):
             session_key = f'active_session:{consumidor.id}'
             session_data = cache.get(session_key)
             
+            # Polled repeatedly, the session id is enough to tell if it changed
+            etag = make_etag(
+                'device-session', consumidor.id, request.accepted_renderer.format,
+                session_data['session_id'] if session_data else None
+            )
+            if is_not_modified(request, etag):
+                return not_modified(etag)
+            
             if session_data:
-                return Response({
+                response = Response({
                     'is_active': True,
                     'session_id': session_data['session_id'],
                     'ventana_id': session_data['ventana_id'],
@@ -356,11 +381,13 @@ class DeviceSessionViewSet(LoggingMixin, viewsets.ViewSet):
                     'started_at': session_data['started_at'],
                 }, status=status.HTTP_200_OK)
             else:
-                return Response({
+                response = Response({
                     'is_active': False,
                     'message': 'No active monitoring session'
                 }, status=status.HTTP_200_OK)
             
+            return set_validators(response, etag)
+            
         except Exception as e:
             self.logger.error(f"Error getting active session: {str(e)}")
             return Response({
@@ -394,7 +421,7 @@ class DeviceSessionViewSet(LoggingMixin, viewsets.ViewSet):
             
             # Extend window by 1 hour
             ventana.window_end = timezone.now() + timezone.timedelta(hours=1)
-            ventana.save()
+            ventana.save(update_fields=['window_end', 'updated_at'])
             
             self.logger.info(f"Ventana {ventana_id} window extended")
             
@@ -441,7 +468,7 @@ class PermisoViewSet(LoggingMixin, viewsets.ModelViewSet):
     queryset = Permiso.objects.all()
     serializer_class = PermisoSerializer
 
-class FormularioViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewSet):
+class FormularioViewSet(LoggingMixin, ConditionalGetMixin, ConsumerFilterMixin, DataVersionMixin, viewsets.ModelViewSet):
     
     queryset = Formulario.objects.select_related(
         'consumidor__usuario'
@@ -455,16 +482,23 @@ class FormularioTemporalViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.Mode
     ).all()
     serializer_class = FormularioTemporalSerializer
 
-class VentanaViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewSet):
+class VentanaViewSet(LoggingMixin, ConsumerFilterMixin, DataVersionMixin, viewsets.ModelViewSet):
     
     queryset = Ventana.objects.select_related('consumidor__usuario').all()
     serializer_class = VentanaSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-window_start', '-id')
 
 
-class AnalisisViewSet(LoggingMixin, viewsets.ModelViewSet):
+class AnalisisViewSet(LoggingMixin, DataVersionMixin, viewsets.ModelViewSet):
     
     queryset = Analisis.objects.select_related('ventana__consumidor').all()
     serializer_class = AnalisisSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
+    
+    def get_consumidor_id(self, instance):
+        return instance.ventana.consumidor_id
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -475,7 +509,7 @@ class AnalisisViewSet(LoggingMixin, viewsets.ModelViewSet):
         
         return queryset
 
-class DeseoViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewSet):
+class DeseoViewSet(LoggingMixin, ConditionalGetMixin, ConsumerFilterMixin, DataVersionMixin, viewsets.ModelViewSet):
     
     queryset = Deseo.objects.select_related('consumidor__usuario', 'ventana').all()
     serializer_class = DeseoSerializer
@@ -484,6 +518,7 @@ class DeseoViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewSet):
     def resolve(self, request, pk=None):
         deseo = self.get_object()
         deseo.mark_resolved()
+        DashboardCache.invalidate(deseo.consumidor_id)
         
         self.logger.info(f"Desire {pk} marked as resolved")
         
@@ -494,7 +529,7 @@ class DeseoViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewSet):
             'time_to_resolution': deseo.time_to_resolution
         })
 
-class NotificacionViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewSet):
+class NotificacionViewSet(LoggingMixin, ConditionalGetMixin, ConsumerFilterMixin, DataVersionMixin, viewsets.ModelViewSet):
     
     queryset = Notificacion.objects.select_related(
         'consumidor__usuario', 'deseo'
@@ -505,6 +540,7 @@ class NotificacionViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewS
     def mark_read(self, request, pk=None):
         notificacion = self.get_object()
         notificacion.mark_read()
+        DashboardCache.invalidate(notificacion.consumidor_id)
         
         self.logger.info(f"Notification {pk} marked as read")
         
@@ -518,6 +554,7 @@ class NotificacionViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewS
     def mark_unread(self, request, pk=None):
         notificacion = self.get_object()
         notificacion.mark_unread()
+        DashboardCache.invalidate(notificacion.consumidor_id)
         
         self.logger.info(f"Notification {pk} marked as unread")
         
@@ -527,66 +564,332 @@ class NotificacionViewSet(LoggingMixin, ConsumerFilterMixin, viewsets.ModelViewS
             'leida': notificacion.leida
         })
 
-class VwHabitTrackingViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwHabitTrackingViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, MaterializedSourceMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwHabitTracking.objects.all()
+    materialized_queryset = MvHabitTracking.objects.all()
     serializer_class = VwHabitTrackingSerializer
 
-class VwHabitStatsViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwHabitStatsViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, MaterializedSourceMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwHabitStats.objects.all()
+    materialized_queryset = MvHabitStats.objects.all()
     serializer_class = VwHabitStatsSerializer
 
-class VwHeartRateTimelineViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwHeartRateTimelineViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwHeartRateTimeline.objects.all()
     serializer_class = VwHeartRateTimelineSerializer
+    
+    @action(detail=False, methods=['get'])
+    def series(self, request):
+        """
+        Heart rate of a consumer over a time range, at most max_points
+        buckets whatever the range
+        
+        Query params:
+        - consumidor_id (required): Consumer ID
+        - from / to (optional): ISO datetimes or dates, default the last 24 hours
+        - max_points (optional): default HR_SERIES_DEFAULT_POINTS, at most HR_SERIES_MAX_POINTS
+        - granularity (optional): 'window' (ventana hr_mean, default) or 'reading' (lecturas)
+        - downsample (optional): 'lttb' to keep the shape of the curve instead of plain averages
+        
+        GET /api/dashboard/heart-rate/series/?consumidor_id=1&from=2025-11-03&max_points=500&downsample=lttb
+        """
+        consumidor_id = request.query_params.get('consumidor_id')
+        if not consumidor_id:
+            return Response({
+                'error': 'consumidor_id is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            consumidor_id = int(consumidor_id)
+            hasta = self.parse_timestamp(request.query_params.get('to')) or timezone.now()
+            desde = self.parse_timestamp(request.query_params.get('from')) or hasta - timedelta(hours=24)
+            max_points = int(request.query_params.get('max_points', settings.HR_SERIES_DEFAULT_POINTS))
+        except ValueError as e:
+            return Response({
+                'error': f'Invalid parameter: {str(e)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if desde >= hasta:
+            return Response({
+                'error': "'from' must be before 'to'"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        granularity = request.query_params.get('granularity', 'window')
+        if granularity not in HeartRateSeriesService.GRANULARITIES:
+            return Response({
+                'error': f"granularity must be one of: {', '.join(HeartRateSeriesService.GRANULARITIES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        downsample = request.query_params.get('downsample')
+        if downsample not in (None, 'lttb'):
+            return Response({
+                'error': "downsample must be 'lttb'"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_points = min(max(max_points, 2), settings.HR_SERIES_MAX_POINTS)
+        
+        return Response(
+            HeartRateSeriesService.series(consumidor_id, desde, hasta, max_points, granularity, downsample),
+            status=status.HTTP_200_OK
+        )
+    
+    @staticmethod
+    def parse_timestamp(value):
+        """Aware datetime from an ISO datetime or date, None when missing"""
+        if not value:
+            return None
+        
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(f"'{value}' is not an ISO date or datetime")
+            parsed = datetime.combine(day, datetime.min.time())
+        
+        return timezone.make_aware(parsed) if timezone.is_naive(parsed) else parsed
 
-class VwHeartRateStatsViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwHeartRateStatsViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, MaterializedSourceMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwHeartRateStats.objects.all()
+    materialized_queryset = MvHeartRateStats.objects.all()
     serializer_class = VwHeartRateStatsSerializer
 
-class VwHeartRateTodayViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwHeartRateTodayViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, MaterializedSourceMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwHeartRateToday.objects.all()
+    materialized_queryset = MvHeartRateToday.objects.all()
     serializer_class = VwHeartRateTodaySerializer
 
-class VwPredictionTimelineViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwPredictionTimelineViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwPredictionTimeline.objects.all()
     serializer_class = VwPredictionTimelineSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-window_start', '-analisis_id')
 
-class VwPredictionSummaryViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwPredictionSummaryViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, MaterializedSourceMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwPredictionSummary.objects.all()
+    materialized_queryset = MvPredictionSummary.objects.all()
     serializer_class = VwPredictionSummarySerializer
 
-class VwDesiresTrackingViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwDesiresTrackingViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwDesiresTracking.objects.all()
     serializer_class = VwDesiresTrackingSerializer
 
-class VwDesiresStatsViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwDesiresStatsViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, MaterializedSourceMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwDesiresStats.objects.all()
+    materialized_queryset = MvDesiresStats.objects.all()
     serializer_class = VwDesiresStatsSerializer
 
-class VwDailySummaryViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwDailySummaryViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, MaterializedSourceMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwDailySummary.objects.all()
+    materialized_queryset = MvDailySummary.objects.all()
     serializer_class = VwDailySummarySerializer
 
-class VwWeeklyComparisonViewSet(LoggingMixin, ConsumerFilterMixin, ReadOnlyMixin, viewsets.ModelViewSet):
+class VwWeeklyComparisonViewSet(LoggingMixin, ConditionalGetMixin, ConsumerCacheMixin, ConsumerFilterMixin, MaterializedSourceMixin, ReadOnlyMixin, viewsets.ModelViewSet):
     queryset = VwWeeklyComparison.objects.all()
+    materialized_queryset = MvWeeklyComparison.objects.all()
     serializer_class = VwWeeklyComparisonSerializer
 
+# Sections of GET /api/dashboard/ read from a dashboard view:
+# name -> (live view, materialized variant, serializer, many rows)
+DASHBOARD_VIEW_SECTIONS = {
+    'daily_summary': (VwDailySummary, MvDailySummary, VwDailySummarySerializer, False),
+    'heart_rate_today': (VwHeartRateToday, MvHeartRateToday, VwHeartRateTodaySerializer, False),
+    'prediction_summary': (VwPredictionSummary, MvPredictionSummary, VwPredictionSummarySerializer, False),
+    'desires_stats': (VwDesiresStats, MvDesiresStats, VwDesiresStatsSerializer, True),
+    'weekly_comparison': (VwWeeklyComparison, MvWeeklyComparison, VwWeeklyComparisonSerializer, False),
+    'habit_stats': (VwHabitStats, MvHabitStats, VwHabitStatsSerializer, True),
+}
+DASHBOARD_SECTIONS = [*DASHBOARD_VIEW_SECTIONS, 'unread_notifications', 'active_session']
+
+# Shared by every request so the DB connections it opens stay bounded
+dashboard_executor = ThreadPoolExecutor(
+    max_workers=settings.DASHBOARD_MAX_WORKERS,
+    thread_name_prefix='dashboard'
+)
+
+class ConsumerDashboardViewSet(LoggingMixin, viewsets.ViewSet):
+    """
+    Home screen of the app in one request
+    
+    GET /api/dashboard/?consumidor_id=1
+    GET /api/dashboard/?consumidor_id=1&sections=daily_summary,active_session
+    
+    Runs the sections concurrently on a thread pool and returns them
+    together with per-section timings (also as a Server-Timing header).
+    A failing section is reported in 'errors' without failing the others.
+    ?source=live|materialized applies to the sections read from views.
+    """
+    
+    permission_classes = [IsAuthenticated]
+    
+    def list(self, request):
+        started = time.perf_counter()
+        
+        consumidor_id = request.query_params.get('consumidor_id')
+        if not consumidor_id and hasattr(request.user, 'consumidor'):
+            consumidor_id = request.user.consumidor.id
+        if not consumidor_id:
+            return Response({
+                'error': 'consumidor_id is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            consumidor_id = int(consumidor_id)
+        except ValueError:
+            return Response({
+                'error': 'consumidor_id must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        sections = request.query_params.get('sections')
+        sections = [name.strip() for name in sections.split(',') if name.strip()] if sections else DASHBOARD_SECTIONS
+        unknown = [name for name in sections if name not in DASHBOARD_SECTIONS]
+        if unknown:
+            return Response({
+                'error': f"Unknown sections: {', '.join(unknown)}",
+                'available': DASHBOARD_SECTIONS
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        source = request.query_params.get('source')
+        if source not in (None, 'live', 'materialized'):
+            return Response({
+                'error': "source must be 'live' or 'materialized'"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        futures = {
+            name: dashboard_executor.submit(self.run_section, name, consumidor_id, source)
+            for name in dict.fromkeys(sections)
+        }
+        
+        payload = {'consumidor_id': consumidor_id, 'sections': {}, 'data_sources': {}, 'timings': {}}
+        errors = {}
+        for name, future in futures.items():
+            data, data_source, error, ms = future.result()
+            payload['sections'][name] = data
+            payload['timings'][name] = round(ms, 2)
+            if data_source:
+                payload['data_sources'][name] = data_source
+            if error:
+                errors[name] = error
+        
+        if errors:
+            payload['errors'] = errors
+        payload['timings']['total'] = round((time.perf_counter() - started) * 1000, 2)
+        
+        response = Response(payload, status=status.HTTP_200_OK)
+        response['Server-Timing'] = server_timing(payload['timings'].items())
+        return response
+    
+    def run_section(self, name, consumidor_id, source):
+        """One section in a pool thread: (data, data_source, error, milliseconds)"""
+        # Pool threads live across requests, their connections are
+        # recycled like a request's are
+        close_old_connections()
+        started = time.perf_counter()
+        data, data_source, error = None, None, None
+        
+        try:
+            data, data_source = self.section(name, consumidor_id, source)
+        except Exception as e:
+            self.logger.error(f"❌ Dashboard section {name} failed: {str(e)}")
+            error = str(e)
+        finally:
+            close_old_connections()
+        
+        return data, data_source, error, (time.perf_counter() - started) * 1000
+    
+    @staticmethod
+    def section(name, consumidor_id, source):
+        """(data, data_source) of one section"""
+        if name == 'active_session':
+            session_data = cache.get(f'active_session:{consumidor_id}')
+            return {'is_active': bool(session_data), **(session_data or {})}, None
+        
+        if name == 'unread_notifications':
+            unread = Notificacion.objects.select_related('consumidor__usuario', 'deseo').filter(
+                consumidor_id=consumidor_id, leida=False
+            ).order_by('-fecha_envio')
+            return {
+                'count': unread.count(),
+                'results': NotificacionSerializer(unread[:settings.DASHBOARD_NOTIFICATIONS_LIMIT], many=True).data
+            }, None
+        
+        live, materialized, serializer_class, many = DASHBOARD_VIEW_SECTIONS[name]
+        view_name = live._meta.db_table
+        queryset, data_source = live.objects.all(), 'live'
+        
+        # Same choice as MaterializedSourceMixin, never-refreshed variants fall back to live
+        if (source or MaterializedViewService.default_source(view_name)) == 'materialized':
+            if MaterializedViewService.freshness(view_name) is not None:
+                queryset, data_source = materialized.objects.all(), 'materialized'
+        
+        queryset = queryset.filter(consumidor_id=consumidor_id)
+        if many:
+            return serializer_class(queryset, many=True).data, data_source
+        
+        row = queryset.first()
+        return (serializer_class(row).data if row is not None else None), data_source
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def predict_craving(request):
+    """
+    Queue a craving prediction, or with ?mode=sync compute it in this
+    request within PREDICTION_SYNC_BUDGET_MS and fall back to the task
+    when the budget runs out. Sync responses carry a Server-Timing header.
+    """
     manual_features = request.data.get('manual_features', None)
+    mode = request.query_params.get('mode', 'async')
     
-    task = predict_smoking_craving.delay(request.user.id, manual_features)
+    if mode not in ('async', 'sync'):
+        return Response(
+            {'error': "mode must be 'async' or 'sync'"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
-    return Response({
-        'task_id': task.id,
+    timings = []
+    if mode == 'sync':
+        started = time.perf_counter()
+        result, timings = predict_inline(request.user.id, manual_features)
+        timings.append(('total', (time.perf_counter() - started) * 1000))
+        
+        if result is not None:
+            response = Response({
+                'status': 'completed',
+                'mode': 'sync',
+                'result': result
+            })
+            response['Server-Timing'] = server_timing(timings)
+            return response
+    
+    task_id = enqueue_prediction(request.user.id, manual_features)
+    
+    response = Response({
+        'task_id': task_id,
         'status': 'processing',
+        'mode': 'async',
+        'fallback': mode == 'sync',
         'message': 'Prediction task started. Will calculate from sensor readings.' if manual_features is None else 'Using provided manual features.'
     }, status=202)
+    if timings:
+        response['Server-Timing'] = server_timing(timings)
+    return response
+
+def server_timing(timings):
+    """Server-Timing header value from (name, milliseconds) pairs"""
+    return ', '.join(f'{name};dur={ms:.2f}' for name, ms in timings)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def check_task_status(request, task_id):
+    # Batched predictions keep their result in Redis, not in a task
+    batched = PredictionBatcher.result(task_id)
+    if batched is not None:
+        if batched.get('status') == 'pending':
+            return Response({'status': 'processing'})
+        return Response({
+            'status': 'completed',
+            'result': batched
+        })
+    
     task = AsyncResult(task_id)
     
     if task.ready():
@@ -594,9 +897,29 @@ def check_task_status(request, task_id):
             'status': 'completed',
             'result': task.result
         })
+    elif task.state == 'PROGRESS':
+        return Response({
+            'status': 'processing',
+            'progress': task.info
+        })
     else:
         return Response({'status': 'processing'})
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def model_status(request):
+    """Model package loaded by this process: version, load time and file mtime"""
+    return Response(ModelRegistry.info())
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_freshness(request):
+    """Last refresh, age and interval of every materialized dashboard view"""
+    return Response({
+        view_name: {**info, 'default_source': MaterializedViewService.default_source(view_name)}
+        for view_name, info in MaterializedViewService.freshness().items()
+    })
+
 
 class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
     """
@@ -610,16 +933,23 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
     - GET /api/lecturas/ - List all readings (with filters)
     - GET /api/lecturas/:id/ - Get specific reading
     - POST /api/lecturas/ - Create new reading (ESP32, no auth required)
+    - POST /api/lecturas/batch/ - Create many readings for one ventana (ESP32, no auth required)
+    - POST /api/lecturas/frame/ - Create readings from a binary sensor frame (ESP32, no auth required)
     - GET /api/lecturas/recent/ - Get recent readings for a consumer
     """
     
     queryset = Lectura.objects.select_related('ventana', 'ventana__consumidor').all()
     serializer_class = LecturaSerializer
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
         """
         Filter queryset based on query parameters
-        Supports: ventana_id, consumidor_id, limit, ordering
+        Supports: ventana_id, consumidor_id, ordering
+        
+        The list is paginated by cursor on (created_at, id), ?limit sets
+        the page size and ?page / ?ordering switch to page numbers
         """
         queryset = super().get_queryset()
         
@@ -637,15 +967,6 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
         ordering = self.request.query_params.get('ordering', '-created_at')
         queryset = queryset.order_by(ordering)
         
-        # Apply limit if specified
-        limit = self.request.query_params.get('limit')
-        if limit:
-            try:
-                limit_int = int(limit)
-                queryset = queryset[:limit_int]
-            except ValueError:
-                pass
-        
         return queryset
     
     def get_permissions(self):
@@ -653,7 +974,7 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
         Allow unauthenticated POST requests for ESP32 sensor data
         All other actions require authentication
         """
-        if self.action == 'create':
+        if self.action in ['create', 'batch', 'frame']:
             return [AllowAny()]
         return [IsAuthenticated()]
     
@@ -688,6 +1009,11 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
                     'error': 'ventana_id is required'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            # Write-behind mode: queue the reading in Redis and return,
+            # flush_lectura_buffer persists it and triggers the calculations
+            if LecturaBuffer.is_enabled():
+                return self.create_buffered(request, ventana_id)
+            
             # Validate ventana exists
             try:
                 ventana = Ventana.objects.get(id=ventana_id)
@@ -702,7 +1028,13 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             
             serializer = self.get_serializer(data=data)
             serializer.is_valid(raise_exception=True)
-            lectura = self.perform_create(serializer)
+            
+            # Counter and running statistics are updated in the insert's
+            # transaction, no COUNT(*) or full recompute needed
+            with transaction.atomic():
+                lectura = self.perform_create(serializer)
+                lectura_count = LecturaCounter.increment(ventana.id)
+                VentanaStatsService.accumulate(ventana.id, [lectura])
             
             self.logger.info(
                 f"✓ Lectura created: ID={lectura.id}, Ventana={ventana_id}, "
@@ -712,21 +1044,11 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             )
             
             # TRIGGER CELERY TASKS
-            # Check if we have enough readings to calculate statistics
-            lectura_count = Lectura.objects.filter(ventana_id=ventana_id).count()
-            
             # Trigger check and calculation every 5 readings
             # This prevents overwhelming the task queue
-            if lectura_count % 5 == 0:
-                self.logger.info(
-                    f"📊 Triggering ventana calculation check (count: {lectura_count})"
-                )
-                check_and_calculate_ventana_stats.delay(ventana_id, min_readings=5)
-            
-            # If ventana is ending soon, force calculation
-            if ventana.window_end and timezone.now() >= ventana.window_end:
-                self.logger.info(f"⏰ Ventana {ventana_id} window ended, forcing calculation")
-                calculate_ventana_statistics.delay(ventana_id)
+            calculation_pending = LecturaIngestionService.schedule_calculation(
+                ventana, lectura_count - 1, lectura_count
+            )
             
             headers = self.get_success_headers(serializer.data)
             return Response(
@@ -736,7 +1058,7 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
                     'ventana_id': ventana_id,
                     'message': 'Sensor data saved successfully',
                     'lectura_count': lectura_count,
-                    'calculation_pending': lectura_count % 5 == 0,
+                    'calculation_pending': calculation_pending,
                     'data': serializer.data
                 },
                 status=status.HTTP_201_CREATED,
@@ -750,10 +1072,164 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
                 'detail': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
     
+    def create_buffered(self, request, ventana_id):
+        """Validate a reading and append it to the ventana's Redis buffer"""
+        if not LecturaBuffer.ventana_exists(ventana_id):
+            return Response({
+                'error': f'Ventana with id {ventana_id} does not exist'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = LecturaSampleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        buffered = LecturaBuffer.push(ventana_id, [serializer.validated_data])
+        
+        return Response({
+            'status': 'buffered',
+            'ventana_id': ventana_id,
+            'buffered': buffered,
+            'message': 'Sensor data queued for storage'
+        }, status=status.HTTP_202_ACCEPTED)
+    
     def perform_create(self, serializer):
         """Save the lectura and return the instance"""
         return serializer.save()
     
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    def batch(self, request):
+        """
+        Create many lecturas for one ventana in a single request
+        
+        All samples are validated in one pass and written with a single
+        bulk insert; the ventana statistics check is enqueued at most once
+        per batch.
+        
+        POST /api/lecturas/batch/
+        Body: {
+            "ventana_id": 1,  # or "ventana": 1
+            "lecturas": [
+                {"heart_rate": 75.5, "accel_x": 0.12, "accel_y": -0.05, "accel_z": 0.98,
+                 "gyro_x": 1.5, "gyro_y": -0.3, "gyro_z": 0.8},
+                ...
+            ]
+        }
+        """
+        ventana_id = request.data.get('ventana') or request.data.get('ventana_id')
+        
+        if not ventana_id:
+            return Response({
+                'error': 'ventana_id is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            ventana = Ventana.objects.get(id=ventana_id)
+        except (Ventana.DoesNotExist, ValueError):
+            return Response({
+                'error': f'Ventana with id {ventana_id} does not exist'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = LecturaBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        samples = serializer.validated_data['lecturas']
+        
+        lecturas, lectura_count = LecturaIngestionService.bulk_insert(ventana, samples)
+        
+        calculation_pending = LecturaIngestionService.schedule_calculation(
+            ventana, lectura_count - len(lecturas), lectura_count
+        )
+        
+        self.logger.info(
+            f"✓ Lectura batch created: {len(lecturas)} readings, Ventana={ventana.id}"
+        )
+        
+        return Response({
+            'status': 'success',
+            'ventana_id': ventana.id,
+            'created': len(lecturas),
+            'lectura_count': lectura_count,
+            'calculation_pending': calculation_pending,
+            'message': 'Sensor data batch saved successfully'
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny],
+            parser_classes=[LecturaFrameParser])
+    def frame(self, request):
+        """
+        Create lecturas from a compact binary frame sent by the ESP32
+        
+        POST /api/lecturas/frame/
+        Content-Type: application/octet-stream
+        
+        Layout (little-endian), see LecturaFrameParser:
+            uint32 ventana_id, uint32 sample_count, float64 base_timestamp,
+            then sample_count rows of 7 float32 values
+            (heart_rate, accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z)
+        
+        The readings are stored with base_timestamp as created_at, so frames
+        sent late or in a burst keep their sample time. The layout has no
+        per-sample offset, so every row of a frame gets the same time (the
+        id keeps their order). An implausible base_timestamp, see
+        LecturaIngestionService.frame_time, falls back to the insert time.
+        """
+        frame = request.data
+        ventana_id = frame['ventana_id']
+        sample_count = frame['sample_count']
+        
+        if sample_count == 0:
+            return Response({
+                'error': 'Frame contains no samples'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if sample_count > settings.LECTURA_BATCH_MAX_SIZE:
+            return Response({
+                'error': f'Frame exceeds {settings.LECTURA_BATCH_MAX_SIZE} samples'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            ventana = Ventana.objects.get(id=ventana_id)
+        except Ventana.DoesNotExist:
+            return Response({
+                'error': f'Ventana with id {ventana_id} does not exist'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            samples = LecturaIngestionService.samples_from_array(frame['samples'])
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        taken_at = LecturaIngestionService.frame_time(ventana, frame['base_timestamp'])
+        if taken_at is None:
+            self.logger.warning(
+                f"Frame base_timestamp {frame['base_timestamp']} out of range for "
+                f"Ventana {ventana.id}, using the insert time"
+            )
+        for sample in samples:
+            sample['created_at'] = taken_at
+        
+        lecturas, lectura_count = LecturaIngestionService.bulk_insert(ventana, samples)
+        
+        calculation_pending = LecturaIngestionService.schedule_calculation(
+            ventana, lectura_count - len(lecturas), lectura_count
+        )
+        
+        self.logger.info(
+            f"✓ Lectura frame created: {len(lecturas)} readings, Ventana={ventana.id}, "
+            f"base_timestamp={frame['base_timestamp']}"
+        )
+        
+        return Response({
+            'status': 'success',
+            'ventana_id': ventana.id,
+            'created': len(lecturas),
+            'base_timestamp': frame['base_timestamp'],
+            'timestamp_used': taken_at is not None,
+            'lectura_count': lectura_count,
+            'calculation_pending': calculation_pending,
+            'message': 'Sensor frame saved successfully'
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def recent(self, request):
         """
@@ -817,7 +1293,7 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Check if there are readings
-        lectura_count = Lectura.objects.filter(ventana_id=ventana_id).count()
+        lectura_count = LecturaCounter.get(ventana.id)
         
         if lectura_count == 0:
             return Response({
@@ -851,9 +1327,9 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
         
         if consumidor_id:
             # Stats for specific consumer
-            total_lecturas = Lectura.objects.filter(
-                ventana__consumidor_id=consumidor_id
-            ).count()
+            total_lecturas = Ventana.objects.filter(
+                consumidor_id=consumidor_id
+            ).aggregate(total=Sum('lectura_count'))['total'] or 0
             
             ventanas_with_stats = Ventana.objects.filter(
                 consumidor_id=consumidor_id,
@@ -873,7 +1349,7 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
             })
         else:
             # Global stats
-            total_lecturas = Lectura.objects.count()
+            total_lecturas = Ventana.objects.aggregate(total=Sum('lectura_count'))['total'] or 0
             total_ventanas = Ventana.objects.count()
             ventanas_calculated = Ventana.objects.filter(hr_mean__isnull=False).count()
             ventanas_pending = Ventana.objects.filter(hr_mean__isnull=True).count()
@@ -883,5 +1359,6 @@ class LecturaViewSet(LoggingMixin, viewsets.ModelViewSet):
                 'total_ventanas': total_ventanas,
                 'ventanas_calculated': ventanas_calculated,
                 'ventanas_pending': ventanas_pending,
-                'calculation_rate': f"{(ventanas_calculated/total_ventanas*100):.1f}%" if total_ventanas > 0 else "0%"
+                'calculation_rate': f"{(ventanas_calculated/total_ventanas*100):.1f}%" if total_ventanas > 0 else "0%",
+                'buffer': LecturaBuffer.status() if LecturaBuffer.is_enabled() else None
             })
@@ -1,4 +1,5 @@
 import os
+import shutil
 import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WearableApi.settings')
@@ -28,6 +29,9 @@ if ventanas_count > 0:
         Lectura.objects.all().delete()
         Ventana.objects.all().delete()
         
+        # The training snapshot describes the deleted ventanas
+        shutil.rmtree(os.environ.get('TRAIN_SNAPSHOT_DIR', 'snapshots/training'), ignore_errors=True)
+        
         print("✅ Todos los datos eliminados")
         print("\n💡 Ahora ejecuta: py train_model.py")
         print("   Y responde 'y' cuando pregunte si insertar datos de muestra")
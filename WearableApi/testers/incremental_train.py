@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import django
+import joblib
+import numpy as np
+from datetime import datetime
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WearableApi.settings')
+django.setup()
+
+from django.conf import settings
+from django.db.models import Max
+from api.models import Analisis
+from api.services import ModelTrainer
+from api.services.ventana_features import FEATURE_NAMES
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import accuracy_score, log_loss
+
+MODELS_DIR = settings.ML_MODELS_DIR
+CHECKPOINT_MANIFEST = os.path.join(MODELS_DIR, 'smoking_craving_checkpoint.json')
+CLASSES = np.array([0, 1])
+
+def checkpoint_path(version):
+    return os.path.join(MODELS_DIR, f'smoking_craving_checkpoint_v{version:04d}.pkl')
+
+def load_checkpoint():
+    """Latest checkpoint package, None before the first incremental run"""
+    if not os.path.exists(CHECKPOINT_MANIFEST):
+        return None
+
+    with open(CHECKPOINT_MANIFEST) as f:
+        manifest = json.load(f)
+
+    return joblib.load(checkpoint_path(manifest['version']))
+
+def new_checkpoint():
+    return {
+        'model': SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42),
+        'scaler': StandardScaler(),
+        'feature_names': list(FEATURE_NAMES),
+        'model_name': 'SGDClassifier_incremental',
+        'version': 0,
+        'max_analisis_id': 0,
+        'samples_seen': 0,
+        'metrics': {},
+        'history': [],
+    }
+
+def labelled_since(max_analisis_id):
+    """
+    (latest analisis id, X, y) for the Analisis labelled after
+    max_analisis_id, from the SQL features the API serves with.
+    The latest id is None when there is nothing new.
+    """
+    latest = Analisis.objects.filter(
+        id__gt=max_analisis_id, urge_label__isnull=False
+    ).aggregate(latest=Max('id'))['latest']
+    if latest is None:
+        return None, None, None
+
+    _, X, y = ModelTrainer.dataset(after_analisis_id=max_analisis_id, max_analisis_id=latest)
+    print(f"✅ {len(y)} labels nuevos con lecturas (hasta análisis {latest})")
+
+    return latest, X, y
+
+def progressive_metrics(package, X, y):
+    """Score the new batch before learning from it (test-then-train)"""
+    model = package['model']
+    if not hasattr(model, 'coef_'):
+        return None
+
+    probabilities = model.predict_proba(package['scaler'].transform(X))[:, 1]
+    return {
+        'accuracy': float(accuracy_score(y, (probabilities >= 0.5).astype(int))),
+        'log_loss': float(log_loss(y, probabilities, labels=CLASSES)),
+        'samples': int(len(y)),
+    }
+
+def save_checkpoint(package):
+    """Write the versioned checkpoint, then point the manifest at it"""
+    os.makedirs(MODELS_DIR, exist_ok=True)
+    path = checkpoint_path(package['version'])
+
+    joblib.dump(package, f'{path}.tmp')
+    os.replace(f'{path}.tmp', path)
+
+    manifest = {
+        'version': package['version'],
+        'path': path,
+        'max_analisis_id': package['max_analisis_id'],
+        'samples_seen': package['samples_seen'],
+        'training_date': package['training_date'],
+    }
+    with open(f'{CHECKPOINT_MANIFEST}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{CHECKPOINT_MANIFEST}.tmp', CHECKPOINT_MANIFEST)
+
+    return path
+
+def publish(package):
+    """Serve the checkpoint through ModelTrainer.publish, like a full retrain"""
+    version = datetime.now().strftime('%Y%m%d_%H%M%S')
+    # publish() stamps its version string on the package, the checkpoint keeps its own
+    published = ModelTrainer.publish(dict(package), version)
+
+    print(f"✅ Publicado como versión {version}: {published['model_path']}")
+    if published['artifact_path']:
+        print(f"✅ Artefacto NumPy: {published['artifact_path']}")
+
+def incremental_update():
+    """
+    Update the SGD checkpoint with the ventanas labelled since the last
+    one. Work is proportional to the new Analisis rows and their lecturas.
+    Returns (checkpoint path, package), None when there was nothing new.
+    """
+    package = load_checkpoint() or new_checkpoint()
+    print(f"📦 Checkpoint v{package['version']}: "
+          f"{package['samples_seen']} muestras, último análisis {package['max_analisis_id']}")
+
+    latest, X, y = labelled_since(package['max_analisis_id'])
+    if latest is None:
+        print("✅ No hay labels nuevos, el checkpoint está al día")
+        return None
+
+    if not len(y):
+        # The labelled ventanas have no lecturas, skip them for good
+        print("⚠️  Los labels nuevos no tienen lecturas")
+
+    metrics = progressive_metrics(package, X, y) if len(y) else None
+    if metrics:
+        print(f"📈 Antes de actualizar: accuracy={metrics['accuracy']:.3f}, log_loss={metrics['log_loss']:.3f}")
+
+    if len(y):
+        print(f"\n🎓 partial_fit con {len(y)} muestras...")
+        package['scaler'].partial_fit(X)
+        package['model'].partial_fit(package['scaler'].transform(X), y, classes=CLASSES)
+
+    package['version'] += 1
+    package['max_analisis_id'] = int(latest)
+    package['samples_seen'] += int(len(y))
+    package['training_date'] = datetime.now().isoformat()
+    if metrics:
+        package['metrics'] = {'accuracy': metrics['accuracy'], 'log_loss': metrics['log_loss']}
+    package['history'].append({
+        'version': package['version'],
+        'training_date': package['training_date'],
+        'samples': int(len(y)),
+        'max_analisis_id': package['max_analisis_id'],
+        'progressive': metrics,
+    })
+
+    path = save_checkpoint(package)
+    print(f"✅ Checkpoint v{package['version']} guardado en: {path}")
+    return path, package
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("🔁 ENTRENAMIENTO INCREMENTAL (partial_fit)")
+    print("=" * 60)
+
+    result = incremental_update()
+
+    if result and '--publish' in sys.argv:
+        _, package = result
+        if not hasattr(package['model'], 'coef_'):
+            print("❌ El checkpoint todavía no tiene datos, no se publica")
+            sys.exit(1)
+        publish(package)
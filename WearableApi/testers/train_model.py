@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 import django
 import joblib
 import pandas as pd
@@ -9,167 +10,172 @@ from datetime import datetime
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WearableApi.settings')
 django.setup()
 
+from django.conf import settings
 from api.models import Lectura, Ventana, Analisis, Consumidor
-from sklearn.model_selection import train_test_split
+from api.services import ModelTrainer
+from api.services.ventana_features import FEATURE_NAMES
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, StratifiedKFold
 from sklearn.linear_model import LogisticRegression
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, classification_report
 
-def extract_features_from_lecturas():
-    print("📊 Extrayendo datos de la base de datos...")
-    
-    lecturas = Lectura.objects.select_related('ventana').all()
-    
-    if lecturas.count() == 0:
-        print("❌ No hay lecturas en la base de datos!")
+SEARCH_N_JOBS = int(os.environ.get('TRAIN_N_JOBS', '-1'))
+
+# Model families and hyperparameters tried by --search. Every candidate
+# is a StandardScaler + estimator pipeline, so the saved package keeps
+# the usual model/scaler pair whatever family wins.
+SEARCH_SPACE = [
+    {
+        'model': [LogisticRegression(max_iter=1000, random_state=42, solver='lbfgs')],
+        'model__C': [0.01, 0.1, 1.0, 10.0],
+        'model__class_weight': [None, 'balanced'],
+    },
+    {
+        'model': [GradientBoostingClassifier(random_state=42)],
+        'model__n_estimators': [100, 200],
+        'model__learning_rate': [0.05, 0.1],
+        'model__max_depth': [2, 3],
+    },
+    {
+        'model': [RandomForestClassifier(random_state=42, n_jobs=1)],
+        'model__n_estimators': [200, 400],
+        'model__max_depth': [None, 6],
+        'model__min_samples_leaf': [1, 5],
+        'model__class_weight': [None, 'balanced'],
+    },
+]
+SEARCH_SCORING = {
+    'roc_auc': 'roc_auc',
+    'accuracy': 'accuracy',
+    'precision': 'precision',
+    'recall': 'recall',
+    'f1': 'f1',
+}
+
+def build_dataset():
+    """
+    Per-ventana features joined with their labels, None when there is
+    nothing to use. Built by ModelTrainer.dataset, the same SQL features
+    and labelled Analisis the train_craving_model task trains on.
+    """
+    print("📊 Calculando features de las ventanas etiquetadas...")
+    
+    ventana_ids, X, y = ModelTrainer.dataset()
+    if len(y) == 0:
+        print("❌ No hay análisis etiquetados con lecturas")
         print("💡 Sugerencia: Inserta datos de prueba primero")
         return None
     
-    print(f"✅ Encontradas {lecturas.count()} lecturas")
-    
-    data = []
-    for lectura in lecturas:
-        data.append({
-            'ventana_id': lectura.ventana_id,
-            'heart_rate': lectura.heart_rate or 0,
-            'accel_x': lectura.accel_x or 0,
-            'accel_y': lectura.accel_y or 0,
-            'accel_z': lectura.accel_z or 0,
-            'gyro_x': lectura.gyro_x or 0,
-            'gyro_y': lectura.gyro_y or 0,
-            'gyro_z': lectura.gyro_z or 0,
-        })
-    
-    df = pd.DataFrame(data)
-    return df
-
-def engineer_features(df):
-    print("🔧 Creando features adicionales...")
-    
-    features_per_window = []
-    
-    for ventana_id in df['ventana_id'].unique():
-        window_data = df[df['ventana_id'] == ventana_id]
-        
-        features = {
-            'ventana_id': ventana_id,
-            
-            'hr_mean': window_data['heart_rate'].mean(),
-            'hr_std': window_data['heart_rate'].std(),
-            'hr_min': window_data['heart_rate'].min(),
-            'hr_max': window_data['heart_rate'].max(),
-            'hr_range': window_data['heart_rate'].max() - window_data['heart_rate'].min(),
-            
-            'accel_magnitude_mean': np.sqrt(
-                window_data['accel_x']**2 + 
-                window_data['accel_y']**2 + 
-                window_data['accel_z']**2
-            ).mean(),
-            'accel_magnitude_std': np.sqrt(
-                window_data['accel_x']**2 + 
-                window_data['accel_y']**2 + 
-                window_data['accel_z']**2
-            ).std(),
-            
-            'gyro_magnitude_mean': np.sqrt(
-                window_data['gyro_x']**2 + 
-                window_data['gyro_y']**2 + 
-                window_data['gyro_z']**2
-            ).mean(),
-            'gyro_magnitude_std': np.sqrt(
-                window_data['gyro_x']**2 + 
-                window_data['gyro_y']**2 + 
-                window_data['gyro_z']**2
-            ).std(),
-            
-            'accel_energy': (window_data['accel_x']**2 + 
-                           window_data['accel_y']**2 + 
-                           window_data['accel_z']**2).sum(),
-            'gyro_energy': (window_data['gyro_x']**2 + 
-                          window_data['gyro_y']**2 + 
-                          window_data['gyro_z']**2).sum(),
-        }
-        
-        features_per_window.append(features)
-    
-    features_df = pd.DataFrame(features_per_window)
-    
-    features_df = features_df.fillna(0)
+    print(f"✅ {len(y)} ventanas etiquetadas con {X.shape[1]} features")
     
-    print(f"✅ Creadas {len(features_df.columns)-1} features para {len(features_df)} ventanas")
-    
-    return features_df
+    data = pd.DataFrame(X, columns=list(FEATURE_NAMES))
+    data.insert(0, 'ventana_id', ventana_ids)
+    data['urge_label'] = y
+    return data
 
-def get_labels():
-    print("🏷️  Obteniendo labels...")
-    
-    analisis = Analisis.objects.all()
-    
-    if analisis.count() > 0:
-        labels_data = []
-        for a in analisis:
-            labels_data.append({
-                'ventana_id': a.ventana_id,
-                'urge_label': a.urge_label
-            })
-        labels_df = pd.DataFrame(labels_data)
-        print(f"✅ Encontrados {len(labels_df)} labels reales")
-        return labels_df
-    
-    print("⚠️  No hay análisis previos. Generando labels sintéticos...")
-    print("💡 En producción, debes etiquetar los datos realmente")
-    
-    ventanas = Ventana.objects.all()
-    if ventanas.count() == 0:
-        print("❌ No hay ventanas en la base de datos")
-        return None
+def search_model(X_train, y_train, strategy='grid', n_iter=20, n_jobs=SEARCH_N_JOBS):
+    """
+    Search SEARCH_SPACE with stratified K-fold CV, every (candidate, fold)
+    fit runs in joblib's process pool. Returns (scaler, model, report) for
+    the candidate with the best mean ROC-AUC, refitted on all of X_train.
+    """
+    n_splits = min(5, int(y_train.value_counts().min()))
+    if n_splits < 2 or y_train.nunique() < 2:
+        raise ValueError("La búsqueda necesita al menos 2 muestras de cada clase")
+    
+    cv = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    pipeline = Pipeline([('scaler', StandardScaler()), ('model', LogisticRegression())])
+    
+    if strategy == 'random':
+        search = RandomizedSearchCV(
+            pipeline, SEARCH_SPACE, n_iter=n_iter, scoring=SEARCH_SCORING, refit='roc_auc',
+            cv=cv, n_jobs=n_jobs, random_state=42
+        )
+    else:
+        search = GridSearchCV(
+            pipeline, SEARCH_SPACE, scoring=SEARCH_SCORING, refit='roc_auc',
+            cv=cv, n_jobs=n_jobs
+        )
     
-    labels_data = []
-    for ventana in ventanas:
-        lecturas = Lectura.objects.filter(ventana=ventana)
-        if lecturas.exists():
-            hr_mean = lecturas.aggregate(hr=models.Avg('heart_rate'))['hr'] or 70
-            urge_label = 1 if hr_mean > 90 else 0
-        else:
-            urge_label = 0
-        
-        labels_data.append({
-            'ventana_id': ventana.id,
-            'urge_label': urge_label
-        })
+    print(f"\n🔎 Búsqueda {strategy} con {n_splits}-fold CV (n_jobs={n_jobs})...")
+    started = time.perf_counter()
+    search.fit(X_train, y_train)
+    wall_seconds = time.perf_counter() - started
+    
+    results = search.cv_results_
+    best = search.best_index_
+    candidates = len(results['params'])
+    
+    folds = [
+        {metric: float(results[f'split{i}_test_{metric}'][best]) for metric in SEARCH_SCORING}
+        for i in range(n_splits)
+    ]
+    
+    family_best = {}
+    for i, params in enumerate(results['params']):
+        family = type(params['model']).__name__
+        score = float(results['mean_test_roc_auc'][i])
+        if family not in family_best or score > family_best[family]:
+            family_best[family] = score
+    
+    best_estimator = search.best_estimator_
+    model = best_estimator.named_steps['model']
+    report = {
+        'strategy': strategy,
+        'n_splits': n_splits,
+        'candidates': candidates,
+        'fits': candidates * n_splits,
+        'n_jobs': n_jobs,
+        'wall_seconds': round(wall_seconds, 2),
+        'best_model': type(model).__name__,
+        'best_params': {
+            name: value for name, value in search.best_params_.items() if name != 'model'
+        },
+        'cv_folds': folds,
+        'cv_mean': {metric: float(results[f'mean_test_{metric}'][best]) for metric in SEARCH_SCORING},
+        'cv_std': {metric: float(results[f'std_test_{metric}'][best]) for metric in SEARCH_SCORING},
+        'family_best_roc_auc': family_best,
+    }
     
-    labels_df = pd.DataFrame(labels_data)
-    print(f"✅ Generados {len(labels_df)} labels sintéticos")
-    print("⚠️  Recuerda: estos son datos de prueba, no reales")
+    print(f"✅ {candidates} candidatos x {n_splits} folds en {wall_seconds:.1f}s")
+    for family, score in sorted(family_best.items(), key=lambda item: -item[1]):
+        print(f"   - {family}: ROC-AUC {score:.3f}")
+    print(f"🏆 Mejor: {report['best_model']} {report['best_params']}")
+    for i, fold in enumerate(folds):
+        print(f"   Fold {i + 1}: " + ", ".join(f"{metric}={value:.3f}" for metric, value in fold.items()))
     
-    return labels_df
+    return best_estimator.named_steps['scaler'], model, report
 
-def train_model():
+def train_model(snapshot_dir=None, search=None):
     print("\n" + "="*60)
     print("🚀 ENTRENAMIENTO DEL MODELO DE PREDICCIÓN")
     print("="*60 + "\n")
     
-    lecturas_df = extract_features_from_lecturas()
-    if lecturas_df is None:
-        return False
-    
-    features_df = engineer_features(lecturas_df)
-    
-    labels_df = get_labels()
-    if labels_df is None:
-        return False
-    
-    print("\n🔗 Combinando features y labels...")
-    data = features_df.merge(labels_df, on='ventana_id', how='inner')
-    
-    if len(data) == 0:
-        print("❌ No hay datos para entrenar después del merge")
-        return False
-    
-    print(f"✅ Dataset final: {len(data)} muestras")
+    if snapshot_dir:
+        # Imported here, training_snapshot itself builds on this module
+        from training_snapshot import load_snapshot
+        
+        print(f"📦 Cargando snapshot desde: {snapshot_dir}")
+        X, y, manifest = load_snapshot(snapshot_dir)
+        print(f"✅ Snapshot hasta análisis {manifest['max_analisis_id']} ({manifest['updated_at']})")
+        
+        if len(X) == 0:
+            print("❌ El snapshot está vacío")
+            return False
+    else:
+        data = build_dataset()
+        if data is None:
+            return False
+        
+        if len(data) == 0:
+            print("❌ No hay datos para entrenar después del merge")
+            return False
+        
+        X = data.drop(['ventana_id', 'urge_label'], axis=1)
+        y = data['urge_label']
     
-    X = data.drop(['ventana_id', 'urge_label'], axis=1)
-    y = data['urge_label']
+    print(f"✅ Dataset final: {len(X)} muestras")
     
     print(f"\n📊 Distribución de clases:")
     print(f"   - Sin deseo (0): {(y == 0).sum()} muestras ({(y == 0).mean()*100:.1f}%)")
@@ -178,107 +184,56 @@ def train_model():
     print("\n✂️  Dividiendo datos en train/test (80/20)...")
     
     min_class_count = y.value_counts().min()
-    use_stratify = min_class_count >= 2 and len(y.unique()) > 1
-    
-    if not use_stratify:
+    if min_class_count < 2 or len(y.unique()) < 2:
         print(f"⚠️  Estratificación desactivada (muy pocos datos en alguna clase)")
         print(f"   Mínimo por clase: {min_class_count} muestras")
     
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, 
-        test_size=0.2, 
-        random_state=42,
-        stratify=y if use_stratify else None
-    )
-    
-    print(f"   - Train: {len(X_train)} muestras")
-    print(f"   - Test: {len(X_test)} muestras")
-    
-    print("\n🔄 Normalizando features...")
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    print("\n🎓 Entrenando Logistic Regression...")
-    model = LogisticRegression(
-        max_iter=1000,
-        random_state=42,
-        class_weight='balanced',
-        C=0.1,
-        penalty='l2',
-        solver='lbfgs'
-    )
-    model.fit(X_train_scaled, y_train)
-    print("✅ Modelo entrenado!")
-    
-    print("\n📈 Evaluando modelo...")
-    
-    y_train_pred = model.predict(X_train_scaled)
-    train_accuracy = accuracy_score(y_train, y_train_pred)
-    
-    y_pred = model.predict(X_test_scaled)
-    y_pred_proba = model.predict_proba(X_test_scaled)[:, 1]
+    if search:
+        fit_model = lambda X_train, y_train: search_model(X_train, y_train, strategy=search)
+    else:
+        print("\n🎓 Entrenando Logistic Regression...")
+        fit_model = None
     
-    accuracy = accuracy_score(y_test, y_pred)
-    precision = precision_score(y_test, y_pred, zero_division=0)
-    recall = recall_score(y_test, y_pred, zero_division=0)
-    f1 = f1_score(y_test, y_pred, zero_division=0)
+    try:
+        model_package = ModelTrainer.fit(X, y, fit_model=fit_model)
+    except ValueError as e:
+        print(f"❌ No se pudo entrenar: {e}")
+        return False
+    metrics = model_package['metrics']
+    print("✅ Modelo entrenado!")
+    print(f"   - Train: {metrics['train_samples']} muestras")
+    print(f"   - Test: {metrics['test_samples']} muestras")
     
     print(f"\n✅ MÉTRICAS DEL MODELO:")
-    print(f"   📚 Train Accuracy: {train_accuracy:.3f}")
+    print(f"   📚 Train Accuracy: {metrics['train_accuracy']:.3f}")
     print(f"   📊 Test Metrics:")
-    print(f"      - Accuracy:  {accuracy:.3f}")
-    print(f"      - Precision: {precision:.3f}")
-    print(f"      - Recall:    {recall:.3f}")
-    print(f"      - F1-Score:  {f1:.3f}")
-    
-    if train_accuracy - accuracy > 0.15:
+    print(f"      - Accuracy:  {metrics['accuracy']:.3f}")
+    print(f"      - Precision: {metrics['precision']:.3f}")
+    print(f"      - Recall:    {metrics['recall']:.3f}")
+    print(f"      - F1-Score:  {metrics['f1_score']:.3f}")
+    if 'roc_auc' in metrics:
+        print(f"      - ROC-AUC:   {metrics['roc_auc']:.3f}")
+    
+    if metrics['train_accuracy'] - metrics['accuracy'] > 0.15:
         print(f"\n⚠️  WARNING: Posible overfitting detectado!")
-        print(f"   Train accuracy ({train_accuracy:.3f}) >> Test accuracy ({accuracy:.3f})")
+        print(f"   Train accuracy ({metrics['train_accuracy']:.3f}) >> Test accuracy ({metrics['accuracy']:.3f})")
         print(f"   Considera: más datos, más regularización, o features más simples")
     
-    if len(y_test.unique()) > 1:
-        roc_auc = roc_auc_score(y_test, y_pred_proba)
-        print(f"      - ROC-AUC:   {roc_auc:.3f}")
-    
-    print("\n📊 Reporte de clasificación:")
-    print(classification_report(y_test, y_pred, zero_division=0))
-    
-    os.makedirs('models', exist_ok=True)
-    
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    model_path = f'models/smoking_craving_model_{timestamp}.pkl'
-    
-    print(f"\n💾 Guardando modelo en: {model_path}")
-    
-    model_package = {
-        'model': model,
-        'scaler': scaler,
-        'feature_names': X.columns.tolist(),
-        'training_date': datetime.now().isoformat(),
-        'metrics': {
-            'accuracy': accuracy,
-            'precision': precision,
-            'recall': recall,
-            'f1_score': f1
-        }
-    }
-    
-    joblib.dump(model_package, model_path)
-    print("✅ Modelo guardado!")
+    print(f"\n💾 Publicando modelo versión {timestamp}...")
     
-    latest_model_path = 'models/smoking_craving_model.pkl'
-    if os.path.exists(latest_model_path):
-        os.remove(latest_model_path)
-    
-    import shutil
-    shutil.copy(model_path, latest_model_path)
-    print(f"✅ Symlink creado: {latest_model_path}")
+    published = ModelTrainer.publish(model_package, timestamp)
+    print(f"✅ Modelo guardado: {published['model_path']}")
+    if published['artifact_path']:
+        print(f"✅ Artefacto NumPy: {published['artifact_path']}")
+    else:
+        print("⚠️  El modelo no es lineal binario, no se exporta artefacto NumPy")
+    print(f"✅ Versión publicada: {timestamp}")
     
     print("\n" + "="*60)
     print("🎉 ENTRENAMIENTO COMPLETADO EXITOSAMENTE")
     print("="*60)
-    print(f"\n📁 Modelo guardado en: {latest_model_path}")
+    print(f"\n📁 Modelo servido desde: {settings.ML_MODEL_PATH}")
     print(f"🔧 Ahora puedes usar Celery para hacer predicciones!")
     
     return True
@@ -446,8 +401,25 @@ if __name__ == "__main__":
     print("🤖 SISTEMA DE ENTRENAMIENTO DE MODELO ML")
     print("="*60)
     
+    if '--export-only' in sys.argv:
+        # Republish the current pickle, which exports its NumPy artifact, without retraining
+        model_package = joblib.load(settings.ML_MODEL_PATH)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        published = ModelTrainer.publish(model_package, timestamp)
+        if published['artifact_path'] is None:
+            print("⚠️  El modelo no es lineal binario, no se exporta artefacto NumPy")
+            sys.exit(1)
+        print(f"✅ Artefacto NumPy: {published['artifact_path']}")
+        sys.exit(0)
+    
+    snapshot_dir = None
+    if '--snapshot' in sys.argv:
+        # Train from the snapshot written by training_snapshot.py
+        from training_snapshot import SNAPSHOT_DIR
+        snapshot_dir = SNAPSHOT_DIR
+    
     from api.models import Lectura
-    if Lectura.objects.count() == 0:
+    if snapshot_dir is None and Lectura.objects.count() == 0:
         print("\n⚠️  No hay datos en la tabla 'lecturas'")
         
         if '--auto' in sys.argv or '-y' in sys.argv:
@@ -456,7 +428,13 @@ if __name__ == "__main__":
         else:
             insert_sample_data()
     
-    success = train_model()
+    search = None
+    if '--search' in sys.argv:
+        search = 'grid'
+    elif '--search=random' in sys.argv:
+        search = 'random'
+    
+    success = train_model(snapshot_dir, search)
     
     if not success:
         print("\n❌ El entrenamiento falló")
@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import hashlib
+import django
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WearableApi.settings')
+django.setup()
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from api.models import Analisis
+from api.services import ModelTrainer
+from api.services.ventana_features import FEATURE_NAMES
+
+SNAPSHOT_DIR = os.environ.get('TRAIN_SNAPSHOT_DIR', 'snapshots/training')
+MANIFEST_NAME = 'manifest.json'
+FORMAT_VERSION = 2
+# Bumped when VentanaFeatureService computes a feature differently, so
+# older snapshots are rebuilt instead of mixed with new rows
+FEATURE_VERSION = 2
+# urge_label of a row whose Analisis lost its label, load_snapshot skips it
+LABEL_MISSING = -1
+
+# Column files of a snapshot. features.npy is Fortran ordered, so every
+# feature is stored contiguously and np.load(mmap_mode='r') gives a
+# (rows, features) matrix without copying.
+COLUMNS = {
+    'analisis_id': np.int64,
+    'ventana_id': np.int64,
+    'features': np.float64,
+    'urge_label': np.int8,
+}
+
+def schema_hash():
+    """Hash of feature order, feature rules and dtypes, a snapshot is only valid for the same schema"""
+    schema = {
+        'feature_names': list(FEATURE_NAMES),
+        'feature_version': FEATURE_VERSION,
+        'dtypes': {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()},
+    }
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+def read_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def write_manifest(path, manifest):
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    with open(f'{manifest_path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+
+def append_column(path, name, values, rows, updates=None):
+    """
+    Write the first `rows` stored values plus `values` to a new .npy and
+    swap it in. Rows beyond the manifest (an interrupted run) are dropped.
+    updates maps stored row indexes to replacement values.
+    """
+    file_path = os.path.join(path, f'{name}.npy')
+    old = np.load(file_path, mmap_mode='r') if rows else None
+
+    combined = np.lib.format.open_memmap(
+        f'{file_path}.tmp',
+        mode='w+',
+        dtype=values.dtype,
+        shape=(rows + len(values),) + values.shape[1:],
+        fortran_order=values.ndim > 1,
+    )
+    if rows:
+        combined[:rows] = old[:rows]
+    for index, value in (updates or {}).items():
+        combined[index] = value
+    combined[rows:] = values
+    combined.flush()
+    del combined, old
+
+    os.replace(f'{file_path}.tmp', file_path)
+
+def stored_rows(path, rows):
+    """(row index, label) of every Analisis already in the snapshot, keyed by its id"""
+    if not rows:
+        return {}
+    analisis_ids = np.load(os.path.join(path, 'analisis_id.npy'), mmap_mode='r')[:rows]
+    labels = np.load(os.path.join(path, 'urge_label.npy'), mmap_mode='r')[:rows]
+    return {
+        int(analisis_id): (index, int(label))
+        for index, (analisis_id, label) in enumerate(zip(analisis_ids, labels))
+    }
+
+def write_snapshot(path=SNAPSHOT_DIR, full=False):
+    """
+    Bring the snapshot up to date with the Analisis changed since the
+    last run, or rebuild it from scratch with full=True. Returns the
+    manifest.
+
+    Rows are keyed on Analisis.id and increments on Analisis.updated_at,
+    so a label given or changed later is picked up too: a new row is
+    appended, a stored one gets its new label. Labels on ventanas that
+    are still open wait in the manifest until they close, their features
+    would still change, without holding back the other rows.
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest = None if full else read_manifest(path)
+
+    if manifest is not None and manifest['schema_hash'] != schema_hash():
+        raise ValueError(
+            f"Snapshot in {path} has a different feature schema, rebuild it with --full"
+        )
+
+    rows = manifest['rows'] if manifest else 0
+    changed_since = parse_datetime(manifest['changed_until']) if manifest else None
+    waiting = manifest['pending_analisis_ids'] if manifest else []
+
+    changed_until = timezone.now()
+    changed = Analisis.objects.filter(updated_at__lte=changed_until)
+    if changed_since is not None:
+        changed = changed.filter(Q(updated_at__gt=changed_since) | Q(id__in=waiting))
+    changed = changed.order_by('id').values_list('id', 'ventana_id', 'urge_label', 'ventana__window_end')
+
+    stored = stored_rows(path, rows)
+    relabelled = {}
+    new_rows = []
+    pending = []
+
+    for analisis_id, ventana_id, urge_label, window_end in changed.iterator():
+        if analisis_id in stored:
+            index, stored_label = stored[analisis_id]
+            label = LABEL_MISSING if urge_label is None else urge_label
+            if label != stored_label:
+                relabelled[index] = label
+        elif urge_label is None:
+            continue
+        elif window_end is not None and window_end > changed_until:
+            pending.append(analisis_id)
+        else:
+            new_rows.append((analisis_id, ventana_id, urge_label))
+
+    features = ModelTrainer.features(ventana_id for _, ventana_id, _ in new_rows)
+    # A closed ventana without lecturas has no features, it is skipped for good
+    new_rows = [row for row in new_rows if row[1] in features]
+
+    if not new_rows and not relabelled and manifest is not None and pending == waiting:
+        print("✅ No hay análisis nuevos ni cambiados, snapshot sin cambios")
+        return manifest
+
+    new_columns = {
+        'analisis_id': np.array([row[0] for row in new_rows], dtype=COLUMNS['analisis_id']),
+        'ventana_id': np.array([row[1] for row in new_rows], dtype=COLUMNS['ventana_id']),
+        'features': np.asfortranarray(
+            np.array([features[row[1]] for row in new_rows], dtype=COLUMNS['features']).reshape(-1, len(FEATURE_NAMES))
+        ),
+        'urge_label': np.array([row[2] for row in new_rows], dtype=COLUMNS['urge_label']),
+    }
+
+    for name, values in new_columns.items():
+        append_column(path, name, values, rows, relabelled if name == 'urge_label' else None)
+
+    now = datetime.now().isoformat()
+    total = rows + len(new_rows)
+    labels = np.load(os.path.join(path, 'urge_label.npy'), mmap_mode='r')[:total]
+    analisis_ids = np.load(os.path.join(path, 'analisis_id.npy'), mmap_mode='r')[:total]
+
+    if manifest is None:
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'created_at': now,
+            'feature_names': list(FEATURE_NAMES),
+            'schema_hash': schema_hash(),
+            'files': {name: f'{name}.npy' for name in COLUMNS},
+            'increments': [],
+        }
+
+    manifest['increments'].append({
+        'created_at': now,
+        'changed_since': changed_since.isoformat() if changed_since else None,
+        'changed_until': changed_until.isoformat(),
+        'rows': len(new_rows),
+        'relabelled': len(relabelled),
+        'pending': len(pending),
+    })
+    manifest.update({
+        'updated_at': now,
+        'rows': total,
+        'changed_until': changed_until.isoformat(),
+        'pending_analisis_ids': pending,
+        'max_analisis_id': int(analisis_ids.max()) if total else None,
+        'label_counts': {str(label): int((labels == label).sum()) for label in (0, 1)},
+    })
+
+    # The manifest is written last, it is what makes the new rows visible
+    write_manifest(path, manifest)
+
+    print(
+        f"✅ Snapshot: +{len(new_rows)} filas, {len(relabelled)} re-etiquetadas, "
+        f"{len(pending)} en ventanas abiertas, total {total}"
+    )
+    return manifest
+
+def load_snapshot(path=SNAPSHOT_DIR):
+    """
+    Return (X, y, manifest) backed by read-only memory maps of the
+    snapshot files, nothing is copied into memory up front
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No snapshot manifest in {path}, run training_snapshot.py first")
+    if manifest['schema_hash'] != schema_hash():
+        raise ValueError(f"Snapshot in {path} has a different feature schema, rebuild it with --full")
+
+    rows = manifest['rows']
+    columns = {
+        name: np.load(os.path.join(path, manifest['files'][name]), mmap_mode='r')[:rows]
+        for name in COLUMNS
+    }
+
+    labelled = columns['urge_label'] != LABEL_MISSING
+    if not labelled.all():
+        # Only rows whose label was removed later, everything else stays mapped
+        columns = {name: values[labelled] for name, values in columns.items()}
+
+    X = pd.DataFrame(columns['features'], columns=manifest['feature_names'], copy=False)
+    y = pd.Series(columns['urge_label'], name='urge_label', copy=False)
+
+    return X, y, manifest
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("📦 SNAPSHOT DEL DATASET DE ENTRENAMIENTO")
+    print("=" * 60)
+
+    path = SNAPSHOT_DIR
+    if '--dir' in sys.argv:
+        path = sys.argv[sys.argv.index('--dir') + 1]
+
+    manifest = write_snapshot(path, full='--full' in sys.argv)
+
+    if manifest:
+        print(f"\n📊 Manifest ({os.path.join(path, MANIFEST_NAME)}):")
+        print(f"   - Filas: {manifest['rows']}")
+        print(f"   - Último análisis: {manifest['max_analisis_id']}")
+        print(f"   - En ventanas abiertas: {len(manifest['pending_analisis_ids'])}")
+        print(f"   - Labels: {manifest['label_counts']}")
+        print(f"   - Schema: {manifest['schema_hash'][:12]}")
+        print(f"\n💡 Entrena con: py train_model.py --snapshot")
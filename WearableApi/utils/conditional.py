@@ -0,0 +1,43 @@
+
+import hashlib
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+def make_etag(*parts):
+    """Quoted ETag from anything with a stable str()"""
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+def _opaque(tag):
+    return tag[2:] if tag.startswith('W/') else tag
+
+def is_not_modified(request, etag=None, last_modified=None):
+    """
+    True when the client's copy is current. If-None-Match wins over
+    If-Modified-Since, and ETags are compared weakly as GET allows.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and etag:
+        if if_none_match.strip() == '*':
+            return True
+        return _opaque(etag) in {_opaque(tag) for tag in parse_etags(if_none_match)}
+
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    if if_modified_since and last_modified and not if_none_match:
+        return int(last_modified.timestamp()) <= if_modified_since
+
+    return False
+
+def set_validators(response, etag=None, last_modified=None):
+    """Add ETag / Last-Modified and make clients revalidate on every use"""
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def not_modified(etag=None, last_modified=None):
+    return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
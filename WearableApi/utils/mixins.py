@@ -1,7 +1,15 @@
 
+import redis
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
 from utils.logger import Logger, log_request, log_exception
+from utils.conditional import is_not_modified, make_etag, not_modified, set_validators
+from api.services.dashboard_cache import DashboardCache
+from api.services.materialized_views import MaterializedViewService
 
 class LoggingMixin:
     
@@ -55,6 +63,191 @@ class ConsumerFilterMixin:
         
         return queryset
 
+class MaterializedSourceMixin:
+    """
+    Serve a dashboard view live or from its mv_* materialized variant.
+    ?source=live|materialized picks per request, the default comes from
+    DASHBOARD_MATERIALIZED_VIEWS. Responses carry X-Data-Source and, for
+    materialized data, X-Data-Refreshed-At. A variant that was never
+    refreshed falls back to the live view.
+    """
+    
+    materialized_queryset = None
+    
+    def get_queryset(self):
+        view_name = self.queryset.model._meta.db_table
+        source = self.request.query_params.get('source') or MaterializedViewService.default_source(view_name)
+        
+        if source not in ('live', 'materialized'):
+            raise ValidationError({'source': "source must be 'live' or 'materialized'"})
+        
+        self.data_source = 'live'
+        self.refreshed_at = None
+        
+        if source == 'materialized' and self.materialized_queryset is not None:
+            refreshed_at = MaterializedViewService.freshness(view_name)
+            
+            if refreshed_at is not None:
+                self.data_source = 'materialized'
+                self.refreshed_at = refreshed_at
+                return self.materialized_queryset.all()
+            
+            if hasattr(self, 'logger'):
+                self.logger.warning(f"⚠️  {view_name} was never refreshed, serving it live")
+        
+        return super().get_queryset()
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        
+        if getattr(self, 'data_source', None):
+            response['X-Data-Source'] = self.data_source
+            if self.refreshed_at is not None:
+                response['X-Data-Refreshed-At'] = self.refreshed_at.isoformat()
+        
+        return response
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified on list and retrieve, with 304 Not Modified
+    answered before the queryset is evaluated or serialized.
+    
+    Models with updated_at are tagged with MAX(updated_at) and COUNT(*)
+    of the filtered queryset. Lists get no Last-Modified, a delete does not
+    move MAX(updated_at). Dashboard views have neither, so with
+    ?consumidor_id they are tagged with the consumer's data version
+    (see DashboardCache) and the DASHBOARD_CACHE_TIMEOUT period; without
+    it they are served as usual.
+    """
+    
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+    
+    def get_validators(self, request, **kwargs):
+        """(etag, last_modified), (None, None) when there is no cheap validator"""
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        parts = [
+            self.basename,
+            self.action,
+            lookup,
+            request.accepted_renderer.format,
+            sorted((name, sorted(request.query_params.getlist(name))) for name in request.query_params),
+        ]
+        
+        if any(field.name == 'updated_at' for field in self.queryset.model._meta.concrete_fields):
+            queryset = self.filter_queryset(self.get_queryset())
+            if lookup is not None:
+                queryset = queryset.filter(**{self.lookup_field: lookup})
+            
+            stats = queryset.order_by().aggregate(last_modified=Max('updated_at'), total=Count('pk'))
+            etag = make_etag(*parts, stats['last_modified'], stats['total'])
+            return etag, stats['last_modified'] if lookup is not None else None
+        
+        consumidor_id = request.query_params.get('consumidor_id')
+        if consumidor_id:
+            # Views compare against CURRENT_DATE, a new day is new data. The
+            # period caps a tag that missed an invalidation at the same
+            # DASHBOARD_CACHE_TIMEOUT as the cached responses
+            period = int(timezone.now().timestamp() // settings.DASHBOARD_CACHE_TIMEOUT)
+            return make_etag(*parts, DashboardCache.version(consumidor_id), timezone.now().date(), period), None
+        
+        return None, None
+    
+    def conditional_response(self, handler, request, *args, **kwargs):
+        try:
+            etag, last_modified = self.get_validators(request, **kwargs)
+        except redis.RedisError as e:
+            if hasattr(self, 'logger'):
+                self.logger.warning(f"⚠️  Redis unavailable, no ETag: {e}")
+            return handler(request, *args, **kwargs)
+        
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200 and (etag or last_modified):
+            set_validators(response, etag, last_modified)
+        return response
+
+class ConsumerCacheMixin:
+    """
+    Cache list/retrieve responses per consumer (see DashboardCache).
+    Only requests with ?consumidor_id are cached, the key covers the
+    endpoint, every query param and the consumer's data version.
+    Responses carry X-Cache: HIT-L1, HIT-L2 or MISS.
+    """
+    
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+    
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+    
+    def cached_response(self, handler, request, *args, **kwargs):
+        consumidor_id = request.query_params.get('consumidor_id')
+        if not settings.DASHBOARD_CACHE_ENABLED or not consumidor_id:
+            return handler(request, *args, **kwargs)
+        
+        endpoint = f"{self.basename}.{self.action}.{kwargs.get(self.lookup_field, '')}"
+        try:
+            key = DashboardCache.key(endpoint, consumidor_id, request.query_params)
+            entry, tier = DashboardCache.get(key)
+        except redis.RedisError as e:
+            if hasattr(self, 'logger'):
+                self.logger.warning(f"⚠️  Redis unavailable, dashboard cache bypassed: {e}")
+            return handler(request, *args, **kwargs)
+        
+        if entry is not None:
+            # Restore what MaterializedSourceMixin would have set
+            self.data_source = entry['data_source']
+            self.refreshed_at = entry['refreshed_at']
+            response = Response(entry['data'])
+            response['X-Cache'] = f'HIT-{tier}'
+            return response
+        
+        response = handler(request, *args, **kwargs)
+        
+        if response.status_code == 200:
+            try:
+                DashboardCache.set(key, {
+                    'data': response.data,
+                    'data_source': getattr(self, 'data_source', None),
+                    'refreshed_at': getattr(self, 'refreshed_at', None),
+                })
+            except redis.RedisError as e:
+                if hasattr(self, 'logger'):
+                    self.logger.warning(f"⚠️  Redis unavailable, response not cached: {e}")
+        
+        response['X-Cache'] = 'MISS'
+        return response
+
+class DataVersionMixin:
+    """
+    Invalidate the cached dashboard responses of the consumer a created,
+    updated or deleted object belongs to (see ConsumerCacheMixin).
+    Models without a consumidor_id override get_consumidor_id.
+    """
+    
+    def get_consumidor_id(self, instance):
+        return instance.consumidor_id
+    
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        DashboardCache.invalidate(self.get_consumidor_id(serializer.instance))
+    
+    def perform_update(self, serializer):
+        previous = self.get_consumidor_id(serializer.instance)
+        super().perform_update(serializer)
+        DashboardCache.invalidate(previous, self.get_consumidor_id(serializer.instance))
+    
+    def perform_destroy(self, instance):
+        consumidor_id = self.get_consumidor_id(instance)
+        super().perform_destroy(instance)
+        DashboardCache.invalidate(consumidor_id)
+
 class TimestampMixin:
     
     def get_extra_kwargs(self):
@@ -0,0 +1,174 @@
+
+import base64
+import json
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a (timestamp, id) key for high-volume tables
+
+    Pages are read with WHERE (timestamp, id) < (last seen) instead of
+    OFFSET, so deep pages cost the same as the first one, and no COUNT(*)
+    is run. The view sets keyset_ordering, e.g. ('-window_start', '-id'),
+    which should match an index. Responses have next / previous cursor
+    URLs and results; ?limit sets the page size.
+
+    ?page=N (or a custom ?ordering) switches to page-number pagination
+    with its count, for callers that need it on small result sets.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_number = None
+
+        if any(param in request.query_params for param in ('page', 'ordering')):
+            self.page_number = PageNumberPagination()
+            self.page_number.page_size = self.page_size
+            self.page_number.page_size_query_param = self.page_size_query_param
+            self.page_number.max_page_size = self.max_page_size
+            return self.page_number.paginate_queryset(queryset, request, view)
+
+        self.ordering = tuple(getattr(view, 'keyset_ordering', self.ordering))
+        self.limit = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor['reverse'])
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(self.after(ordering, cursor['position']))
+
+        rows = list(queryset[:self.limit + 1])
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+
+        # Going back, the rows before the cursor are what has_more is about
+        self.has_next = (has_more and not self.reverse) or (cursor is not None and self.reverse)
+        self.has_previous = (has_more and self.reverse) or (cursor is not None and not self.reverse)
+        self.first = self.position(rows[0]) if rows else None
+        self.last = self.position(rows[-1]) if rows else None
+
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    @staticmethod
+    def after(ordering, position):
+        """Rows past position in ordering, as (a < x) OR (a = x AND b < y)"""
+        def lookup(field):
+            return (field[1:], 'lt') if field.startswith('-') else (field, 'gt')
+
+        (first, second), (value, tie) = ordering, position
+        first_field, first_op = lookup(first)
+        second_field, second_op = lookup(second)
+
+        # The redundant lte / gte bound lets PostgreSQL range scan the index
+        return (
+            Q(**{f'{first_field}__{first_op}e': value})
+            & (Q(**{f'{first_field}__{first_op}': value}) | Q(**{f'{second_field}__{second_op}': tie}))
+        )
+
+    def position(self, row):
+        value, tie = (getattr(row, field.lstrip('-')) for field in self.ordering)
+        return [value.isoformat() if hasattr(value, 'isoformat') else value, tie]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            value, tie = cursor['p']
+            parsed = parse_datetime(value) if isinstance(value, str) else value
+            if parsed is None:
+                raise ValueError(value)
+            return {'position': (parsed, int(tie)), 'reverse': bool(cursor.get('r'))}
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, position, reverse):
+        encoded = base64.urlsafe_b64encode(json.dumps({'p': position, 'r': int(reverse)}).encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or self.last is None:
+            return None
+        return self.encode_cursor(self.last, False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first is None:
+            # An empty page after the last row, start over from the top
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.first, True)
+
+    def get_paginated_response(self, data):
+        if self.page_number is not None:
+            return self.page_number.get_paginated_response(data)
+
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor from the next / previous link',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Results per page, at most {self.max_page_size}',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': 'page',
+                'required': False,
+                'in': 'query',
+                'description': 'Page number, switches to page-number pagination with a count',
+                'schema': {'type': 'integer'},
+            },
+        ]